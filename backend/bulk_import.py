@@ -0,0 +1,176 @@
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+
+import orjson
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from starlette.concurrency import run_in_threadpool
+
+from inventory import SOLD_OUT_BY_RESERVE
+
+
+# A parsed input row: its position in the request, and the decoded object or
+# the error that prevented decoding it
+Row = Tuple[int, Any]
+
+
+def parse_json_array(body: bytes) -> AsyncIterator[Row]:
+    """Decode a JSON array body, raising ValueError if it is not one"""
+    rows = orjson.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of products")
+    return _enumerate(rows)
+
+
+async def _enumerate(rows: List[Any]) -> AsyncIterator[Row]:
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """Decode newline delimited JSON as it arrives, without buffering the whole body"""
+    index = 0
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, _decode_line(line)
+                index += 1
+    if pending.strip():
+        yield index, _decode_line(pending)
+
+
+def _decode_line(line: bytes) -> Any:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError as e:
+        return ValueError(f"Invalid JSON: {e}")
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+        )
+    return str(error)
+
+
+class BulkImporter:
+    """Validate rows and write them in chunks with unordered insert_many/bulk_write.
+
+    Validation of the next chunk runs in the threadpool while the previous
+    chunk's write is in flight. Every row gets an entry in the report.
+    """
+
+    def __init__(self, collection, validate: Callable[[Any], Dict[str, Any]],
+                 upsert: bool = False, chunk_size: int = 1000):
+        self.collection = collection
+        self.validate = validate
+        self.upsert = upsert
+        self.chunk_size = chunk_size
+        self.results: Dict[int, Dict[str, Any]] = {}
+        self.written_docs: List[Dict[str, Any]] = []
+
+    def _validate_chunk(self, rows: List[Row]) -> List[Tuple[int, Dict[str, Any]]]:
+        valid = []
+        for index, row in rows:
+            if isinstance(row, Exception):
+                self._fail(index, row)
+                continue
+            if not isinstance(row, dict):
+                self._fail(index, ValueError("row must be a JSON object"))
+                continue
+            try:
+                valid.append((index, self.validate(row)))
+            except (ValidationError, ValueError, TypeError) as e:
+                self._fail(index, e, row.get("id"))
+        return valid
+
+    def _fail(self, index: int, error: Exception, product_id: Any = None) -> None:
+        self.results[index] = {"row": index, "id": product_id, "status": "error",
+                               "error": _error_message(error)}
+
+    async def _write(self, docs: List[Tuple[int, Dict[str, Any]]]) -> None:
+        if not docs:
+            return
+        failed: Dict[int, str] = {}
+        upserted: Dict[int, Any] = {}
+        try:
+            if self.upsert:
+                result = await self.collection.bulk_write([self._upsert_op(doc) for _, doc in docs],
+                                                          ordered=False)
+                upserted = result.upserted_ids
+            else:
+                await self.collection.insert_many([doc for _, doc in docs], ordered=False)
+        except BulkWriteError as e:
+            failed = {err["index"]: err.get("errmsg", "write failed") for err in e.details["writeErrors"]}
+            upserted = {op["index"]: op["_id"] for op in e.details.get("upserted", [])}
+
+        written = []
+        for position, (index, doc) in enumerate(docs):
+            if position in failed:
+                self.results[index] = {"row": index, "id": doc["id"], "status": "error",
+                                       "error": failed[position]}
+                continue
+            if not self.upsert or position in upserted:
+                status = "inserted"
+            else:
+                status = "updated"
+            self.results[index] = {"row": index, "id": doc["id"], "status": status}
+            written.append(doc)
+
+        if self.upsert and written:
+            # created_at and version come from $setOnInsert/$inc, so the stored documents are re-read
+            stored = await self.collection.find({"id": {"$in": [doc["id"] for doc in written]}},
+                                                {"_id": 0}).to_list(None)
+            written = stored
+        self.written_docs.extend(written)
+
+    @staticmethod
+    def _upsert_op(doc: Dict[str, Any]) -> UpdateOne:
+        fields = {k: v for k, v in doc.items() if k not in ("created_at", "version")}
+        return UpdateOne(
+            {"id": doc["id"]},
+            # The imported status is the admin's, release() must not undo it
+            {"$set": fields, "$setOnInsert": {"created_at": doc["created_at"]}, "$inc": {"version": 1},
+             "$unset": {SOLD_OUT_BY_RESERVE: ""}},
+            upsert=True,
+        )
+
+    async def run(self, rows: AsyncIterator[Row]) -> Dict[str, Any]:
+        writing = None
+        chunk: List[Row] = []
+
+        async def flush(chunk):
+            nonlocal writing
+            valid = await run_in_threadpool(self._validate_chunk, chunk)
+            if writing is not None:
+                await writing
+            writing = asyncio.ensure_future(self._write(valid))
+
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                await flush(chunk)
+                chunk = []
+        if chunk:
+            await flush(chunk)
+        if writing is not None:
+            await writing
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        results = [self.results[index] for index in sorted(self.results)]
+        counts = {"inserted": 0, "updated": 0, "error": 0}
+        for result in results:
+            counts[result["status"]] += 1
+        return {
+            "total": len(results),
+            "inserted": counts["inserted"],
+            "updated": counts["updated"],
+            "failed": counts["error"],
+            "results": results,
+        }
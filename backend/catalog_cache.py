@@ -0,0 +1,151 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+# Cache keys are plain tuples so they can be built cheaply in the request path:
+#   ("product", product_id)
+#   ("products", category, status, skip, limit, sort, order, cursor, fields, filters)
+#   ("featured", limit, fields)
+#   ("category", category, fields)
+def product_key(product_id: str) -> Tuple:
+    return ("product", product_id)
+
+
+def products_key(category: Optional[str], status: Optional[str], skip: int, limit: int,
+                 sort: Optional[str] = None, order: Optional[str] = None,
+                 cursor: Optional[str] = None, fields: Optional[str] = None,
+                 filters: Optional[str] = None) -> Tuple:
+    return ("products", category, status, skip, limit, sort, order, cursor, fields, filters)
+
+
+def featured_key(limit: int, fields: Optional[str] = None) -> Tuple:
+    return ("featured", limit, fields)
+
+
+def category_key(category: str, fields: Optional[str] = None) -> Tuple:
+    return ("category", category, fields)
+
+
+def _is_featured(doc: Dict[str, Any]) -> bool:
+    return doc.get("status") == "active" and (doc.get("rating") or 0) >= 4.0
+
+
+def _key_matches(key: Tuple, product_id: str, docs: Iterable[Dict[str, Any]]) -> bool:
+    """Whether a cached read could contain one of the given product documents"""
+    kind = key[0]
+    if kind == "product":
+        return key[1] == product_id
+    if kind == "products":
+        _, category, status = key[:3]
+        return any(
+            (category is None or doc.get("category") == category)
+            and (status is None or doc.get("status") == status)
+            for doc in docs
+        )
+    if kind == "featured":
+        return any(_is_featured(doc) for doc in docs)
+    if kind == "category":
+        return any(doc.get("category") == key[1] and doc.get("status") == "active" for doc in docs)
+    return False
+
+
+class CatalogCache:
+    """Bounded in-memory cache with TTL expiry and LRU eviction for catalog reads.
+
+    For `stale_seconds` after expiry an entry can still be served through
+    lookup(), flagged stale, while the caller refreshes it. Invalidated
+    entries are dropped right away and never served stale.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0,
+                 stale_seconds: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.lookup(key, allow_stale=False)[0]
+
+    def lookup(self, key: Hashable, allow_stale: bool = True) -> Tuple[Optional[Any], bool]:
+        """Return (value, stale); stale values are only returned within `stale_seconds` of expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, False
+        expires_at, value = entry
+        now = self._clock()
+        if expires_at <= now:
+            if now < expires_at + self.stale_seconds:
+                if allow_stale:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return value, True
+            else:
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value, False
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        self.invalidations += 1
+        return True
+
+    def invalidate_product(self, product_id: str, *docs: Optional[Dict[str, Any]]) -> int:
+        """Drop the entries affected by a write to one product.
+
+        `docs` are the product's documents before and/or after the write, so a
+        product moving between categories or statuses clears both sides.
+        """
+        docs = [doc for doc in docs if doc]
+        stale = [key for key in self._entries if _key_matches(key, product_id, docs)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        served = self.hits + self.stale_hits
+        lookups = served + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_seconds": self.stale_seconds,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
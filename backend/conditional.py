@@ -0,0 +1,98 @@
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def mongo_utcnow() -> datetime:
+    """Current UTC time at the millisecond precision MongoDB stores.
+
+    Use it for timestamps that are also kept or returned from memory, so they
+    match what a later read of the document gives back.
+    """
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def product_etag(doc: Dict[str, Any]) -> str:
+    """Strong ETag for one product revision.
+
+    The version prefix lets If-Match on PUT be checked atomically in MongoDB;
+    the digest covers id and updated_at.
+    """
+    updated_at = doc.get("updated_at")
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    digest = hashlib.sha1(f"{doc['id']}:{updated_at.isoformat()}".encode()).hexdigest()[:16]
+    return f'"{doc.get("version") or 0}-{digest}"'
+
+
+def version_from_etag(etag: str) -> int:
+    """Product version encoded in a product ETag (or a bare version), raising ValueError"""
+    token = etag.strip().removeprefix("W/").strip('"')
+    return int(token.split("-", 1)[0])
+
+
+class CatalogVersion:
+    """Counter bumped on every catalog write, used for listing ETags.
+
+    `counter` is this process's own and tells reads whether a write landed
+    while they ran. With several workers the ETag uses the version they share
+    through Redis instead, so all of them issue the same ETag for the same
+    catalog state. Without it the epoch changes on restart, so ETags issued by
+    a previous process are never mistaken for current ones.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.counter = 0
+        self.shared: Optional[Tuple[str, int]] = None
+
+    def bump(self) -> None:
+        self.counter += 1
+
+    def share(self, version: Optional[str]) -> None:
+        """Adopt an "epoch.number" shared version, None falls back to the local counter.
+
+        Messages from concurrent writers can arrive out of order, so within
+        one epoch the version only moves forward.
+        """
+        if version is None:
+            self.shared = None
+            return
+        epoch, _, number = version.partition(".")
+        if self.shared is None or self.shared[0] != epoch or self.shared[1] < int(number):
+            self.shared = (epoch, int(number))
+
+    def etag(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:12]
+        epoch, number = self.shared or (self.epoch, self.counter)
+        return f'"{epoch}.{number}.{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison as used for If-None-Match"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in if_none_match.split(","))
+
+
+def http_date(value: datetime) -> str:
+    # Stored timestamps are naive UTC
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_modified: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
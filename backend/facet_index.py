@@ -0,0 +1,236 @@
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Display bands for the price facet, on the effective (discounted) price
+PRICE_BANDS: List[Tuple[str, float, float]] = [
+    ("under_25", 0, 25),
+    ("25_50", 25, 50),
+    ("50_100", 50, 100),
+    ("100_200", 100, 200),
+    ("200_plus", 200, math.inf),
+]
+
+# Cumulative rating facet: "4.5 stars & up" and so on
+RATING_THRESHOLDS: List[Tuple[str, float]] = [("4.5_up", 4.5), ("4_up", 4.0), ("3_up", 3.0)]
+
+
+def effective_price(doc: Dict[str, Any]) -> float:
+    discount = doc.get("discount_price")
+    return discount if discount is not None else doc.get("price") or 0.0
+
+
+def _plain(value: Any) -> Any:
+    return getattr(value, "value", value)
+
+
+class ProductFilters(NamedTuple):
+    """Filters shared by GET /api/products and GET /api/products/facets"""
+    category: Optional[str] = None
+    status: Optional[str] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+    tags: Tuple[str, ...] = ()
+    min_rating: Optional[float] = None
+    in_stock: Optional[bool] = None
+
+    @property
+    def token(self) -> Optional[str]:
+        """Stable cache key component for the filters beyond category/status"""
+        parts = [f"{name}={value}" for name, value in (
+            ("price_min", self.price_min), ("price_max", self.price_max),
+            ("tags", ",".join(self.tags) or None), ("min_rating", self.min_rating),
+            ("in_stock", self.in_stock),
+        ) if value is not None]
+        return "&".join(parts) or None
+
+    def mongo_filter(self) -> Dict[str, Any]:
+        clauses: List[Dict[str, Any]] = []
+        if self.category:
+            clauses.append({"category": self.category})
+        if self.status:
+            clauses.append({"status": self.status})
+        if self.price_min is not None or self.price_max is not None:
+            price_range: Dict[str, float] = {}
+            if self.price_min is not None:
+                price_range["$gte"] = self.price_min
+            if self.price_max is not None:
+                price_range["$lte"] = self.price_max
+            clauses.append({"$or": [
+                {"discount_price": price_range},
+                {"discount_price": None, "price": price_range},
+            ]})
+        if self.tags:
+            clauses.append({"tags": {"$all": list(self.tags)}})
+        if self.min_rating is not None:
+            clauses.append({"rating": {"$gte": self.min_rating}})
+        if self.in_stock is not None:
+            clauses.append({"stock_quantity": {"$gt": 0} if self.in_stock else {"$lte": 0}})
+        if not clauses:
+            return {}
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+
+class FacetIndex:
+    """Bitmap index over the catalog for facet counts.
+
+    Every product owns a slot; each facet value keeps an int bitmap of the
+    slots that have it, so counting is AND + popcount and never rescans the
+    collection. Maintained incrementally on writes.
+    """
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self) -> None:
+        self.slots: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.next_slot = 0
+        self.live = 0
+        self.bitmaps: Dict[str, Dict[Any, int]] = defaultdict(lambda: defaultdict(int))
+        # Effective price per slot, bucketed by whole dollar for range filters
+        self.price_buckets: Dict[int, Dict[int, float]] = defaultdict(dict)
+        self.slot_values: Dict[int, List[Tuple[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def _values(self, doc: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        price = effective_price(doc)
+        values = [
+            ("category", _plain(doc.get("category"))),
+            ("status", _plain(doc.get("status"))),
+            ("in_stock", (doc.get("stock_quantity") or 0) > 0),
+            # Exact, so min_rating is compared the way the listing's $gte compares it
+            ("rating", float(doc.get("rating") or 0.0)),
+            ("price_bucket", int(price)),
+        ]
+        values.extend(("tags", tag) for tag in set(doc.get("tags") or []))
+        values.extend(("price", name) for name, low, high in PRICE_BANDS if low <= price < high)
+        return values
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        product_id = doc["id"]
+        if product_id in self.slots:
+            self.remove(product_id)
+        slot = self.free_slots.pop() if self.free_slots else self._new_slot()
+        bit = 1 << slot
+        values = self._values(doc)
+        for facet, value in values:
+            self.bitmaps[facet][value] |= bit
+        price = effective_price(doc)
+        self.price_buckets[int(price)][slot] = price
+        self.slots[product_id] = slot
+        self.slot_values[slot] = values
+        self.live |= bit
+
+    def _new_slot(self) -> int:
+        self.next_slot += 1
+        return self.next_slot - 1
+
+    def remove(self, product_id: str) -> None:
+        slot = self.slots.pop(product_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        for facet, value in self.slot_values.pop(slot):
+            bitmaps = self.bitmaps[facet]
+            bitmaps[value] &= mask
+            if not bitmaps[value]:
+                del bitmaps[value]
+            if facet == "price_bucket":
+                del self.price_buckets[value][slot]
+        self.live &= mask
+        self.free_slots.append(slot)
+
+    def build(self, docs) -> None:
+        self._reset()
+        for doc in docs:
+            self.add(doc)
+
+    def _price_mask(self, price_min: Optional[float], price_max: Optional[float]) -> int:
+        low = price_min if price_min is not None else -math.inf
+        high = price_max if price_max is not None else math.inf
+        mask = 0
+        for bucket, bitmap in self.bitmaps["price_bucket"].items():
+            if low <= bucket and bucket + 1 <= high:
+                mask |= bitmap
+            elif bucket <= high and low < bucket + 1:
+                # Bucket straddles a bound, check its prices one by one
+                for slot, price in self.price_buckets[bucket].items():
+                    if low <= price <= high:
+                        mask |= 1 << slot
+        return mask
+
+    def _filter_masks(self, filters: ProductFilters) -> Dict[str, int]:
+        masks = {}
+        if filters.category:
+            masks["category"] = self.bitmaps["category"].get(filters.category, 0)
+        if filters.status:
+            masks["status"] = self.bitmaps["status"].get(filters.status, 0)
+        if filters.price_min is not None or filters.price_max is not None:
+            masks["price"] = self._price_mask(filters.price_min, filters.price_max)
+        if filters.tags:
+            mask = self.live
+            for tag in filters.tags:
+                mask &= self.bitmaps["tags"].get(tag, 0)
+            masks["tags"] = mask
+        if filters.min_rating is not None:
+            mask = 0
+            for rating, bitmap in self.bitmaps["rating"].items():
+                if rating >= filters.min_rating:
+                    mask |= bitmap
+            masks["rating"] = mask
+        if filters.in_stock is not None:
+            masks["in_stock"] = self.bitmaps["in_stock"].get(filters.in_stock, 0)
+        return masks
+
+    def counts(self, filters: ProductFilters, max_tags: int = 25) -> Dict[str, Any]:
+        """Facet counts for the products matching `filters`.
+
+        Each facet is counted with every filter applied except its own, so
+        shoppers see how many results picking another value would give.
+        """
+        masks = self._filter_masks(filters)
+
+        def excluding(facet: Optional[str]) -> int:
+            mask = self.live
+            for name, filter_mask in masks.items():
+                if name != facet:
+                    mask &= filter_mask
+            return mask
+
+        def value_counts(facet: str, base: int) -> Dict[Any, int]:
+            counts = {}
+            for value, bitmap in self.bitmaps[facet].items():
+                count = (bitmap & base).bit_count()
+                if count:
+                    counts[value] = count
+            return counts
+
+        rating_base = excluding("rating")
+        tag_counts = value_counts("tags", excluding("tags"))
+        in_stock = value_counts("in_stock", excluding("in_stock"))
+        price_base = excluding("price")
+        return {
+            "total": excluding(None).bit_count(),
+            "facets": {
+                "category": value_counts("category", excluding("category")),
+                "status": value_counts("status", excluding("status")),
+                "price": {
+                    name: (self.bitmaps["price"].get(name, 0) & price_base).bit_count()
+                    for name, _, _ in PRICE_BANDS
+                },
+                "tags": dict(sorted(tag_counts.items(), key=lambda item: (-item[1], item[0]))[:max_tags]),
+                "rating": {
+                    name: sum(
+                        (bitmap & rating_base).bit_count()
+                        for rating, bitmap in self.bitmaps["rating"].items() if rating >= threshold
+                    )
+                    for name, threshold in RATING_THRESHOLDS
+                },
+                "in_stock": {"true": in_stock.get(True, 0), "false": in_stock.get(False, 0)},
+            },
+        }
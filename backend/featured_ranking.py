@@ -0,0 +1,118 @@
+import bisect
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Score components a weight can be given to
+SCORE_COMPONENTS = ("rating", "review_count", "discount")
+
+
+def parse_score_weights(spec: str) -> Dict[str, float]:
+    """Parse "rating:1,review_count:0.2" into weights, raising ValueError"""
+    weights = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(":")
+        name = name.strip()
+        if name not in SCORE_COMPONENTS:
+            raise ValueError(f"Unknown featured score component: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class FeaturedRanking:
+    """Featured products kept ranked in memory and updated on every write.
+
+    Every eligible product (active, rated at least `min_rating`, optionally in
+    stock) holds a position in a sorted list, so reading the top K is a slice.
+    Full documents are only kept for the first `depth` positions; the read
+    path fetches any others it needs and hands them to remember().
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, min_rating: float = 4.0,
+                 require_in_stock: bool = False, depth: int = 100):
+        self.weights = weights or {"rating": 1.0}
+        self.min_rating = min_rating
+        self.require_in_stock = require_in_stock
+        self.depth = depth
+        self._reset()
+
+    def _reset(self) -> None:
+        # (-score, product id), best first; the id breaks ties deterministically
+        self._ranked: List[Tuple[float, str]] = []
+        self._entries: Dict[str, Tuple[Tuple[float, str], int]] = {}
+        self._docs: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ranked)
+
+    def eligible(self, doc: Dict[str, Any]) -> bool:
+        return (
+            getattr(doc.get("status"), "value", doc.get("status")) == "active"
+            and (doc.get("rating") or 0) >= self.min_rating
+            and (not self.require_in_stock or (doc.get("stock_quantity") or 0) > 0)
+        )
+
+    def score(self, doc: Dict[str, Any]) -> float:
+        price = doc.get("price") or 0
+        discount = doc.get("discount_price")
+        components = {
+            "rating": doc.get("rating") or 0,
+            "review_count": math.log1p(doc.get("review_count") or 0),
+            "discount": (price - discount) / price if price and discount is not None else 0.0,
+        }
+        return sum(weight * components[name] for name, weight in self.weights.items())
+
+    def remove(self, product_id: str) -> None:
+        entry = self._entries.pop(product_id, None)
+        if entry is None:
+            return
+        position = bisect.bisect_left(self._ranked, entry[0])
+        del self._ranked[position]
+        self._docs.pop(product_id, None)
+
+    def update(self, product_id: str, doc: Optional[Dict[str, Any]]) -> None:
+        """Apply one product write, `doc` is None on delete"""
+        self.remove(product_id)
+        if not doc or not self.eligible(doc):
+            return
+        key = (-self.score(doc), product_id)
+        position = bisect.bisect_left(self._ranked, key)
+        self._ranked.insert(position, key)
+        self._entries[product_id] = (key, doc.get("version") or 0)
+        if position < self.depth:
+            self._docs[product_id] = doc
+            if len(self._docs) > 2 * self.depth:
+                self._trim()
+
+    def _trim(self) -> None:
+        # Writes push older entries down the ranking; drop documents that fell
+        # out of the materialized depth
+        keep = {product_id for _, product_id in self._ranked[:self.depth]}
+        self._docs = {product_id: doc for product_id, doc in self._docs.items() if product_id in keep}
+
+    def build(self, docs: Iterable[Dict[str, Any]]) -> None:
+        self._reset()
+        eligible = {doc["id"]: doc for doc in docs if self.eligible(doc)}
+        for product_id, doc in eligible.items():
+            self._entries[product_id] = ((-self.score(doc), product_id), doc.get("version") or 0)
+        self._ranked = sorted(key for key, _ in self._entries.values())
+        self._docs = {product_id: eligible[product_id] for _, product_id in self._ranked[:self.depth]}
+
+    def top(self, limit: int) -> List[str]:
+        return [product_id for _, product_id in self._ranked[:limit]]
+
+    def documents(self, product_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Materialized documents for the given ids, missing ones are left out"""
+        return {product_id: self._docs[product_id] for product_id in product_ids if product_id in self._docs}
+
+    def remember(self, doc: Dict[str, Any]) -> None:
+        """Keep a document fetched by the read path, unless a newer write superseded it"""
+        entry = self._entries.get(doc["id"])
+        if entry is not None and (doc.get("version") or 0) >= entry[1]:
+            self._docs[doc["id"]] = doc
+            if len(self._docs) > 2 * self.depth:
+                self._trim()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ranked": len(self._ranked), "materialized": len(self._docs), "weights": self.weights}
@@ -0,0 +1,49 @@
+# Gunicorn settings for running server:app with uvicorn workers:
+#   gunicorn -c gunicorn.conf.py server:app
+# UvicornWorker picks uvloop and httptools automatically when installed.
+# SIGHUP reloads gracefully: new workers start with fresh code and config,
+# then the old ones finish their in-flight requests and exit.
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get('BIND', '0.0.0.0:8001')
+worker_class = 'uvicorn.workers.UvicornWorker'
+# Each worker keeps its own catalog caches, search/facet/featured/recommendation
+# indexes and listing ETag counter. Only Redis pub/sub (REDIS_URL) tells the
+# other workers about a write, so without it a single worker is the default
+# and more are refused rather than left serving stale catalog data.
+REDIS_URL = os.environ.get('REDIS_URL')
+# Async workers need no more than one per core
+workers = int(os.environ.get('WEB_CONCURRENCY') or (multiprocessing.cpu_count() if REDIS_URL else 1))
+if workers > 1 and not REDIS_URL:
+    raise RuntimeError(f"WEB_CONCURRENCY={workers} requires REDIS_URL, workers share catalog writes through Redis")
+# Seconds a worker may stay silent before it is restarted, and how long
+# draining workers get to finish on reload or shutdown
+timeout = int(os.environ.get('WORKER_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('KEEPALIVE', '5'))
+# Recycle workers now and then, jittered so they don't all restart together
+max_requests = int(os.environ.get('MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+# Each worker imports the app itself, so reloads pick up new code
+preload_app = False
+accesslog = os.environ.get('ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+# Prometheus metrics are summed across workers through files in this directory
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+
+def on_starting(server):
+    if PROMETHEUS_MULTIPROC_DIR:
+        # Leftovers from an earlier run would be counted again
+        shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
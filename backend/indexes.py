@@ -0,0 +1,151 @@
+import logging
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    name: str
+    keys: List[Tuple[str, int]]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None  # Makes it a TTL index
+
+
+# How long raw status check buckets are kept
+STATUS_RETENTION_SECONDS = int(float(os.environ.get('STATUS_RETENTION_DAYS', '30')) * 86400)
+
+# MongoDB error code for an existing index with the same name but other options
+INDEX_OPTIONS_CONFLICT = 85
+
+
+class QueryShape(NamedTuple):
+    """A query an endpoint issues, checked with explain() to make sure it uses an index"""
+    endpoint: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+class CollectionScanError(RuntimeError):
+    pass
+
+
+# Indexes each hot query shape needs
+INDEXES = [
+    # get_product, update_product, delete_product
+    IndexSpec("products", "id_unique", [("id", ASCENDING)], unique=True),
+    # get_products_by_category, get_products filtered by category and/or status
+    IndexSpec("products", "category_status_rating",
+              [("category", ASCENDING), ("status", ASCENDING), ("rating", DESCENDING)]),
+    # get_products filtered by status only
+    IndexSpec("products", "status_rating", [("status", ASCENDING), ("rating", DESCENDING)]),
+    # get_products keyset pagination orders
+    IndexSpec("products", "created_at_id", [("created_at", ASCENDING), ("id", ASCENDING)]),
+    IndexSpec("products", "price_id", [("price", ASCENDING), ("id", ASCENDING)]),
+    IndexSpec("products", "rating_id", [("rating", ASCENDING), ("id", ASCENDING)]),
+    # get_products?in_stock=
+    IndexSpec("products", "stock_quantity", [("stock_quantity", ASCENDING)]),
+    # get_products?price_min/price_max, both $or branches: discount_price in range,
+    # or no discount_price and price in range
+    IndexSpec("products", "discount_price_price", [("discount_price", ASCENDING), ("price", ASCENDING)]),
+    # get_products?tags= (multikey)
+    IndexSpec("products", "tags", [("tags", ASCENDING)]),
+    # create_status_check upserts, get_status_checks?client_name
+    IndexSpec("status_buckets", "client_name_bucket_seq",
+              [("client_name", ASCENDING), ("bucket", DESCENDING), ("seq", ASCENDING)], unique=True),
+    # get_status_checks, and expiry of old buckets
+    IndexSpec("status_buckets", "bucket_ttl", [("bucket", DESCENDING)],
+              expire_after_seconds=STATUS_RETENTION_SECONDS),
+    # get_status_rollup
+    IndexSpec("status_clients", "client_name", [("client_name", ASCENDING)], unique=True),
+    IndexSpec("status_clients", "last_seen", [("last_seen", DESCENDING)]),
+]
+
+# Indexes dropped before the declared ones are created, as (collection, name)
+OBSOLETE_INDEXES = [
+    # Unique per period, which left no room for overflow buckets
+    ("status_buckets", "client_name_bucket"),
+]
+
+QUERY_SHAPES = [
+    QueryShape("get_product", "products", {"id": "premium-resistance-bands"}),
+    QueryShape("get_products_by_category", "products", {"category": "equipment", "status": "active"}),
+    QueryShape("get_products?category", "products", {"category": "equipment"}),
+    QueryShape("get_products?status", "products", {"status": "active"}),
+    QueryShape("get_products?sort=created_at", "products", {},
+               [("created_at", ASCENDING), ("id", ASCENDING)]),
+    QueryShape("get_products?sort=price", "products", {}, [("price", ASCENDING), ("id", ASCENDING)]),
+    QueryShape("get_products?sort=rating", "products", {}, [("rating", ASCENDING), ("id", ASCENDING)]),
+    QueryShape("get_products?tags", "products", {"tags": {"$all": ["resistance"]}}),
+    QueryShape("get_products?min_rating", "products", {"rating": {"$gte": 4.0}}),
+    QueryShape("get_products?in_stock=true", "products", {"stock_quantity": {"$gt": 0}}),
+    QueryShape("get_products?in_stock=false", "products", {"stock_quantity": {"$lte": 0}}),
+    QueryShape("get_products?price_min&price_max", "products", {"$or": [
+        {"discount_price": {"$gte": 20.0, "$lte": 100.0}},
+        {"discount_price": None, "price": {"$gte": 20.0, "$lte": 100.0}},
+    ]}),
+    QueryShape("get_status_checks", "status_buckets", {}, [("bucket", DESCENDING)]),
+    QueryShape("get_status_checks?client_name", "status_buckets", {"client_name": "monitor"},
+               [("bucket", DESCENDING)]),
+    QueryShape("get_status_rollup", "status_clients", {}, [("last_seen", DESCENDING)]),
+]
+
+
+async def ensure_indexes(db, indexes: Iterable[IndexSpec] = INDEXES) -> List[str]:
+    """Create the declared indexes. Existing identical indexes are left untouched.
+
+    A TTL index whose retention changed is updated in place with collMod.
+    Indexes listed in OBSOLETE_INDEXES are dropped first.
+    """
+    for collection, name in OBSOLETE_INDEXES:
+        if name in await db[collection].index_information():
+            await db[collection].drop_index(name)
+            logger.info(f"Dropped obsolete index {collection}.{name}")
+    created = []
+    for spec in indexes:
+        options = {"name": spec.name, "unique": spec.unique}
+        if spec.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = spec.expire_after_seconds
+        try:
+            name = await db[spec.collection].create_index(spec.keys, **options)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT or spec.expire_after_seconds is None:
+                raise
+            await db.command("collMod", spec.collection,
+                             index={"name": spec.name, "expireAfterSeconds": spec.expire_after_seconds})
+            name = spec.name
+        created.append(f"{spec.collection}.{name}")
+    logger.info(f"Ensured {len(created)} indexes: {', '.join(created)}")
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> Iterable[str]:
+    yield plan.get("stage", "")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+async def check_query_plans(db, shapes: Iterable[QueryShape] = QUERY_SHAPES) -> Dict[str, List[str]]:
+    """Explain every registered query shape, raising CollectionScanError on any COLLSCAN"""
+    plans = {}
+    offenders = []
+    for shape in shapes:
+        cursor = db[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explain = await cursor.explain()
+        stages = list(_plan_stages(explain["queryPlanner"]["winningPlan"]))
+        plans[shape.endpoint] = stages
+        if "COLLSCAN" in stages:
+            offenders.append(f"{shape.endpoint} ({shape.collection} {shape.filter})")
+    if offenders:
+        raise CollectionScanError(f"Queries fell back to a collection scan: {'; '.join(offenders)}")
+    return plans
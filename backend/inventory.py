@@ -0,0 +1,141 @@
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from conditional import mongo_utcnow
+
+# Set on products that reserve() sold out, so release() only reactivates those and
+# leaves an out_of_stock set by an admin alone
+SOLD_OUT_BY_RESERVE = "sold_out_by_reserve"
+
+# Called with (product_id, before, after) for every document changed
+OnWrite = Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], Awaitable[Any]]
+
+
+class ProductNotFound(LookupError):
+    def __init__(self, product_id: str):
+        super().__init__(f"Product not found: {product_id}")
+        self.product_id = product_id
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id: str, requested: int, available: int):
+        super().__init__(f"Only {available} of {product_id} in stock, {requested} requested")
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+async def _set_status(collection, filter_dict: Dict[str, Any], status: str, now: datetime,
+                      on_write: OnWrite) -> bool:
+    # reserve() sets the marker as it sells a product out, release() clears it as it reactivates
+    sold_out = status == "out_of_stock"
+    update: Dict[str, Any] = {"$set": {"status": status, "updated_at": now}, "$inc": {"version": 1}}
+    if sold_out:
+        update["$set"][SOLD_OUT_BY_RESERVE] = True
+    else:
+        update["$unset"] = {SOLD_OUT_BY_RESERVE: ""}
+    before = await collection.find_one_and_update(
+        filter_dict,
+        update,
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is not None:
+        after = {**before, "status": status, "updated_at": now, "version": (before.get("version") or 0) + 1}
+        if sold_out:
+            after[SOLD_OUT_BY_RESERVE] = True
+        else:
+            after.pop(SOLD_OUT_BY_RESERVE, None)
+        await on_write(before["id"], before, after)
+    return before is not None
+
+
+async def _adjust(collection, product_id: str, delta: int, guard: Dict[str, Any], now: datetime,
+                  on_write: OnWrite) -> Optional[Dict[str, Any]]:
+    before = await collection.find_one_and_update(
+        {"id": product_id, **guard},
+        {"$inc": {"stock_quantity": delta, "version": 1}, "$set": {"updated_at": now}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if before is None:
+        return None
+    after = {
+        **before,
+        "stock_quantity": (before.get("stock_quantity") or 0) + delta,
+        "version": (before.get("version") or 0) + 1,
+        "updated_at": now,
+    }
+    await on_write(product_id, before, after)
+    return after
+
+
+async def reserve(collection, product_id: str, quantity: int, on_write: OnWrite) -> Dict[str, Any]:
+    """Take `quantity` units of stock in one conditional $inc, never going below zero.
+
+    Active products that sell out are flipped to out_of_stock. Raises
+    ProductNotFound or InsufficientStock, and returns the updated document.
+    """
+    now = mongo_utcnow()
+    after = await _adjust(collection, product_id, -quantity, {"stock_quantity": {"$gte": quantity}},
+                          now, on_write)
+    if after is None:
+        current = await collection.find_one({"id": product_id}, {"_id": 0, "stock_quantity": 1})
+        if current is None:
+            raise ProductNotFound(product_id)
+        raise InsufficientStock(product_id, quantity, current.get("stock_quantity") or 0)
+    if after["stock_quantity"] <= 0 and after.get("status") == "active":
+        # Guarded on the stock so a release landing in between keeps it active
+        if await _set_status(collection, {"id": product_id, "stock_quantity": {"$lte": 0}, "status": "active"},
+                             "out_of_stock", now, on_write):
+            after = {**after, "status": "out_of_stock", "version": after["version"] + 1}
+    return after
+
+
+async def release(collection, product_id: str, quantity: int, on_write: OnWrite) -> Dict[str, Any]:
+    """Return `quantity` units to stock. Raises ProductNotFound.
+
+    A product that reserve() sold out is reactivated; one an admin marked
+    out_of_stock stays that way.
+    """
+    now = mongo_utcnow()
+    after = await _adjust(collection, product_id, quantity, {}, now, on_write)
+    if after is None:
+        raise ProductNotFound(product_id)
+    if after["stock_quantity"] > 0 and after.get("status") == "out_of_stock" and after.get(SOLD_OUT_BY_RESERVE):
+        if await _set_status(collection, {"id": product_id, "stock_quantity": {"$gt": 0}, "status": "out_of_stock",
+                                          SOLD_OUT_BY_RESERVE: True},
+                             "active", now, on_write):
+            after = {**after, "status": "active", "version": after["version"] + 1}
+    return after
+
+
+def merge_items(items: Iterable[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    """Sum quantities per product, keeping first-seen order"""
+    merged: Dict[str, int] = {}
+    for product_id, quantity in items:
+        merged[product_id] = merged.get(product_id, 0) + quantity
+    return list(merged.items())
+
+
+async def reserve_many(collection, items: Iterable[Tuple[str, int]], on_write: OnWrite) -> List[Dict[str, Any]]:
+    """Reserve every item or none of them.
+
+    Items are reserved one by one; if one fails, the ones already taken are
+    released again before the error is raised.
+    """
+    reserved = []
+    try:
+        for product_id, quantity in merge_items(items):
+            reserved.append((await reserve(collection, product_id, quantity, on_write), quantity))
+    except (ProductNotFound, InsufficientStock):
+        for doc, quantity in reversed(reserved):
+            try:
+                await release(collection, doc["id"], quantity, on_write)
+            except ProductNotFound:
+                # Deleted meanwhile, there is no stock left to give back
+                pass
+        raise
+    return [doc for doc, _ in reserved]
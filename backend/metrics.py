@@ -0,0 +1,158 @@
+import os
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, SummaryMetricFamily
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Route label for requests no route matched, so unknown paths can't blow up label cardinality
+UNMATCHED = "unmatched"
+
+
+class HTTPMetrics:
+    """Request count, latency and response size per method and route template"""
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY, enabled: bool = True):
+        self.enabled = enabled
+        self.requests = Counter("http_requests_total", "HTTP requests handled",
+                                ["method", "route", "status"], registry=registry)
+        self.latency = Histogram("http_request_duration_seconds", "Time to the end of the response body",
+                                 ["method", "route"], buckets=LATENCY_BUCKETS, registry=registry)
+        self.response_size = Histogram("http_response_size_bytes", "Response body size",
+                                       ["method", "route"], buckets=SIZE_BUCKETS, registry=registry)
+        self.in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled",
+                               registry=registry, multiprocess_mode="livesum")
+        # Resolving label children costs more than observing them, so they are kept
+        self._children: Dict[Tuple[str, str, int], tuple] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                self.requests.labels(method, route, str(status)),
+                self.latency.labels(method, route),
+                self.response_size.labels(method, route),
+            )
+        requests, latency, response_size = children
+        requests.inc()
+        latency.observe(seconds)
+        response_size.observe(size)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording HTTPMetrics for every HTTP request.
+
+    The route template ("/api/products/{product_id}") is read from the scope
+    after routing, which FastAPI fills in for the matched route.
+    """
+
+    def __init__(self, app, metrics: HTTPMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        metrics = self.metrics
+        if scope["type"] != "http" or not metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.in_flight.dec()
+            route = scope.get("route")
+            metrics.observe(scope["method"], getattr(route, "path", UNMATCHED), status,
+                            time.perf_counter() - start, size)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Duration of every MongoDB command per command name and collection.
+
+    Helpers map onto commands: find_one and find are `find`, insert_one and
+    insert_many are `insert`, update_one is `update` and so on.
+    """
+
+    def __init__(self, registry: CollectorRegistry = REGISTRY, enabled: bool = True):
+        self.enabled = enabled
+        self.duration = Histogram("mongodb_command_duration_seconds", "MongoDB command round-trip time",
+                                  ["command", "collection"], buckets=MONGO_BUCKETS, registry=registry)
+        self.failures = Counter("mongodb_command_failures_total", "MongoDB commands that failed",
+                                ["command", "collection"], registry=registry)
+        # Collection of each command in flight; single dict operations are atomic
+        # under the GIL, so the driver threads need no lock here
+        self._pending: Dict[Tuple[int, tuple], str] = {}
+
+    def started(self, event):
+        if not self.enabled:
+            return
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        else:
+            collection = event.command.get(event.command_name)
+        self._pending[(event.request_id, event.connection_id)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event):
+        collection = self._pending.pop((event.request_id, event.connection_id), None)
+        if collection is not None:
+            self.duration.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._pending.pop((event.request_id, event.connection_id), None)
+        if collection is not None:
+            self.duration.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+            self.failures.labels(event.command_name, collection).inc()
+
+
+class PoolCollector:
+    """Exposes a mongo_pool.PoolMetrics as connection gauges and checkout counters"""
+
+    def __init__(self, pool_metrics):
+        self.pool_metrics = pool_metrics
+
+    def collect(self):
+        stats = self.pool_metrics.stats()
+        yield GaugeMetricFamily("mongodb_pool_connections_open", "Connections open in the pool", value=stats["open"])
+        yield GaugeMetricFamily("mongodb_pool_connections_in_use", "Connections checked out of the pool",
+                                value=stats["in_use"])
+        yield SummaryMetricFamily("mongodb_pool_checkout_wait_seconds", "Time spent waiting for a connection",
+                                  count_value=self.pool_metrics.checkouts, sum_value=self.pool_metrics.wait_total)
+        failures = CounterMetricFamily("mongodb_pool_checkout_failures", "Failed connection checkouts",
+                                       labels=["reason"])
+        for reason, count in stats["checkout_failures"].items():
+            failures.add_metric([reason], count)
+        yield failures
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus exposition of the process registry, or of all workers in multiprocess mode.
+
+    With PROMETHEUS_MULTIPROC_DIR set, HTTP and command metrics are summed
+    across workers; collectors like PoolCollector are per process and left out.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Mapping, Optional
+
+from pymongo import monitoring
+
+# Pool options read from the environment, passed to the client only when set
+# so anything not configured keeps the driver default (or the URL's value)
+POOL_OPTIONS = {
+    'MONGO_MAX_POOL_SIZE': ('maxPoolSize', int),
+    'MONGO_MIN_POOL_SIZE': ('minPoolSize', int),
+    'MONGO_MAX_IDLE_TIME_MS': ('maxIdleTimeMS', int),
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': ('waitQueueTimeoutMS', int),
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': ('serverSelectionTimeoutMS', int),
+    'MONGO_CONNECT_TIMEOUT_MS': ('connectTimeoutMS', int),
+    # "zstd,snappy,zlib": zstd and snappy need the zstandard/python-snappy packages
+    'MONGO_COMPRESSORS': ('compressors', str),
+}
+
+
+def client_options(environ: Mapping[str, str]) -> Dict[str, Any]:
+    """AsyncIOMotorClient keyword arguments for the MONGO_* pool settings present in `environ`"""
+    options = {}
+    for env_name, (option, parse) in POOL_OPTIONS.items():
+        value = environ.get(env_name, '').strip()
+        if value:
+            options[option] = parse(value)
+    return options
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool saturation, collected from the driver's CMAP events.
+
+    Tracks open and checked out connections per server, how long operations
+    waited to check a connection out, and checkouts that failed (typically
+    waitQueueTimeoutMS expiring on an exhausted pool). Events arrive on the
+    driver's worker threads, hence the lock.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._waits = deque(maxlen=window)  # Most recent checkout waits, in seconds
+        self.open: Dict[str, int] = {}
+        self.in_use: Dict[str, int] = {}
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.pools_cleared = 0
+
+    @staticmethod
+    def _address(event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def _adjust(self, counts: Dict[str, int], event, delta: int) -> None:
+        address = self._address(event)
+        counts[address] = max(0, counts.get(address, 0) + delta)
+
+    def _wait(self) -> Optional[float]:
+        # Check out started and finished are reported on the same thread
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return None if started is None else time.perf_counter() - started
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.open.pop(self._address(event), None)
+            self.in_use.pop(self._address(event), None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._adjust(self.open, event, 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._adjust(self.open, event, -1)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._wait()
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        wait = self._wait()
+        with self._lock:
+            self.checkouts += 1
+            self._adjust(self.in_use, event, 1)
+            self.max_in_use = max(self.max_in_use, sum(self.in_use.values()))
+            if wait is not None:
+                self._waits.append(wait)
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._adjust(self.in_use, event, -1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            in_use = sum(self.in_use.values())
+            open_connections = sum(self.open.values())
+
+            def pct(p):
+                return round(waits[min(len(waits) - 1, int(p / 100 * len(waits)))] * 1000, 3) if waits else 0.0
+
+            return {
+                "open": open_connections,
+                "in_use": in_use,
+                "idle": max(0, open_connections - in_use),
+                "max_in_use": self.max_in_use,
+                "servers": {address: {"open": count, "in_use": self.in_use.get(address, 0)}
+                            for address, count in self.open.items()},
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_ms": {
+                    "mean": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    "p50": pct(50),
+                    "p99": pct(99),
+                    "max": round(self.wait_max * 1000, 3),
+                },
+                "pools_cleared": self.pools_cleared,
+            }
@@ -0,0 +1,41 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+
+# Cursors are opaque to clients: urlsafe base64 of the sort spec plus the sort
+# key and id of the last item on the previous page.
+def encode_cursor(sort: str, order: str, value: Any, last_id: str) -> str:
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    payload = json.dumps({"s": sort, "o": order, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = payload["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$date"])
+        return {"sort": payload["s"], "order": payload["o"], "value": value, "id": payload["id"]}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_sort(sort: str, order: str) -> List[Tuple[str, int]]:
+    # `id` breaks ties so the order is total and pages never overlap
+    direction = 1 if order == "asc" else -1
+    return [(sort, direction), ("id", direction)]
+
+
+def keyset_filter(sort: str, order: str, value: Any, last_id: str) -> Dict[str, Any]:
+    """Match documents strictly after (value, last_id) in the given sort order"""
+    op = "$gt" if order == "asc" else "$lt"
+    return {"$or": [
+        {sort: {op: value}},
+        {sort: value, "id": {op: last_id}},
+    ]}
@@ -0,0 +1,244 @@
+import contextvars
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import structlog
+
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+except ImportError:  # pyinstrument is optional, traces fall back to cProfile
+    InstrumentProfiler = None
+
+from fastapi.routing import APIRoute
+
+# Phases a request is split into, in Server-Timing order. Time spent in none
+# of them (routing, dependencies, cache lookups) is reported as `other`.
+PHASES = ("db", "build", "validate", "encode")
+
+_current: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar("request_profile", default=None)
+_NOOP = nullcontext()
+
+logger = structlog.wrap_logger(
+    logging.getLogger(__name__),
+    processors=[structlog.processors.TimeStamper(fmt="iso"), structlog.processors.JSONRenderer()],
+)
+
+
+class RequestProfile:
+    __slots__ = ("phases",)
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+class _Phase:
+    __slots__ = ("profile", "name", "start")
+
+    def __init__(self, profile: RequestProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profile.add(self.name, time.perf_counter() - self.start)
+
+
+def phase(name: str):
+    """Time the enclosed block as `name` for the current request, a no-op unless profiling.
+
+    Phases should not nest, nested time would be counted twice.
+    """
+    profile = _current.get()
+    return _NOOP if profile is None else _Phase(profile, name)
+
+
+class _TimedField:
+    """Response field proxy timing FastAPI's response validation and serialization"""
+
+    def __init__(self, field):
+        self._field = field
+
+    def __getattr__(self, name):
+        return getattr(self._field, name)
+
+    def validate(self, *args, **kwargs):
+        with phase("validate"):
+            return self._field.validate(*args, **kwargs)
+
+    def serialize(self, *args, **kwargs):
+        with phase("encode"):
+            return self._field.serialize(*args, **kwargs)
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute whose response_model validation shows up as its own phase"""
+
+    def get_route_handler(self):
+        if self.secure_cloned_response_field is not None:
+            self.secure_cloned_response_field = _TimedField(self.secure_cloned_response_field)
+        return super().get_route_handler()
+
+
+class RequestProfiler:
+    """Per-request phase timings, and traces of slow requests.
+
+    When enabled, every HTTP request gets a Server-Timing header with its
+    phase durations. Requests slower than `slow_ms` are logged as one JSON
+    line. A `sample_rate` fraction of requests also runs under a profiler
+    (pyinstrument if installed and asked for, cProfile otherwise); those that
+    turn out slow are written to `trace_dir`, up to `max_traces` files. Only
+    one request is traced at a time, and a cProfile trace also contains
+    whatever other requests ran on the event loop meanwhile.
+
+    Settings are plain attributes so they can be changed while running.
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = 200.0, sample_rate: float = 0.0,
+                 trace_dir: str = "/tmp/catalog-profiles", trace_format: str = "cprofile",
+                 max_traces: int = 100, server_timing: bool = True):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        self.trace_dir = trace_dir
+        self.trace_format = trace_format
+        self.max_traces = max_traces
+        self.server_timing = server_timing
+        self._tracing = False
+        self.profiled = 0
+        self.slow = 0
+        self.traces_written = 0
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "sample_rate": self.sample_rate,
+            "trace_dir": self.trace_dir,
+            "trace_format": self.trace_format,
+            "max_traces": self.max_traces,
+            "server_timing": self.server_timing,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"profiled": self.profiled, "slow": self.slow, "traces_written": self.traces_written}
+
+    def _start_trace(self):
+        if (self._tracing or self.sample_rate <= 0 or self.traces_written >= self.max_traces
+                or random.random() >= self.sample_rate):
+            return None
+        self._tracing = True
+        if self.trace_format == "pyinstrument" and InstrumentProfiler is not None:
+            tracer = InstrumentProfiler(async_mode="enabled")
+            tracer.start()
+        else:
+            tracer = cProfile.Profile()
+            tracer.enable()
+        return tracer
+
+    def _stop_trace(self, tracer, slow: bool, method: str, route: str, total_ms: float) -> Optional[str]:
+        self._tracing = False
+        if isinstance(tracer, cProfile.Profile):
+            tracer.disable()
+        else:
+            tracer.stop()
+        if not slow:
+            return None
+        os.makedirs(self.trace_dir, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", route).strip("_") or "root"
+        path = os.path.join(self.trace_dir, f"{stamp}-{method}-{name}-{total_ms:.0f}ms")
+        if isinstance(tracer, cProfile.Profile):
+            path += ".prof"
+            tracer.dump_stats(path)
+        else:
+            path += ".html"
+            with open(path, "w") as f:
+                f.write(tracer.output_html())
+        self.traces_written += 1
+        return path
+
+    def finish(self, profile: RequestProfile, total: float, method: str, route: str, status: int,
+               tracer=None) -> None:
+        total_ms = total * 1000
+        slow = total_ms >= self.slow_ms
+        self.profiled += 1
+        trace = None
+        if tracer is not None:
+            try:
+                trace = self._stop_trace(tracer, slow, method, route, total_ms)
+            except OSError as e:
+                logger.warning("profile_trace_failed", error=str(e))
+        if slow:
+            self.slow += 1
+            logger.warning(
+                "slow_request", method=method, route=route, status=status, total_ms=round(total_ms, 3),
+                phases_ms={name: round(seconds * 1000, 3) for name, seconds in profile.phases.items()},
+                trace=trace,
+            )
+
+
+def server_timing(profile: RequestProfile, total: float) -> bytes:
+    parts = []
+    accounted = 0.0
+    for name in PHASES:
+        seconds = profile.phases.get(name)
+        if seconds is not None:
+            accounted += seconds
+            parts.append(f"{name};dur={seconds * 1000:.3f}")
+    parts.append(f"other;dur={max(0.0, total - accounted) * 1000:.3f}")
+    parts.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running each HTTP request under a RequestProfile when the profiler is enabled.
+
+    Server-Timing is added to the response headers, so it covers the time up
+    to the start of the response; the logged total runs to its last byte.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profiler.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(profile, time.perf_counter() - start)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        tracer = profiler._start_trace()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            profiler.finish(profile, time.perf_counter() - start, scope["method"],
+                            getattr(route, "path", scope["path"]), status, tracer)
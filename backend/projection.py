@@ -0,0 +1,58 @@
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+
+class FieldSelection(NamedTuple):
+    """Parsed `fields=` query parameter. `names` is None for the full document."""
+    preset: Optional[str]
+    names: Optional[Tuple[str, ...]]
+
+    @property
+    def token(self) -> Optional[str]:
+        """Stable cache key component"""
+        if self.preset:
+            return self.preset
+        return ",".join(self.names) if self.names else None
+
+    def projection(self, extra: Iterable[str] = ()) -> Dict[str, Any]:
+        projection: Dict[str, Any] = {"_id": 0}
+        if self.names is None:
+            return projection
+        for name in (*self.names, *extra):
+            projection[name] = 1
+        if self.preset == "card":
+            # Grid views only render the first image
+            projection["images"] = {"$slice": 1}
+        return projection
+
+    def apply(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """The same projection applied to a document already in memory"""
+        if self.names is None:
+            return doc
+        picked = {name: doc[name] for name in self.names if name in doc}
+        if self.preset == "card" and "images" in picked:
+            picked["images"] = picked["images"][:1]
+        return picked
+
+
+FULL_DOCUMENT = FieldSelection(None, None)
+
+FIELD_PRESETS = {
+    "card": FieldSelection("card", ("id", "name", "price", "discount_price", "images")),
+    "detail": FULL_DOCUMENT,
+}
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> FieldSelection:
+    """Parse a preset name or a comma separated list of top-level fields.
+
+    Raises ValueError for unknown field names. `id` is always included.
+    """
+    if not fields:
+        return FULL_DOCUMENT
+    if fields in FIELD_PRESETS:
+        return FIELD_PRESETS[fields]
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return FieldSelection(None, tuple(sorted(names | {"id"})))
@@ -0,0 +1,157 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Weight of each kind of shared attribute between two products
+FEATURE_WEIGHTS = {"subcategory": 2.0, "tag": 1.0, "skill_level": 0.5}
+# Weight of an explicit bundle_suggestions link, from the product and towards it
+BUNDLE_WEIGHT = 5.0
+REVERSE_BUNDLE_WEIGHT = 3.0
+
+Feature = Tuple[str, str]
+
+
+def _features(doc: Dict[str, Any]) -> Set[Feature]:
+    features = {("tag", tag) for tag in doc.get("tags") or []}
+    features.update(("skill_level", level) for level in doc.get("skill_levels") or [])
+    if doc.get("subcategory"):
+        features.add(("subcategory", doc["subcategory"]))
+    return features
+
+
+def _summary(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc["id"],
+        "name": doc.get("name"),
+        "price": doc.get("price"),
+        "discount_price": doc.get("discount_price"),
+        "category": getattr(doc.get("category"), "value", doc.get("category")),
+        "status": getattr(doc.get("status"), "value", doc.get("status")),
+        "image": (doc.get("images") or [None])[0],
+    }
+
+
+class RecommendationIndex:
+    """Product adjacency built from bundle_suggestions plus shared tags,
+    subcategory and skill levels.
+
+    The graph and the attribute postings are built at startup and updated on
+    every write. Each product's ranked neighbor list is computed on first use
+    and kept until a write touches a product it could include, so repeated
+    lookups are a dict read and a slice. Writes bump a counter per attribute
+    instead of walking everything that shares it; a cached list is reused
+    while the counters of its product's attributes are unchanged.
+    Candidates are drawn from at most `max_candidates` products per shared
+    attribute so very common tags don't make a lookup scan the catalog.
+    """
+
+    def __init__(self, max_neighbors: int = 20, max_candidates: int = 200):
+        self.max_neighbors = max_neighbors
+        self.max_candidates = max_candidates
+        self._reset()
+
+    def _reset(self) -> None:
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.features: Dict[str, Set[Feature]] = {}
+        self.postings: Dict[Feature, Dict[str, None]] = defaultdict(dict)
+        self.bundles: Dict[str, List[str]] = {}
+        self.bundled_by: Dict[str, Set[str]] = defaultdict(set)
+        self._epochs: Dict[Feature, int] = defaultdict(int)
+        # product id -> (attribute counters when ranked, ranked neighbors)
+        self._neighbors: Dict[str, Tuple[Tuple[int, ...], List[Tuple[float, str, Tuple[str, ...]]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.summaries)
+
+    def _invalidate(self, product_id: str) -> None:
+        """Expire every neighbor list that could include `product_id`"""
+        for other in (product_id, *self.bundles.get(product_id, ()), *self.bundled_by.get(product_id, ())):
+            self._neighbors.pop(other, None)
+        for feature in self.features.get(product_id, ()):
+            self._epochs[feature] += 1
+
+    def _stamp(self, product_id: str) -> Tuple[int, ...]:
+        return tuple(self._epochs[feature] for feature in sorted(self.features[product_id]))
+
+    def remove(self, product_id: str) -> None:
+        if product_id not in self.summaries:
+            return
+        self._invalidate(product_id)
+        for feature in self.features.pop(product_id):
+            postings = self.postings[feature]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[feature]
+        for target in self.bundles.pop(product_id):
+            self.bundled_by[target].discard(product_id)
+        del self.summaries[product_id]
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        self.remove(doc["id"])
+        self._index(doc)
+        self._invalidate(doc["id"])
+
+    def _index(self, doc: Dict[str, Any]) -> None:
+        product_id = doc["id"]
+        self.summaries[product_id] = _summary(doc)
+        self.features[product_id] = _features(doc)
+        for feature in self.features[product_id]:
+            self.postings[feature][product_id] = None
+        self.bundles[product_id] = [target for target in doc.get("bundle_suggestions") or [] if target != product_id]
+        for target in self.bundles[product_id]:
+            self.bundled_by[target].add(product_id)
+
+    def build(self, docs) -> None:
+        self._reset()
+        for doc in docs:
+            self._index(doc)
+
+    def _rank(self, product_id: str) -> List[Tuple[float, str, Tuple[str, ...]]]:
+        features = self.features[product_id]
+        bundles = set(self.bundles[product_id])
+        bundled_by = self.bundled_by.get(product_id, set())
+        candidates = (bundles | bundled_by) & self.summaries.keys()
+        for feature in features:
+            candidates.update(islice(self.postings[feature], self.max_candidates))
+        candidates.discard(product_id)
+
+        ranked = []
+        for other in candidates:
+            if self.summaries[other]["status"] != "active":
+                continue
+            score = 0.0
+            reasons = []
+            if other in bundles:
+                score += BUNDLE_WEIGHT
+                reasons.append("bundle")
+            if other in bundled_by:
+                score += REVERSE_BUNDLE_WEIGHT
+                reasons.append("bundled_with")
+            kinds = set()
+            for kind, _ in features & self.features[other]:
+                score += FEATURE_WEIGHTS[kind]
+                kinds.add(kind)
+            reasons.extend(kind for kind in FEATURE_WEIGHTS if kind in kinds)
+            ranked.append((score, other, tuple(reasons)))
+        return heapq.nlargest(self.max_neighbors, ranked, key=lambda item: (item[0], item[1]))
+
+    def recommend(self, product_id: str, limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Ranked related products, or None if the product is unknown"""
+        if product_id not in self.summaries:
+            return None
+        stamp = self._stamp(product_id)
+        cached = self._neighbors.get(product_id)
+        if cached is not None and cached[0] == stamp:
+            neighbors = cached[1]
+        else:
+            neighbors = self._rank(product_id)
+            self._neighbors[product_id] = (stamp, neighbors)
+        return [
+            {**self.summaries[other], "score": score, "reasons": list(reasons)}
+            for score, other, reasons in neighbors[:limit]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"products": len(self.summaries), "cached_lists": len(self._neighbors),
+                "bundle_links": sum(len(targets) for targets in self.bundles.values())}
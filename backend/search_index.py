@@ -0,0 +1,210 @@
+import bisect
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Per-field weights applied to term frequencies (BM25F style)
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "tags": 2.0,
+    "features": 1.5,
+    "description": 1.0,
+    "long_description": 0.5,
+}
+
+# Stored with each entry so hits can be returned without touching MongoDB
+SUMMARY_FIELDS = ("id", "name", "price", "discount_price", "category", "status")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+class SearchIndex:
+    """In-process inverted index over the product catalog with BM25 ranking.
+
+    The last query term is also matched as a prefix for typeahead. Products
+    are added and removed one at a time as they are written.
+
+    Postings are kept impact-ordered: each term's documents sorted by their
+    BM25 term score, computed lazily after the term changes. A query only
+    reads the top `candidate_depth` entries per term that pass its category
+    and status filters (or `limit`, if larger), which keeps latency flat for
+    very common terms. Entries the filters reject don't count, so a narrow
+    filter reads further down the list. Single-term rankings are exact;
+    multi-term rankings may miss documents outside every term's top entries.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_prefix_terms: int = 50,
+                 candidate_depth: int = 200):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self.candidate_depth = candidate_depth
+        self._reset()
+
+    def _reset(self) -> None:
+        self.postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0.0
+        # Sorted vocabulary for prefix lookups, terms leave it with their last posting
+        self.vocabulary: List[str] = []
+        self._vocabulary_set = set()
+        # term -> [(term score without idf, product id)], best first
+        self._impacts: Dict[str, List[Tuple[float, str]]] = {}
+        self._impacts_avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        product_id = doc["id"]
+        if product_id in self.doc_lengths:
+            self.remove(product_id)
+
+        frequencies: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(doc.get(field))):
+                frequencies[token] += weight
+
+        for term, frequency in frequencies.items():
+            if term not in self._vocabulary_set:
+                self._vocabulary_set.add(term)
+                bisect.insort(self.vocabulary, term)
+            self.postings[term][product_id] = frequency
+            self._impacts.pop(term, None)
+        length = sum(frequencies.values())
+        self.doc_terms[product_id] = list(frequencies)
+        self.doc_lengths[product_id] = length
+        self.total_length += length
+        summary = {field: doc.get(field) for field in SUMMARY_FIELDS}
+        summary["category"] = getattr(summary["category"], "value", summary["category"])
+        summary["status"] = getattr(summary["status"], "value", summary["status"])
+        summary["image"] = (doc.get("images") or [None])[0]
+        self.summaries[product_id] = summary
+
+    def remove(self, product_id: str) -> None:
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings[term]
+            postings.pop(product_id, None)
+            self._impacts.pop(term, None)
+            if not postings:
+                del self.postings[term]
+                self._vocabulary_set.discard(term)
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+        self.total_length -= self.doc_lengths.pop(product_id)
+        del self.summaries[product_id]
+
+    def build(self, docs: Iterable[Dict[str, Any]]) -> None:
+        self._reset()
+        for doc in docs:
+            self.add(doc)
+        # Rank every term up front so the first queries don't pay for it
+        if self.doc_lengths:
+            for term in self.postings:
+                self._term_impacts(term)
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        terms = []
+        vocabulary = self.vocabulary
+        position = bisect.bisect_left(vocabulary, prefix)
+        while position < len(vocabulary) and len(terms) < self.max_prefix_terms:
+            term = vocabulary[position]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+            position += 1
+        return terms
+
+    def _term_impacts(self, term: str) -> List[Tuple[float, str]]:
+        avg_length = self.total_length / len(self.doc_lengths)
+        # Document length normalization drifts as the catalog grows; re-rank
+        # every term once the average length moved noticeably
+        if abs(avg_length - self._impacts_avg_length) > 0.1 * self._impacts_avg_length:
+            self._impacts.clear()
+            self._impacts_avg_length = avg_length
+        impacts = self._impacts.get(term)
+        if impacts is None:
+            k1, b, avg_length = self.k1, self.b, self._impacts_avg_length
+            impacts = sorted(
+                (
+                    (frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * self.doc_lengths[product_id] / avg_length)),
+                     product_id)
+                    for product_id, frequency in self.postings[term].items()
+                ),
+                reverse=True,
+            )
+            self._impacts[term] = impacts
+        return impacts
+
+    def _term_scores(self, term: str, scores: Dict[str, float], depth: int,
+                     accept: Optional[Callable[[str], bool]] = None) -> None:
+        postings = self.postings.get(term)
+        if not postings:
+            return
+        n = len(self.doc_lengths)
+        idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+        taken = 0
+        for impact, product_id in self._term_impacts(term):
+            if accept is not None and not accept(product_id):
+                continue
+            score = idf * impact
+            if score > scores.get(product_id, 0.0):
+                scores[product_id] = score
+            taken += 1
+            if taken >= depth:
+                break
+
+    def _summary_filter(self, category: Optional[str],
+                        status: Optional[str]) -> Optional[Callable[[str], bool]]:
+        if not (category or status):
+            return None
+        summaries = self.summaries
+
+        def matches(product_id: str) -> bool:
+            summary = summaries[product_id]
+            return ((category is None or summary["category"] == category)
+                    and (status is None or summary["status"] == status))
+        return matches
+
+    def search(self, query: str, limit: int = 10, prefix: bool = True,
+               category: Optional[str] = None, status: Optional[str] = "active") -> List[Dict[str, Any]]:
+        tokens = tokenize(query)
+        if not tokens or not self.doc_lengths:
+            return []
+
+        summaries = self.summaries
+        accept = self._summary_filter(category, status)
+        depth = max(self.candidate_depth, limit)
+        totals: Dict[str, float] = defaultdict(float)
+        for position, token in enumerate(tokens):
+            expansions = [token]
+            if prefix and position == len(tokens) - 1:
+                expansions = self._prefix_terms(token)
+            # A product matching several expansions of one token counts once
+            scores: Dict[str, float] = {}
+            for term in expansions:
+                self._term_scores(term, scores, depth, accept)
+            for product_id, score in scores.items():
+                totals[product_id] += score
+
+        best = heapq.nlargest(limit, totals.items(), key=lambda item: item[1])
+        return [{**summaries[product_id], "score": round(score, 4)} for product_id, score in best]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"documents": len(self.doc_lengths), "terms": len(self.postings)}
@@ -1,30 +1,202 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
+import io
+import csv
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, NamedTuple, Union
 import uuid
+import secrets
+import orjson
 from datetime import datetime
 from enum import Enum
 
+from catalog_cache import CatalogCache, product_key, products_key, featured_key, category_key
+from shared_cache import SharedCatalogCache
+from pagination import encode_cursor, decode_cursor, keyset_filter, keyset_sort
+from indexes import ensure_indexes, check_query_plans
+from projection import FieldSelection, parse_fields
+from bulk_import import BulkImporter, parse_json_array, iter_ndjson
+from search_index import SearchIndex
+from facet_index import FacetIndex, ProductFilters
+from singleflight import SingleFlight
+from featured_ranking import FeaturedRanking, parse_score_weights
+from recommendations import RecommendationIndex
+from write_behind import WriteBehindBuffer
+from mongo_pool import PoolMetrics, client_options
+from metrics import HTTPMetrics, MetricsMiddleware, MongoCommandMetrics, PoolCollector, render_metrics
+from prometheus_client import REGISTRY
+from profiling import ProfiledRoute, ProfilingMiddleware, RequestProfiler, phase
+from status_store import migrate_legacy_status_checks, query_status_checks, status_rollup, write_status_checks
+from inventory import (
+    SOLD_OUT_BY_RESERVE, InsufficientStock, ProductNotFound, merge_items, release, reserve, reserve_many,
+)
+from conditional import (
+    CatalogVersion, mongo_utcnow, product_etag, version_from_etag, etag_matches, http_date, not_modified_since,
+)
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection, opened in lifespan(). Pool settings come from MONGO_*
+# variables (see mongo_pool.POOL_OPTIONS), pool events feed mongo_pool_metrics.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+mongo_options = client_options(os.environ)
+mongo_pool_metrics = PoolMetrics()
+client: Optional[AsyncIOMotorClient] = None
+db = None
+
+# Prometheus metrics served from /metrics: per-route request latency and
+# sizes, MongoDB command timings and connection pool usage
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+http_metrics = HTTPMetrics(enabled=METRICS_ENABLED)
+mongo_command_metrics = MongoCommandMetrics(enabled=METRICS_ENABLED)
+REGISTRY.register(PoolCollector(mongo_pool_metrics))
+
+# Opt-in per-request phase timings (Server-Timing header, slow request logs
+# and sampled traces), switchable at runtime through /api/debug/profiling
+request_profiler = RequestProfiler(
+    enabled=os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes'),
+    slow_ms=float(os.environ.get('PROFILING_SLOW_MS', '200')),
+    sample_rate=float(os.environ.get('PROFILING_SAMPLE_RATE', '0')),
+    trace_dir=os.environ.get('PROFILING_DIR', '/tmp/catalog-profiles'),
+    trace_format=os.environ.get('PROFILING_TRACE_FORMAT', 'cprofile'),
+    max_traces=int(os.environ.get('PROFILING_MAX_TRACES', '100')),
+)
+# PUT /api/debug/profiling is refused unless this token is set and sent as X-Admin-Token
+PROFILING_ADMIN_TOKEN = os.environ.get('PROFILING_ADMIN_TOKEN', '')
+# Upper bound on traces kept on disk when changed at runtime
+MAX_PROFILING_TRACES = 1000
+
+def create_mongo_client(url: str) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(url, event_listeners=[mongo_pool_metrics, mongo_command_metrics], **mongo_options)
+
+# In-process cache for catalog reads
+catalog_cache = CatalogCache(
+    max_entries=int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '1024')),
+    ttl_seconds=float(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '300')),
+    stale_seconds=float(os.environ.get('CATALOG_CACHE_STALE_SECONDS', '30')),
+)
+
+# Concurrent identical catalog reads share one database call
+catalog_flights = SingleFlight(enabled=os.environ.get('CATALOG_COALESCE', '1').lower() in ('1', 'true', 'yes'))
+
+# Documents in our own products collection were validated on the way in, so
+# reads can optionally skip building models for them altogether
+TRUST_CATALOG_DOCUMENTS = os.environ.get('TRUST_CATALOG_DOCUMENTS', '').lower() in ('1', 'true', 'yes')
+
+# Bumped on every write, listing ETags are derived from it
+catalog_version = CatalogVersion()
+
+# In-memory indexes over the catalog, built at startup and kept current on writes
+search_index = SearchIndex()
+facet_index = FacetIndex()
+# Homepage featured list, ranked by FEATURED_SCORE_WEIGHTS ("rating:1,review_count:0.5,discount:2")
+featured_ranking = FeaturedRanking(
+    weights=parse_score_weights(os.environ.get('FEATURED_SCORE_WEIGHTS', 'rating:1')),
+    require_in_stock=os.environ.get('FEATURED_REQUIRE_STOCK', '').lower() in ('1', 'true', 'yes'),
+    depth=int(os.environ.get('FEATURED_MATERIALIZED_DEPTH', '100')),
+)
+recommendation_index = RecommendationIndex()
+
+# Status check heartbeats are acknowledged once queued and inserted in batches
+STATUS_WRITE_BEHIND = os.environ.get('STATUS_WRITE_BEHIND', '1').lower() in ('1', 'true', 'yes')
+# Status checks are stored in one document per client per bucket period
+STATUS_BUCKET_SECONDS = int(os.environ.get('STATUS_BUCKET_SECONDS', '60'))
+
+def store_status_checks(docs: List[dict]):
+    return write_status_checks(db, docs, STATUS_BUCKET_SECONDS)
+
+async def migrate_status_checks():
+    """Copy pre-bucket status_checks rows into buckets, in the background so startup doesn't wait"""
+    try:
+        await migrate_legacy_status_checks(db, STATUS_BUCKET_SECONDS, worker=str(os.getpid()))
+    except Exception as e:
+        logger.error(f"Legacy status check migration failed, it resumes on the next start: {e}")
+
+status_writer = WriteBehindBuffer(
+    store_status_checks,
+    max_batch=int(os.environ.get('STATUS_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('STATUS_FLUSH_INTERVAL_MS', '50')) / 1000,
+    max_pending=int(os.environ.get('STATUS_MAX_PENDING', '10000')),
+)
+
+# How long /api/health/ready waits for MongoDB to answer a ping
+READINESS_TIMEOUT_SECONDS = float(os.environ.get('READINESS_TIMEOUT_SECONDS', '2'))
+
+# Upper bound on ids per multi-get request
+MAX_BATCH_IDS = int(os.environ.get('MAX_BATCH_IDS', '100'))
+
+# Cache-Control per endpoint, keyed by cache key kind. `no-cache` lets clients
+# and proxies keep responses but revalidate them with If-None-Match.
+CACHE_CONTROL = {
+    "product": os.environ.get('CACHE_CONTROL_PRODUCT', 'public, no-cache'),
+    "products": os.environ.get('CACHE_CONTROL_PRODUCTS', 'public, no-cache'),
+    "featured": os.environ.get('CACHE_CONTROL_FEATURED', 'public, max-age=60'),
+    "category": os.environ.get('CACHE_CONTROL_CATEGORY', 'public, no-cache'),
+}
+
+# Optional Redis tier shared by all workers
+shared_cache = None
+if os.environ.get('REDIS_URL'):
+    shared_cache = SharedCatalogCache.from_url(
+        os.environ['REDIS_URL'],
+        ttl_seconds=float(os.environ.get('SHARED_CACHE_TTL_SECONDS', '300')),
+    )
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db
+    # Tests and benchmarks may install their own database before starting the app
+    owns_client = db is None
+    if owns_client:
+        client = create_mongo_client(mongo_url)
+        db = client[os.environ['DB_NAME']]
+        try:
+            await warm_up_database()
+        except Exception:
+            client.close()
+            client, db = None, None
+            raise
+    await provision_indexes()
+    await rebuild_product_indexes()
+    start_cache_invalidation_listener()
+    status_migration = asyncio.create_task(migrate_status_checks())
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        # A draining worker fails readiness so probes stop routing to it
+        app.state.ready = False
+        status_migration.cancel()
+        await shutdown_shared_cache()
+        # Buffered heartbeats go out before the connection does
+        await status_writer.close()
+        if owns_client:
+            client.close()
+            client, db = None, None
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=ProfiledRoute)
 
 
 # Define Enums
@@ -39,6 +211,27 @@ class ProductStatus(str, Enum):
     inactive = "inactive"
     out_of_stock = "out_of_stock"
 
+class ProductSort(str, Enum):
+    created_at = "created_at"
+    price = "price"
+    rating = "rating"
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+class TraceFormat(str, Enum):
+    cprofile = "cprofile"
+    pyinstrument = "pyinstrument"
+
+class BulkMode(str, Enum):
+    insert = "insert"
+    upsert = "upsert"
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -49,6 +242,33 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class ProfilingSettings(BaseModel):
+    enabled: bool
+    slow_ms: float
+    sample_rate: float
+    trace_dir: str
+    trace_format: TraceFormat
+    max_traces: int
+    server_timing: bool
+
+class ProfilingSettingsUpdate(BaseModel):
+    enabled: Optional[bool] = None
+    slow_ms: Optional[float] = Field(None, ge=0)
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
+    trace_format: Optional[TraceFormat] = None
+    max_traces: Optional[int] = Field(None, ge=0, le=MAX_PROFILING_TRACES)
+    server_timing: Optional[bool] = None
+
+class StatusCheckPage(BaseModel):
+    items: List[StatusCheck]  # Newest first
+    next_cursor: Optional[str] = None  # Absent on the last page
+
+class StatusClientRollup(BaseModel):
+    client_name: str
+    count: int
+    first_seen: datetime
+    last_seen: datetime
+
 # Product Models
 class Product3DAsset(BaseModel):
     model_url: str  # URL to 3D model file (GLB/GLTF)
@@ -76,12 +296,78 @@ class Product(BaseModel):
     specifications: ProductSpecs
     features: List[str] = []
     tags: List[str] = []
+    subcategory: Optional[str] = None
+    skill_levels: List[str] = []
+    benefits: List[str] = []
+    prerequisites: List[str] = []  # Skills expected before using the product
+    bundle_suggestions: List[str] = []  # Ids of products that go well with this one
     stock_quantity: int = 0
     status: ProductStatus = ProductStatus.active
     rating: float = 0.0
     review_count: int = 0
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    version: int = 0  # Bumped on every update, used for If-Match checks
+    created_at: datetime = Field(default_factory=mongo_utcnow)
+    updated_at: datetime = Field(default_factory=mongo_utcnow)
+
+class ProductCard(BaseModel):
+    """Slim listing shape for grid views (`fields=card`)"""
+    id: str
+    name: str
+    price: float
+    discount_price: Optional[float] = None
+    images: List[str]  # First image only
+
+class SearchHit(BaseModel):
+    id: str
+    name: str
+    price: float
+    discount_price: Optional[float] = None
+    category: ProductCategory
+    status: ProductStatus
+    image: Optional[str] = None
+    score: float
+
+class Recommendation(BaseModel):
+    id: str
+    name: str
+    price: float
+    discount_price: Optional[float] = None
+    category: ProductCategory
+    status: ProductStatus
+    image: Optional[str] = None
+    score: float
+    reasons: List[str]  # bundle, bundled_with, subcategory, tag, skill_level
+
+class ProductPage(BaseModel):
+    items: List[Union[Product, ProductCard, Dict[str, Any]]]
+    next_cursor: Optional[str] = None  # Absent on the last page
+
+class ProductBatch(BaseModel):
+    items: List[Product]  # In the requested order
+    missing: List[str] = []
+
+class ProductBatchRequest(BaseModel):
+    ids: List[str] = Field(..., max_length=MAX_BATCH_IDS)
+
+class StockRequest(BaseModel):
+    quantity: int = Field(1, ge=1)
+
+class StockItem(BaseModel):
+    product_id: str
+    quantity: int = Field(1, ge=1)
+
+class StockBatchRequest(BaseModel):
+    items: List[StockItem] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+class StockLevel(BaseModel):
+    id: str
+    stock_quantity: int
+    status: ProductStatus
+    version: int = 0
+
+class StockBatch(BaseModel):
+    items: List[StockLevel]
+    missing: List[str] = []  # Only reported by release
 
 class ProductCreate(BaseModel):
     name: str
@@ -96,6 +382,11 @@ class ProductCreate(BaseModel):
     specifications: ProductSpecs
     features: List[str] = []
     tags: List[str] = []
+    subcategory: Optional[str] = None
+    skill_levels: List[str] = []
+    benefits: List[str] = []
+    prerequisites: List[str] = []
+    bundle_suggestions: List[str] = []
     stock_quantity: int = 0
     status: ProductStatus = ProductStatus.active
 
@@ -111,106 +402,795 @@ class ProductUpdate(BaseModel):
     specifications: Optional[ProductSpecs] = None
     features: Optional[List[str]] = None
     tags: Optional[List[str]] = None
+    subcategory: Optional[str] = None
+    skill_levels: Optional[List[str]] = None
+    benefits: Optional[List[str]] = None
+    prerequisites: Optional[List[str]] = None
+    bundle_suggestions: Optional[List[str]] = None
     stock_quantity: Optional[int] = None
     status: Optional[ProductStatus] = None
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: Optional[datetime] = None  # Ignored, the server sets it on every update
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "Hello World"}
 
+@api_router.get("/health/live")
+async def liveness():
+    """The worker process is up and serving requests"""
+    return {"status": "alive", "worker": os.getpid()}
+
+@api_router.get("/health/ready")
+async def readiness():
+    """The worker finished startup and MongoDB answers; 503 otherwise, and while shutting down"""
+    worker = os.getpid()
+    if not getattr(app.state, "ready", False):
+        return CatalogJSONResponse(status_code=503, content={"status": "starting", "worker": worker})
+    try:
+        await asyncio.wait_for(db.command("ping"), READINESS_TIMEOUT_SECONDS)
+    except Exception as e:
+        return CatalogJSONResponse(status_code=503, content={"status": "unavailable", "reason": str(e), "worker": worker})
+    return {"status": "ready", "worker": worker}
+
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    if STATUS_WRITE_BEHIND:
+        # Waits only when the buffer is full, i.e. the database is lagging
+        await status_writer.submit(status_obj.dict())
+    else:
+        await store_status_checks([status_obj.dict()])
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.get("/status", response_model=Union[List[StatusCheck], StatusCheckPage])
+async def get_status_checks(
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(1000, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Get status checks, newest first.
+
+    Passing `cursor` (empty for the first page) returns a StatusCheckPage
+    whose `next_cursor` fetches the following page.
+    """
+    after = None
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if ((position["sort"], position["order"]) != ("timestamp", "desc")
+                or not isinstance(position["value"], datetime)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (position["value"], position["id"])
+
+    status_checks = await query_status_checks(
+        db, client_name=client_name, since=since, until=until, limit=limit + 1, after=after,
+        bucket_seconds=STATUS_BUCKET_SECONDS,
+    )
+    if cursor is None:
+        return status_checks[:limit]
+    next_cursor = None
+    if len(status_checks) > limit:
+        status_checks = status_checks[:limit]
+        last = status_checks[-1]
+        next_cursor = encode_cursor("timestamp", "desc", last["timestamp"], last["id"])
+    return StatusCheckPage(items=status_checks, next_cursor=next_cursor)
+
+@api_router.get("/status/rollup", response_model=List[StatusClientRollup])
+async def get_status_rollup(client_name: Optional[str] = None, limit: int = Query(1000, ge=1, le=10000)):
+    """Get per-client heartbeat counts and first/last seen times from the rollup collection"""
+    return await status_rollup(db, client_name=client_name, limit=limit)
+
+# Catalog read/write helpers
+
+def _orjson_default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError
+
+def render_json(content) -> bytes:
+    # orjson handles datetimes and str enums natively; models are dumped once
+    return orjson.dumps(content, default=_orjson_default)
+
+class CatalogJSONResponse(Response):
+    """JSON response rendered with orjson, also accepting pre-rendered bytes"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return render_json(content)
+
+async def cached_read(request: Request, cache_key, load) -> Response:
+    """Serve a catalog read from the in-process cache, then Redis, then MongoDB.
+
+    Listing ETags only depend on the catalog version and the query, so a
+    matching If-None-Match is answered before any cache or database lookup.
+    Concurrent misses for the same key share one fill, and an entry that
+    just expired is served stale while one refresh runs in the background.
+    """
+    headers = {"ETag": catalog_version.etag(cache_key), "Cache-Control": CACHE_CONTROL[cache_key[0]]}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    # Writes bump the version, so reads arriving after one start a new fill
+    flight_key = (cache_key, catalog_version.counter)
+    body, stale = catalog_cache.lookup(cache_key)
+    if body is None:
+        body = await catalog_flights.do(flight_key, lambda: fill_cache(cache_key, load))
+    elif stale:
+        catalog_flights.start(flight_key, lambda: fill_cache(cache_key, load))
+    return CatalogJSONResponse(content=body, headers=headers)
+
+async def fill_cache(cache_key, load) -> bytes:
+    """Fetch one catalog read from Redis or MongoDB and store it in the caches"""
+    version = catalog_version.counter
+    generation = None
+    if shared_cache is not None:
+        body, generation = await shared_cache.get(cache_key)
+        if body is not None:
+            catalog_cache.set(cache_key, body)
+            return body
+    content = await load()
+    with phase("encode"):
+        body = render_json(content)
+    # A write landing mid-load may not be reflected in the result
+    if catalog_version.counter == version:
+        catalog_cache.set(cache_key, body)
+        if shared_cache is not None:
+            await shared_cache.set(cache_key, body, generation)
+    return body
+
+def field_selection(fields: Optional[str]) -> FieldSelection:
+    try:
+        return parse_fields(fields, Product.model_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def product_filters(
+    category: Optional[ProductCategory] = None,
+    status: Optional[ProductStatus] = None,
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    tags: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    in_stock: Optional[bool] = None
+) -> ProductFilters:
+    """Shared filter parameters, `tags` is a comma separated list that must all match"""
+    return ProductFilters(
+        category=category and category.value,
+        status=status and status.value,
+        price_min=price_min,
+        price_max=price_max,
+        tags=tuple(sorted({tag.strip() for tag in (tags or "").split(",") if tag.strip()})),
+        min_rating=min_rating,
+        in_stock=in_stock,
+    )
+
+def shape_products(products: List[dict], selection: FieldSelection) -> list:
+    """Build the response items for documents read with selection.projection()"""
+    if selection.names is None:
+        if TRUST_CATALOG_DOCUMENTS:
+            return products
+        return [Product(**product) for product in products]
+    if selection.preset == "card" and not TRUST_CATALOG_DOCUMENTS:
+        return [ProductCard(**product) for product in products]
+    # Sparse fieldsets are partial documents, returned as projected
+    return [{k: product[k] for k in selection.names if k in product} for product in products]
+
+async def invalidate_product_caches(product_id: str, *docs):
+    """Drop cached reads affected by a product write, in this worker and all others"""
+    catalog_version.bump()
+    catalog_cache.invalidate_product(product_id, *docs)
+    if shared_cache is not None:
+        catalog_version.share(await shared_cache.invalidate_product(product_id, *docs))
+
+async def invalidate_all_caches():
+    """Drop every cached catalog read, used after bulk writes"""
+    catalog_version.bump()
+    catalog_cache.clear()
+    if shared_cache is not None:
+        catalog_version.share(await shared_cache.invalidate_all())
+
+def update_product_indexes(product_id: str, doc: Optional[dict]):
+    """Apply one product write to the in-memory indexes, `doc` is None on delete"""
+    search_index.remove(product_id)
+    facet_index.remove(product_id)
+    featured_ranking.update(product_id, doc)
+    recommendation_index.remove(product_id)
+    if doc:
+        search_index.add(doc)
+        facet_index.add(doc)
+        recommendation_index.add(doc)
+
+async def refresh_product_indexes(product_id: str):
+    """Reload one product from MongoDB after another worker wrote it"""
+    update_product_indexes(product_id, await db.products.find_one({"id": product_id}, {"_id": 0}))
+
+# Products written by other workers while a rebuild reads the catalog; its
+# snapshot may predate them, so they are reloaded once it is applied
+changed_during_rebuild = set()
+
+async def rebuild_product_indexes():
+    changed_during_rebuild.clear()
+    docs = await db.products.find({}, {"_id": 0}).to_list(None)
+    search_index.build(docs)
+    facet_index.build(docs)
+    featured_ranking.build(docs)
+    recommendation_index.build(docs)
+    logger.info(f"Built catalog indexes over {len(docs)} products")
+    while changed_during_rebuild:
+        await refresh_product_indexes(changed_during_rebuild.pop())
+
+async def on_product_write(product_id: str, before: Optional[dict], after: Optional[dict]):
+    """Propagate a product write to the in-memory indexes and the caches"""
+    update_product_indexes(product_id, after)
+    await invalidate_product_caches(product_id, before, after)
 
 # Product API Endpoints
 
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Get catalog cache hit/miss/eviction counters"""
+    stats = catalog_cache.stats()
+    stats["coalescing"] = catalog_flights.stats()
+    stats["featured"] = featured_ranking.stats()
+    stats["recommendations"] = recommendation_index.stats()
+    if shared_cache is not None:
+        stats["shared"] = shared_cache.stats()
+    return stats
+
+@api_router.get("/db/pool")
+async def get_db_pool_stats():
+    """Get MongoDB connection pool usage and checkout wait times"""
+    stats = mongo_pool_metrics.stats()
+    stats["options"] = mongo_options
+    return stats
+
+@api_router.get("/debug/profiling")
+async def get_profiling():
+    """Get this worker's request profiling settings and counters"""
+    return {**request_profiler.settings(), **request_profiler.stats()}
+
+def require_profiling_admin(x_admin_token: Optional[str] = Header(None)):
+    if not PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Profiling changes are disabled, set PROFILING_ADMIN_TOKEN")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, PROFILING_ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@api_router.put("/debug/profiling", response_model=ProfilingSettings,
+                dependencies=[Depends(require_profiling_admin)])
+async def update_profiling(settings: ProfilingSettingsUpdate):
+    """Change request profiling settings without a restart.
+
+    Requires the X-Admin-Token header to match PROFILING_ADMIN_TOKEN.
+    With REDIS_URL set the change is broadcast to every running worker, and
+    nothing changes if the broadcast fails; workers started later use the
+    PROFILING_* environment settings. The trace directory is fixed by
+    PROFILING_DIR.
+    """
+    changes = profiling_changes(settings)
+    if shared_cache is not None and not await shared_cache.publish_profiling(changes):
+        raise HTTPException(status_code=503, detail="Could not send the settings to the other workers")
+    apply_profiling_settings(changes)
+    return request_profiler.settings()
+
+def profiling_changes(settings: ProfilingSettingsUpdate) -> Dict[str, Any]:
+    return {name: value.value if isinstance(value, Enum) else value
+            for name, value in settings.dict(exclude_none=True).items()}
+
+def apply_profiling_settings(changes: Dict[str, Any]) -> None:
+    for name, value in changes.items():
+        setattr(request_profiler, name, value)
+
 @api_router.post("/products", response_model=Product)
 async def create_product(product_data: ProductCreate):
     """Create a new product"""
     product_dict = product_data.dict()
     product_obj = Product(**product_dict)
     result = await db.products.insert_one(product_obj.dict())
+    await on_product_write(product_obj.id, None, product_obj.dict())
     return product_obj
 
-@api_router.get("/products", response_model=List[Product])
+@api_router.post("/products/bulk")
+async def bulk_import_products(
+    request: Request,
+    mode: BulkMode = BulkMode.insert,
+    chunk_size: int = Query(1000, ge=1, le=10000)
+):
+    """Import many products from a JSON array or an NDJSON stream.
+
+    `insert` fails rows whose id already exists; `upsert` replaces them.
+    Returns a per-row report of inserted/updated/error results.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = iter_ndjson(request.stream())
+    else:
+        try:
+            rows = parse_json_array(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    importer = BulkImporter(
+        db.products,
+        validate=lambda row: Product(**row).dict(),
+        upsert=mode == BulkMode.upsert,
+        chunk_size=chunk_size,
+    )
+    report = await importer.run(rows)
+    if importer.written_docs:
+        for doc in importer.written_docs:
+            update_product_indexes(doc["id"], doc)
+        await invalidate_all_caches()
+    return CatalogJSONResponse(content=report)
+
+@api_router.get("/products", response_model=Union[List[Product], List[ProductCard], ProductPage])
 async def get_products(
+    request: Request,
+    filters: ProductFilters = Depends(product_filters),
+    skip: int = 0,
+    limit: int = 100,
+    sort: Optional[ProductSort] = None,
+    order: SortOrder = SortOrder.asc,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """Get all products with optional filtering.
+
+    Passing `cursor` (empty for the first page) switches to keyset pagination
+    and returns a ProductPage whose `next_cursor` fetches the following page.
+    `fields` takes a preset (`card`, `detail`) or a comma separated field list.
+    Prices filter on the effective (discounted) price.
+    """
+    selection = field_selection(fields)
+    filter_dict = filters.mongo_filter()
+
+    if cursor is None:
+        async def load():
+            query = db.products.find(filter_dict, selection.projection())
+            if sort:
+                query = query.sort(keyset_sort(sort.value, order.value))
+            with phase("db"):
+                products = await query.skip(skip).limit(limit).to_list(limit)
+            with phase("build"):
+                return shape_products(products, selection)
+    else:
+        sort = sort or ProductSort.created_at
+        if cursor:
+            try:
+                position = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if (position["sort"], position["order"]) != (sort.value, order.value):
+                raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+            after = keyset_filter(sort.value, order.value, position["value"], position["id"])
+            filter_dict = {"$and": [filter_dict, after]} if filter_dict else after
+
+        async def load():
+            # One extra row tells us whether another page exists
+            # The sort key is projected too so the next cursor can be built
+            with phase("db"):
+                products = await db.products.find(
+                    filter_dict, selection.projection(extra=[sort.value])
+                ).sort(keyset_sort(sort.value, order.value)).limit(limit + 1).to_list(limit + 1)
+            next_cursor = None
+            if len(products) > limit:
+                products = products[:limit]
+                last = products[-1]
+                next_cursor = encode_cursor(sort.value, order.value, last[sort.value], last["id"])
+            with phase("build"):
+                return ProductPage(items=shape_products(products, selection), next_cursor=next_cursor)
+
+    cache_key = products_key(
+        filters.category, filters.status,
+        skip if cursor is None else 0, limit,
+        sort and sort.value, order.value if sort else None, cursor, selection.token, filters.token,
+    )
+    return await cached_read(request, cache_key, load)
+
+@api_router.get("/products/featured", response_model=Union[List[Product], List[ProductCard]])
+async def get_featured_products(request: Request, limit: int = 6, fields: Optional[str] = None):
+    """Get featured products (high rating, active status).
+
+    Served from the in-memory ranking; only products ranked below its
+    materialized depth are read from MongoDB.
+    """
+    selection = field_selection(fields)
+
+    async def load():
+        product_ids = featured_ranking.top(limit)
+        docs = featured_ranking.documents(product_ids)
+        missing = [product_id for product_id in product_ids if product_id not in docs]
+        if missing:
+            with phase("db"):
+                found = await db.products.find({"id": {"$in": missing}}, {"_id": 0}).to_list(None)
+            for doc in found:
+                featured_ranking.remember(doc)
+                docs[doc["id"]] = doc
+        products = [selection.apply(docs[product_id]) for product_id in product_ids if product_id in docs]
+        with phase("build"):
+            return shape_products(products, selection)
+
+    return await cached_read(request, featured_key(limit, selection.token), load)
+
+@api_router.get("/products/facets")
+async def get_product_facets(
+    filters: ProductFilters = Depends(product_filters),
+    max_tags: int = Query(25, ge=1, le=200)
+):
+    """Get facet counts (category, status, price bands, tags, rating, stock) for a filtered listing.
+
+    Takes the same filters as GET /api/products. Each facet is counted with
+    all other filters applied, from the in-memory bitmap index.
+    """
+    return CatalogJSONResponse(content=facet_index.counts(filters, max_tags=max_tags))
+
+@api_router.get("/products/search", response_model=List[SearchHit])
+async def search_products(
+    q: str,
+    limit: int = Query(10, ge=1, le=100),
+    prefix: bool = True,
+    category: Optional[ProductCategory] = None
+):
+    """Full-text search over active products, ranked with BM25.
+
+    With `prefix` the last word also matches as a prefix, for typeahead.
+    """
+    hits = search_index.search(q, limit=limit, prefix=prefix, category=category and category.value)
+    return CatalogJSONResponse(content=hits)
+
+@api_router.get("/products/export")
+async def export_products(
     category: Optional[ProductCategory] = None,
     status: Optional[ProductStatus] = None,
-    skip: int = 0,
-    limit: int = 100
+    fields: Optional[str] = None,
+    format: ExportFormat = ExportFormat.ndjson,
+    batch_size: int = Query(500, ge=1, le=10000)
 ):
-    """Get all products with optional filtering"""
+    """Stream the catalog as NDJSON or CSV, one cursor batch at a time"""
+    selection = field_selection(fields)
     filter_dict = {}
     if category:
         filter_dict["category"] = category
     if status:
         filter_dict["status"] = status
-    
-    products = await db.products.find(filter_dict).skip(skip).limit(limit).to_list(limit)
-    return [Product(**product) for product in products]
-
-@api_router.get("/products/featured", response_model=List[Product])
-async def get_featured_products(limit: int = 6):
-    """Get featured products (high rating, active status)"""
-    products = await db.products.find({
-        "status": "active", 
-        "rating": {"$gte": 4.0}
-    }).sort("rating", -1).limit(limit).to_list(limit)
-    return [Product(**product) for product in products]
-
-@api_router.get("/products/category/{category}", response_model=List[Product])
-async def get_products_by_category(category: ProductCategory):
+    cursor = db.products.find(filter_dict, selection.projection()).batch_size(batch_size)
+
+    async def batches():
+        batch = []
+        async for product in cursor:
+            batch.append(product)
+            if len(batch) >= batch_size:
+                yield shape_products(batch, selection)
+                batch = []
+        if batch:
+            yield shape_products(batch, selection)
+
+    if format == ExportFormat.ndjson:
+        async def ndjson_rows():
+            async for batch in batches():
+                yield b"".join(render_json(item) + b"\n" for item in batch)
+
+        return StreamingResponse(
+            ndjson_rows(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="products.ndjson"'},
+        )
+
+    columns = list(selection.names or Product.model_fields)
+
+    async def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        async for batch in batches():
+            for item in orjson.loads(render_json(batch)):
+                # Nested values (images, specifications, ...) are embedded as JSON
+                writer.writerow([
+                    orjson.dumps(item[c]).decode() if isinstance(item.get(c), (list, dict)) else item.get(c)
+                    for c in columns
+                ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    return StreamingResponse(
+        csv_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="products.csv"'},
+    )
+
+@api_router.get("/products/category/{category}", response_model=Union[List[Product], List[ProductCard]])
+async def get_products_by_category(request: Request, category: ProductCategory, fields: Optional[str] = None):
     """Get all products in a specific category"""
-    products = await db.products.find({"category": category, "status": "active"}).to_list(1000)
-    return [Product(**product) for product in products]
+    selection = field_selection(fields)
+
+    async def load():
+        with phase("db"):
+            products = await db.products.find(
+                {"category": category, "status": "active"}, selection.projection()
+            ).to_list(1000)
+        with phase("build"):
+            return shape_products(products, selection)
+
+    return await cached_read(request, category_key(category.value, selection.token), load)
+
+class CachedProduct(NamedTuple):
+    body: bytes
+    etag: str
+    last_modified: datetime
+
+def cached_product(doc: dict, body: bytes) -> CachedProduct:
+    updated_at = doc["updated_at"]
+    if isinstance(updated_at, str):
+        updated_at = datetime.fromisoformat(updated_at)
+    return CachedProduct(body, product_etag(doc), updated_at)
+
+@api_router.get("/products/batch", response_model=ProductBatch)
+async def get_products_batch(ids: str):
+    """Get several products by id (comma separated) in one request.
+
+    Products come back in the requested order; unknown ids are listed in
+    `missing`.
+    """
+    return await product_batch_response([product_id.strip() for product_id in ids.split(",") if product_id.strip()])
+
+@api_router.post("/products/batch", response_model=ProductBatch)
+async def post_products_batch(batch: ProductBatchRequest):
+    """Get several products by id, for id lists too long for a query string"""
+    return await product_batch_response(batch.ids)
+
+def stock_level(doc: dict) -> dict:
+    return {"id": doc["id"], "stock_quantity": doc["stock_quantity"], "status": doc["status"],
+            "version": doc.get("version") or 0}
+
+def insufficient_stock(e: InsufficientStock) -> HTTPException:
+    return HTTPException(status_code=409, detail={
+        "message": str(e), "product_id": e.product_id, "requested": e.requested, "available": e.available,
+    })
+
+@api_router.post("/products/reserve", response_model=StockBatch)
+async def reserve_products(batch: StockBatchRequest):
+    """Reserve stock for every item of a cart, or for none of them.
+
+    Fails with 409 (or 404) naming the first item that could not be
+    reserved; anything already taken for the cart is released again.
+    """
+    try:
+        docs = await reserve_many(
+            db.products, [(item.product_id, item.quantity) for item in batch.items], on_product_write
+        )
+    except ProductNotFound as e:
+        raise HTTPException(status_code=404, detail=f"Product not found: {e.product_id}")
+    except InsufficientStock as e:
+        raise insufficient_stock(e)
+    return {"items": [stock_level(doc) for doc in docs], "missing": []}
+
+@api_router.post("/products/release", response_model=StockBatch)
+async def release_products(batch: StockBatchRequest):
+    """Return stock for several items, unknown products are listed in `missing`"""
+    docs, missing = [], []
+    for product_id, quantity in merge_items((item.product_id, item.quantity) for item in batch.items):
+        try:
+            docs.append(await release(db.products, product_id, quantity, on_product_write))
+        except ProductNotFound:
+            missing.append(product_id)
+    return {"items": [stock_level(doc) for doc in docs], "missing": missing}
 
 @api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
-    """Get a specific product by ID"""
-    product = await db.products.find_one({"id": product_id})
-    if not product:
+async def get_product(request: Request, product_id: str):
+    """Get a specific product by ID.
+
+    Conditional requests are answered from the cached ETag, or from the raw
+    document, without building or serializing the model.
+    """
+    cache_key = product_key(product_id)
+    # A write landing while this read is in flight must not have its invalidation undone
+    version = catalog_version.counter
+    cached = catalog_cache.get(cache_key)
+    generation = None
+    if cached is None and shared_cache is not None:
+        body, generation = await shared_cache.get(cache_key)
+        if body is not None:
+            cached = cached_product(orjson.loads(body), body)
+            if catalog_version.counter == version:
+                catalog_cache.set(cache_key, cached)
+
+    if cached is None:
+        with phase("db"):
+            product = await catalog_flights.do(
+                (cache_key, catalog_version.counter),
+                lambda: db.products.find_one({"id": product_id}, {"_id": 0}),
+            )
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = product_etag(product)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL["product"]})
+        with phase("build"):
+            content = product if TRUST_CATALOG_DOCUMENTS else Product(**product)
+        with phase("encode"):
+            body = render_json(content)
+        cached = cached_product(product, body)
+        if catalog_version.counter == version:
+            catalog_cache.set(cache_key, cached)
+            if shared_cache is not None:
+                await shared_cache.set(cache_key, body, generation)
+
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": http_date(cached.last_modified),
+        "Cache-Control": CACHE_CONTROL["product"],
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, cached.etag) or (
+        if_none_match is None
+        and not_modified_since(request.headers.get("if-modified-since"), cached.last_modified)
+    ):
+        return Response(status_code=304, headers=headers)
+    return CatalogJSONResponse(content=cached.body, headers=headers)
+
+async def cached_products(product_ids: List[str]) -> Dict[str, CachedProduct]:
+    """Look up many products in the in-process cache, then Redis, then one $in query"""
+    # As in get_product, nothing read across a write is cached
+    version = catalog_version.counter
+    found = {}
+    missing = []
+    for product_id in product_ids:
+        cached = catalog_cache.get(product_key(product_id))
+        if cached is None:
+            missing.append(product_id)
+        else:
+            found[product_id] = cached
+
+    generation = None
+    if missing and shared_cache is not None:
+        bodies, generation = await shared_cache.get_many([product_key(product_id) for product_id in missing])
+        still_missing = []
+        for product_id, body in zip(missing, bodies):
+            if body is None:
+                still_missing.append(product_id)
+                continue
+            found[product_id] = cached_product(orjson.loads(body), body)
+            if catalog_version.counter == version:
+                catalog_cache.set(product_key(product_id), found[product_id])
+        missing = still_missing
+
+    if missing:
+        rendered = []
+        with phase("db"):
+            products = await db.products.find({"id": {"$in": missing}}, {"_id": 0}).to_list(None)
+        for product in products:
+            with phase("build"):
+                content = product if TRUST_CATALOG_DOCUMENTS else Product(**product)
+            with phase("encode"):
+                body = render_json(content)
+            found[product["id"]] = cached_product(product, body)
+            rendered.append((product_key(product["id"]), body))
+        if rendered and catalog_version.counter == version:
+            for key, _ in rendered:
+                catalog_cache.set(key, found[key[1]])
+        if rendered and shared_cache is not None and catalog_version.counter == version:
+            await shared_cache.set_many(rendered, generation)
+    return found
+
+async def product_batch_response(product_ids: List[str]) -> Response:
+    if len(product_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    # Duplicates are looked up once but keep their place in the response
+    found = await cached_products(list(dict.fromkeys(product_ids)))
+    # Cached bodies are already serialized, splice them instead of re-encoding
+    items = b",".join(found[product_id].body for product_id in product_ids if product_id in found)
+    missing = list(dict.fromkeys(product_id for product_id in product_ids if product_id not in found))
+    return CatalogJSONResponse(content=b'{"items":[' + items + b'],"missing":' + orjson.dumps(missing) + b"}")
+
+@api_router.get("/products/{product_id}/recommendations", response_model=List[Recommendation])
+async def get_product_recommendations(product_id: str, limit: int = Query(6, ge=1, le=20)):
+    """Get active products related to a product.
+
+    Ranks its bundle suggestions, the products suggesting it, and products
+    sharing its subcategory, tags or skill levels, from the in-memory index.
+    """
+    recommendations = recommendation_index.recommend(product_id, limit=limit)
+    if recommendations is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return Product(**product)
+    return CatalogJSONResponse(content=recommendations)
+
+@api_router.post("/products/{product_id}/reserve", response_model=StockLevel)
+async def reserve_product(product_id: str, stock: Optional[StockRequest] = None):
+    """Atomically take stock, 409 if fewer than `quantity` units are left.
+
+    The product flips to out_of_stock when its last unit is reserved.
+    """
+    try:
+        doc = await reserve(db.products, product_id, stock.quantity if stock else 1, on_product_write)
+    except ProductNotFound:
+        raise HTTPException(status_code=404, detail="Product not found")
+    except InsufficientStock as e:
+        raise insufficient_stock(e)
+    return stock_level(doc)
+
+@api_router.post("/products/{product_id}/release", response_model=StockLevel)
+async def release_product(product_id: str, stock: Optional[StockRequest] = None):
+    """Return previously reserved stock, reactivating a sold out product"""
+    try:
+        doc = await release(db.products, product_id, stock.quantity if stock else 1, on_product_write)
+    except ProductNotFound:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return stock_level(doc)
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Expected product version from an If-Match header, None for absent or `*`"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return version_from_etag(if_match)
+    except ValueError:
+        raise HTTPException(status_code=412, detail="Product version does not match")
 
 @api_router.put("/products/{product_id}", response_model=Product)
-async def update_product(product_id: str, product_update: ProductUpdate):
-    """Update a product"""
-    product = await db.products.find_one({"id": product_id})
-    if not product:
+async def update_product(
+    product_id: str,
+    product_update: ProductUpdate,
+    if_match: Optional[str] = Header(None)
+):
+    """Update a product in a single atomic round-trip.
+
+    Send the product's ETag (or `"<version>"`) as If-Match to only apply the
+    update if nobody else changed the product since it was read.
+    """
+    update_dict = product_update.dict(exclude={"updated_at"}, exclude_none=True)
+    update_dict["updated_at"] = mongo_utcnow()
+
+    filter_dict = {"id": product_id}
+    expected_version = parse_if_match(if_match)
+    if expected_version is not None:
+        # Documents written before versioning have no version field
+        filter_dict["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+
+    update = {"$set": update_dict, "$inc": {"version": 1}}
+    if "status" in update_dict:
+        # A status set here is the admin's, release must not undo it
+        update["$unset"] = {SOLD_OUT_BY_RESERVE: ""}
+
+    # The pre-image is returned so caches can drop entries matching either side
+    product = await db.products.find_one_and_update(
+        filter_dict,
+        update,
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if product is None:
+        if expected_version is not None and await db.products.count_documents({"id": product_id}, limit=1):
+            raise HTTPException(status_code=412, detail="Product version does not match")
         raise HTTPException(status_code=404, detail="Product not found")
-    
-    update_dict = {k: v for k, v in product_update.dict().items() if v is not None}
-    update_dict["updated_at"] = datetime.utcnow()
-    
-    await db.products.update_one({"id": product_id}, {"$set": update_dict})
-    
-    updated_product = await db.products.find_one({"id": product_id})
-    return Product(**updated_product)
+
+    updated_product = {**product, **update_dict, "version": (product.get("version") or 0) + 1}
+    if "status" in update_dict:
+        updated_product.pop(SOLD_OUT_BY_RESERVE, None)
+    await on_product_write(product_id, product, updated_product)
+    return CatalogJSONResponse(
+        content=Product(**updated_product),
+        headers={"ETag": product_etag(updated_product)},
+    )
 
 @api_router.delete("/products/{product_id}")
 async def delete_product(product_id: str):
     """Delete a product"""
-    result = await db.products.delete_one({"id": product_id})
-    if result.deleted_count == 0:
+    deleted = await db.products.find_one_and_delete({"id": product_id})
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Product not found")
+    await on_product_write(product_id, deleted, None)
     return {"message": "Product deleted successfully"}
 
-@api_router.get("/products/category/{category}", response_model=List[Product])
-async def get_products_by_category(category: ProductCategory):
-    """Get all products in a specific category"""
-    products = await db.products.find({"category": category, "status": "active"}).to_list(1000)
-    return [Product(**product) for product in products]
-
 @api_router.post("/products/seed")
 async def seed_products():
     """Seed the database with sample products"""
@@ -635,12 +1615,12 @@ async def seed_products():
         }
     ]
     
-    # Insert sample products
-    inserted_products = []
-    for product_data in sample_products:
-        product_obj = Product(**product_data)
-        await db.products.insert_one(product_obj.dict())
-        inserted_products.append(product_obj.name)
+    # Insert sample products in one round-trip
+    product_objs = [Product(**product_data) for product_data in sample_products]
+    await db.products.insert_many([product_obj.dict() for product_obj in product_objs])
+    for product_obj in product_objs:
+        await on_product_write(product_obj.id, None, product_obj.dict())
+    inserted_products = [product_obj.name for product_obj in product_objs]
     
     return {
         "message": f"Successfully seeded {len(inserted_products)} products",
@@ -650,21 +1630,70 @@ async def seed_products():
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Server-Timing"],
 )
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+# Outermost, so the timings include every other middleware
+app.add_middleware(MetricsMiddleware, metrics=http_metrics)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+async def warm_up_database():
+    """Ping the server so selection and the first connection happen before traffic does"""
+    try:
+        await db.command("ping")
+    except Exception as e:
+        logger.error(f"MongoDB warm-up ping failed: {e}")
+        raise
+    logger.info(f"MongoDB ready, pool options: {mongo_options or 'driver defaults'}")
+
+async def provision_indexes():
+    await ensure_indexes(db)
+    # Opt-in, since explain() on an empty collection says little about production plans
+    if os.environ.get('INDEX_PLAN_CHECK', '').lower() in ('1', 'true', 'yes'):
+        await check_query_plans(db)
+
+def on_remote_invalidate(product_id: str, *docs):
+    catalog_version.bump()
+    catalog_cache.invalidate_product(product_id, *docs)
+    rebuild = getattr(app.state, "index_rebuild", None)
+    if rebuild is not None and not rebuild.done():
+        changed_during_rebuild.add(product_id)
+    asyncio.create_task(refresh_product_indexes(product_id))
+
+def on_remote_clear():
+    catalog_version.bump()
+    catalog_cache.clear()
+    # Only the newest rebuild runs, an older snapshot must not finish last
+    rebuild = getattr(app.state, "index_rebuild", None)
+    if rebuild is not None:
+        rebuild.cancel()
+    app.state.index_rebuild = asyncio.create_task(rebuild_product_indexes())
+
+def on_remote_profiling(changes: Dict[str, Any]):
+    # Validated again, so a bad message can't set attributes the endpoint doesn't allow
+    apply_profiling_settings(profiling_changes(ProfilingSettingsUpdate(**changes)))
+
+def start_cache_invalidation_listener():
+    if shared_cache is not None:
+        app.state.invalidation_listener = asyncio.create_task(
+            shared_cache.listen(on_remote_invalidate, on_remote_clear, catalog_version.share, on_remote_profiling)
+        )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def shutdown_shared_cache():
+    if shared_cache is not None:
+        app.state.invalidation_listener.cancel()
+        rebuild = getattr(app.state, "index_rebuild", None)
+        if rebuild is not None:
+            rebuild.cancel()
+        await shared_cache.close()
@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError, WatchError
+except ImportError:  # redis is optional, the shared tier is simply disabled
+    aioredis = None
+    RedisError = WatchError = Exception
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "catalog:invalidate"
+
+# Generation bumped by invalidate_all, part of every snapshot
+ALL_TAG = "*all"
+
+# Tag generations seen by a read before it went to MongoDB, or None if Redis failed
+Generation = Optional[Dict[str, Optional[bytes]]]
+
+
+def shared_key(key: Tuple, prefix: str = "catalog") -> str:
+    """Map an in-process cache key to endpoint plus normalized query params"""
+    kind = key[0]
+    if kind == "product":
+        return f"{prefix}:product:{key[1]}"
+    if kind == "products":
+        _, category, status, skip, limit, sort, order, cursor, fields, filters = key
+        params = {"category": category, "status": status, "skip": skip, "limit": limit,
+                  "sort": sort, "order": order, "cursor": cursor, "fields": fields,
+                  "filters": filters}
+    elif kind == "featured":
+        params = {"limit": key[1], "fields": key[2]}
+    elif kind == "category":
+        params = {"category": key[1], "fields": key[2]}
+    else:
+        raise ValueError(f"Unknown catalog cache key: {key!r}")
+    query = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+    return f"{prefix}:{kind}?{query}"
+
+
+def _key_tags(key: Tuple) -> List[str]:
+    kind = key[0]
+    if kind == "product":
+        return [f"product:{key[1]}"]
+    if kind == "products":
+        return [f"products:{key[1] or '*'}:{key[2] or '*'}"]
+    if kind == "featured":
+        return ["featured"]
+    return [f"category:{key[1]}"]
+
+
+def _doc_tags(product_id: str, docs: Iterable[Dict[str, Any]]) -> List[str]:
+    """Tags of every cached read that could contain one of the given documents"""
+    tags = {f"product:{product_id}"}
+    for doc in docs:
+        category, status = doc.get("category"), doc.get("status")
+        for c in ("*", category):
+            for s in ("*", status):
+                tags.add(f"products:{c}:{s}")
+        if status == "active":
+            tags.add(f"category:{category}")
+            if (doc.get("rating") or 0) >= 4.0:
+                tags.add("featured")
+    return sorted(tags)
+
+
+def _invalidation_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Enum members are reduced to their values so tags and messages stay stable
+    return {
+        "category": getattr(doc.get("category"), "value", doc.get("category")),
+        "status": getattr(doc.get("status"), "value", doc.get("status")),
+        "rating": doc.get("rating"),
+    }
+
+
+class SharedCatalogCache:
+    """Redis tier shared by all workers, holding pre-serialized JSON responses.
+
+    Writes delete the affected keys and publish an invalidation message so
+    every worker also drops its in-process entries.
+
+    Every tag also has a generation counter that invalidations bump before
+    deleting. A miss returns the generations of its tags, and the body loaded
+    afterwards is stored only if none of them moved, so a read that started
+    before a write cannot put its stale body back once the write's
+    invalidation has run.
+
+    Invalidations also move a catalog version shared by all workers, which
+    they use for listing ETags. Its epoch is regenerated if Redis loses it.
+    """
+
+    def __init__(self, redis, ttl_seconds: float = 300.0, prefix: str = "catalog",
+                 channel: str = INVALIDATION_CHANNEL):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.channel = channel
+        self.worker_id = uuid.uuid4().hex
+        self.errors = 0
+        self.stale_writes = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "SharedCatalogCache":
+        if aioredis is None:
+            raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+        return cls(aioredis.from_url(url), **kwargs)
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _generation_key(self, tag: str) -> str:
+        # Outside the prefix:* namespace, so invalidate_all's scan leaves generations alone
+        return f"{self.prefix}-gen:{tag}"
+
+    def _catalog_version(self, pipe, bump: bool) -> None:
+        # Three commands: create the epoch if missing, read it, then move or read the number
+        pipe.set(f"{self.prefix}-epoch", uuid.uuid4().hex[:8], nx=True)
+        pipe.get(f"{self.prefix}-epoch")
+        if bump:
+            pipe.incr(f"{self.prefix}-version")
+        else:
+            pipe.get(f"{self.prefix}-version")
+
+    async def catalog_version(self) -> Optional[str]:
+        """Current shared catalog version as "epoch.number", None if Redis failed"""
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                self._catalog_version(pipe, bump=False)
+                _, epoch, number = await pipe.execute()
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"Shared catalog version read failed: {e}")
+            return None
+        return f"{epoch.decode()}.{int(number or 0)}"
+
+    async def get(self, key: Tuple) -> Tuple[Optional[bytes], Generation]:
+        """Read one entry, and the generation to pass to set() if it was missing"""
+        bodies, generation = await self.get_many([key])
+        return bodies[0], generation
+
+    async def get_many(self, keys: List[Tuple]) -> Tuple[List[Optional[bytes]], Generation]:
+        """Read several entries and their tag generations with one MGET, None for misses"""
+        tags = sorted({ALL_TAG, *(tag for key in keys for tag in _key_tags(key))})
+        try:
+            values = await self.redis.mget(
+                [shared_key(key, self.prefix) for key in keys] + [self._generation_key(tag) for tag in tags]
+            )
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"Shared catalog cache read failed: {e}")
+            return [None] * len(keys), None
+        return values[:len(keys)], dict(zip(tags, values[len(keys):]))
+
+    async def set(self, key: Tuple, body: bytes, generation: Generation) -> None:
+        await self.set_many([(key, body)], generation)
+
+    async def set_many(self, entries: List[Tuple[Tuple, bytes]], generation: Generation) -> None:
+        """Write entries loaded after a get() that returned `generation`, with their tags.
+
+        Entries whose tags were invalidated since are dropped. The generations
+        are WATCHed, so an invalidation racing this write aborts it.
+        """
+        if generation is None:
+            return
+        tags = sorted({ALL_TAG, *(tag for key, _ in entries for tag in _key_tags(key))})
+        generation_keys = [self._generation_key(tag) for tag in tags]
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(*generation_keys)
+                current = dict(zip(tags, await pipe.mget(generation_keys)))
+                moved = {tag for tag in tags if current[tag] != generation.get(tag)}
+                fresh = [(key, body) for key, body in entries
+                         if ALL_TAG not in moved and moved.isdisjoint(_key_tags(key))]
+                self.stale_writes += len(entries) - len(fresh)
+                if not fresh:
+                    return
+                pipe.multi()
+                for key, body in fresh:
+                    redis_key = shared_key(key, self.prefix)
+                    pipe.set(redis_key, body, ex=int(self.ttl_seconds))
+                    for tag in _key_tags(key):
+                        pipe.sadd(self._tag_key(tag), redis_key)
+                        pipe.expire(self._tag_key(tag), int(self.ttl_seconds))
+                await pipe.execute()
+        except WatchError:
+            self.stale_writes += len(entries)
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"Shared catalog cache write failed: {e}")
+
+    def _bump_generations(self, pipe, tags: Iterable[str]) -> None:
+        # Kept a while past the entry TTL, a snapshot older than that is not protected
+        for tag in tags:
+            pipe.incr(self._generation_key(tag))
+            pipe.expire(self._generation_key(tag), int(self.ttl_seconds) * 2)
+
+    async def invalidate_product(self, product_id: str, *docs: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Delete shared entries affected by a product write and notify other workers.
+
+        Returns the new shared catalog version, or None if Redis failed.
+        """
+        docs = [_invalidation_fields(doc) for doc in docs if doc]
+        tags = _doc_tags(product_id, docs)
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        try:
+            # Generations move first, so no write can add a stale key after the SUNION
+            async with self.redis.pipeline(transaction=False) as pipe:
+                self._bump_generations(pipe, tags)
+                pipe.sunion(tag_keys)
+                self._catalog_version(pipe, bump=True)
+                *_, stale, _, epoch, number = await pipe.execute()
+            version = f"{epoch.decode()}.{number}"
+            message = json.dumps({"origin": self.worker_id, "product_id": product_id, "docs": docs,
+                                  "version": version})
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if stale:
+                    pipe.delete(*stale)
+                pipe.delete(*tag_keys)
+                pipe.publish(self.channel, message)
+                await pipe.execute()
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"Shared catalog cache invalidation failed: {e}")
+            return None
+        return version
+
+    async def invalidate_all(self) -> Optional[str]:
+        """Delete every shared catalog entry and tell other workers to clear theirs.
+
+        Returns the new shared catalog version, or None if Redis failed.
+        """
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                self._bump_generations(pipe, [ALL_TAG])
+                self._catalog_version(pipe, bump=True)
+                *_, epoch, number = await pipe.execute()
+            version = f"{epoch.decode()}.{number}"
+            message = json.dumps({"origin": self.worker_id, "all": True, "version": version})
+            keys = [key async for key in self.redis.scan_iter(match=f"{self.prefix}:*", count=500)]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if keys:
+                    pipe.delete(*keys)
+                pipe.publish(self.channel, message)
+                await pipe.execute()
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"Shared catalog cache invalidation failed: {e}")
+            return None
+        return version
+
+    async def publish_profiling(self, settings: Dict[str, Any]) -> bool:
+        """Send changed profiling settings to the other workers, False if Redis failed"""
+        message = json.dumps({"origin": self.worker_id, "profiling": settings})
+        try:
+            await self.redis.publish(self.channel, message)
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"Profiling settings broadcast failed: {e}")
+            return False
+        return True
+
+    async def listen(self, on_invalidate: Callable[..., Any], on_clear: Callable[[], Any],
+                     on_version: Optional[Callable[[Optional[str]], Any]] = None,
+                     on_profiling: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                     retry_seconds: float = 1.0) -> None:
+        """Apply invalidations published by other workers until cancelled.
+
+        The caller builds its state before listening, so `on_clear` runs on
+        resubscribes only. `on_version` gets the shared catalog version on
+        every subscribe and with every message, `on_profiling` the settings
+        sent by publish_profiling().
+        """
+        missed = False
+        while True:
+            try:
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                if missed:
+                    # Anything published while we were not subscribed is lost
+                    on_clear()
+                if on_version is not None:
+                    on_version(await self.catalog_version())
+                try:
+                    async for message in pubsub.listen():
+                        if message.get("type") != "message":
+                            continue
+                        payload = json.loads(message["data"])
+                        if payload.get("origin") == self.worker_id:
+                            continue
+                        if on_version is not None and "version" in payload:
+                            on_version(payload["version"])
+                        if "profiling" in payload:
+                            if on_profiling is not None:
+                                on_profiling(payload["profiling"])
+                            continue
+                        if payload.get("all"):
+                            on_clear()
+                            continue
+                        on_invalidate(payload["product_id"], *payload.get("docs", []))
+                finally:
+                    await pubsub.aclose()
+            except asyncio.CancelledError:
+                raise
+            except (RedisError, ValueError, KeyError) as e:
+                self.errors += 1
+                logger.warning(f"Catalog invalidation listener error, resubscribing: {e}")
+                await asyncio.sleep(retry_seconds)
+            missed = True
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"worker_id": self.worker_id, "ttl_seconds": self.ttl_seconds, "errors": self.errors,
+                "stale_writes": self.stale_writes}
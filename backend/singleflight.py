@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Let concurrent callers asking for the same key share one in-flight call.
+
+    Each caller awaits the shared call through asyncio.shield, so a client
+    disconnecting doesn't cancel the work the others are waiting on. With
+    `enabled` off every caller runs its own call.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _flight(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.shared += 1
+            return flight
+        self.calls += 1
+        flight = asyncio.ensure_future(fn())
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._land(key, done))
+        return flight
+
+    def _land(self, key: Hashable, flight: asyncio.Future) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled:
+            self.calls += 1
+            return await fn()
+        return await asyncio.shield(self._flight(key, fn))
+
+    def start(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> None:
+        """Run `fn` in the background unless a call for `key` is already in flight"""
+        if key not in self._flights:
+            self._flight(key, fn).add_done_callback(_log_failure)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "in_flight": len(self._flights),
+                "calls": self.calls, "shared": self.shared}
+
+
+def _log_failure(flight: asyncio.Future) -> None:
+    if not flight.cancelled() and flight.exception() is not None:
+        logger.warning(f"Background refresh failed: {flight.exception()!r}")
@@ -0,0 +1,229 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Heartbeats live in one document per client per time bucket:
+#   {client_name, bucket, seq, count, first, last, checks: [{id, timestamp}, ...]}
+# A bucket holds at most MAX_CHECKS_PER_BUCKET checks; once full, the period
+# continues in a document with the next seq. A per-client rollup is kept
+# next to them:
+#   {client_name, count, first_seen, last_seen}
+BUCKETS = "status_buckets"
+CLIENTS = "status_clients"
+# Rows of the one-document-per-check layout, copied into buckets on startup
+LEGACY_CHECKS = "status_checks"
+MIGRATIONS = "migrations"
+
+EPOCH = datetime(1970, 1, 1)
+MAX_CHECKS_PER_BUCKET = 1000
+DUPLICATE_KEY = 11000
+# A migration claim not refreshed for this long belongs to a dead worker
+MIGRATION_CLAIM_TIMEOUT = timedelta(minutes=5)
+
+# Last seq this process wrote per client, as (bucket, seq), so writes to a
+# busy period start at its open document instead of walking past full ones.
+# Client names come from requests, so only the most recently written
+# MAX_OPEN_SEQ_CLIENTS are kept; a forgotten client just starts at seq 0.
+MAX_OPEN_SEQ_CLIENTS = 10000
+_open_seq: "OrderedDict[str, Tuple[datetime, int]]" = OrderedDict()
+
+
+def _remember_open_seq(client_name: str, bucket: datetime, seq: int) -> None:
+    # A newer bucket replaces the entry of a closed one
+    if _open_seq.get(client_name, (EPOCH, -1)) < (bucket, seq):
+        _open_seq[client_name] = (bucket, seq)
+    _open_seq.move_to_end(client_name)
+    while len(_open_seq) > MAX_OPEN_SEQ_CLIENTS:
+        _open_seq.popitem(last=False)
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored timestamps are naive UTC, query parameters may carry an offset
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucket_start(timestamp: datetime, bucket_seconds: int) -> datetime:
+    seconds = int((naive_utc(timestamp) - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % bucket_seconds)
+
+
+async def write_status_checks(db, docs: List[Dict[str, Any]], bucket_seconds: int = 60,
+                              max_checks: int = MAX_CHECKS_PER_BUCKET) -> None:
+    """Append status checks to their buckets and update the per-client rollup.
+
+    Bucket writes use $addToSet so a retried batch never stores a check
+    twice in one document. Each write only matches a bucket with room for
+    all of its checks; when it has none, the upsert collides with the
+    unique (client_name, bucket, seq) index and the checks move on to the
+    next seq. `count` may run ahead of the array after retries, which only
+    closes a bucket early. Rollup counts are best effort: a failed rollup
+    write is logged, not retried, so it can't be counted twice either.
+    """
+    if not docs:
+        return
+    buckets: Dict[Tuple[str, datetime], List[Dict[str, Any]]] = {}
+    for doc in docs:
+        key = (doc["client_name"], bucket_start(doc["timestamp"], bucket_seconds))
+        buckets.setdefault(key, []).append({"id": doc["id"], "timestamp": doc["timestamp"]})
+
+    pending = []
+    for (client_name, bucket), checks in buckets.items():
+        open_bucket, seq = _open_seq.get(client_name, (None, 0))
+        seq = seq if open_bucket == bucket else 0
+        for i in range(0, len(checks), max_checks):
+            pending.append((client_name, bucket, seq, checks[i:i + max_checks]))
+
+    while pending:
+        overflowed = set()
+        try:
+            await db[BUCKETS].bulk_write([
+                UpdateOne(
+                    {"client_name": client_name, "bucket": bucket, "seq": seq,
+                     "count": {"$lte": max_checks - len(checks)}},
+                    {
+                        "$addToSet": {"checks": {"$each": checks}},
+                        "$inc": {"count": len(checks)},
+                        "$min": {"first": min(check["timestamp"] for check in checks)},
+                        "$max": {"last": max(check["timestamp"] for check in checks)},
+                    },
+                    upsert=True,
+                )
+                for client_name, bucket, seq, checks in pending
+            ], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details["writeErrors"]
+            if any(err["code"] != DUPLICATE_KEY for err in errors):
+                raise
+            overflowed = {err["index"] for err in errors}
+        for position, (client_name, bucket, seq, _) in enumerate(pending):
+            if position not in overflowed:
+                _remember_open_seq(client_name, bucket, seq)
+        pending = [(client_name, bucket, seq + 1, checks)
+                   for position, (client_name, bucket, seq, checks) in enumerate(pending)
+                   if position in overflowed]
+
+    clients: Dict[str, List[datetime]] = {}
+    for doc in docs:
+        clients.setdefault(doc["client_name"], []).append(doc["timestamp"])
+    try:
+        await db[CLIENTS].bulk_write([
+            UpdateOne(
+                {"client_name": client_name},
+                {
+                    "$inc": {"count": len(timestamps)},
+                    "$min": {"first_seen": min(timestamps)},
+                    "$max": {"last_seen": max(timestamps)},
+                },
+                upsert=True,
+            )
+            for client_name, timestamps in clients.items()
+        ], ordered=False)
+    except BulkWriteError as e:
+        logger.warning(f"Status rollup update failed for {len(e.details.get('writeErrors', []))} clients")
+
+
+async def query_status_checks(db, client_name: Optional[str] = None, since: Optional[datetime] = None,
+                              until: Optional[datetime] = None, limit: int = 100,
+                              after: Optional[Tuple[datetime, str]] = None,
+                              bucket_seconds: int = 60) -> List[Dict[str, Any]]:
+    """Status checks newest first, optionally strictly after `after` = (timestamp, id) in that order.
+
+    Whole buckets are read in bucket order; checks of one bucket period are
+    merged across clients and overflow documents, so the output is totally
+    ordered by (timestamp, id).
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    if after is not None:
+        until = min(until, after[0]) if until else after[0]
+    filter_dict: Dict[str, Any] = {}
+    if client_name:
+        filter_dict["client_name"] = client_name
+    if since or until:
+        filter_dict["bucket"] = {}
+        if since:
+            filter_dict["bucket"]["$gte"] = bucket_start(since, bucket_seconds)
+        if until:
+            filter_dict["bucket"]["$lte"] = until
+
+    def wanted(check):
+        if since and check["timestamp"] < since:
+            return False
+        if until and check["timestamp"] > until:
+            return False
+        return after is None or (check["timestamp"], check["id"]) < after
+
+    results: List[Dict[str, Any]] = []
+    cursor = db[BUCKETS].find(filter_dict, {"_id": 0}).sort("bucket", DESCENDING)
+    # Keyed by id: a batch retried after its bucket overflowed can be stored twice
+    period: Dict[str, Dict[str, Any]] = {}
+    current = None
+    async for bucket in cursor:
+        if bucket["bucket"] != current:
+            results.extend(sorted(period.values(), key=lambda c: (c["timestamp"], c["id"]), reverse=True))
+            if len(results) >= limit:
+                return results[:limit]
+            period, current = {}, bucket["bucket"]
+        for check in bucket.get("checks", []):
+            if wanted(check):
+                period[check["id"]] = {"id": check["id"], "client_name": bucket["client_name"],
+                                       "timestamp": check["timestamp"]}
+    results.extend(sorted(period.values(), key=lambda c: (c["timestamp"], c["id"]), reverse=True))
+    return results[:limit]
+
+
+async def migrate_legacy_status_checks(db, bucket_seconds: int = 60, batch_size: int = 1000,
+                                       worker: str = "") -> int:
+    """Copy rows of the old one-document-per-check status_checks collection into buckets.
+
+    One worker claims the migration in the migrations collection and
+    records the last copied _id after every batch, so an interrupted run
+    resumes where it stopped. status_checks is left in place and can be
+    dropped once the migration is marked done. Returns the rows copied.
+    """
+    now = datetime.utcnow()
+    try:
+        claim = await db[MIGRATIONS].find_one_and_update(
+            {"_id": LEGACY_CHECKS, "done": {"$ne": True},
+             "$or": [{"heartbeat": {"$exists": False}}, {"heartbeat": {"$lt": now - MIGRATION_CLAIM_TIMEOUT}}]},
+            {"$set": {"worker": worker, "heartbeat": now}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return 0  # Done already, or another worker is on it
+    resume_after = (claim or {}).get("resume_after")
+
+    copied = 0
+    while True:
+        filter_dict = {"_id": {"$gt": resume_after}} if resume_after is not None else {}
+        rows = await db[LEGACY_CHECKS].find(filter_dict).sort("_id", ASCENDING).to_list(batch_size)
+        if not rows:
+            break
+        await write_status_checks(db, [
+            {"id": row.get("id") or str(row["_id"]), "client_name": row.get("client_name", ""),
+             "timestamp": naive_utc(row["timestamp"])}
+            for row in rows if isinstance(row.get("timestamp"), datetime)
+        ], bucket_seconds)
+        resume_after = rows[-1]["_id"]
+        copied += len(rows)
+        await db[MIGRATIONS].update_one(
+            {"_id": LEGACY_CHECKS},
+            {"$set": {"resume_after": resume_after, "heartbeat": datetime.utcnow()}, "$inc": {"copied": len(rows)}},
+        )
+    await db[MIGRATIONS].update_one({"_id": LEGACY_CHECKS}, {"$set": {"done": True, "finished_at": datetime.utcnow()}})
+    if copied:
+        logger.info(f"Copied {copied} legacy status_checks rows into {BUCKETS}")
+    return copied
+
+
+async def status_rollup(db, client_name: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+    """Per-client heartbeat counts and first/last seen timestamps, most recently seen first"""
+    filter_dict = {"client_name": client_name} if client_name else {}
+    return await db[CLIENTS].find(filter_dict, {"_id": 0}).sort("last_seen", DESCENDING).to_list(limit)
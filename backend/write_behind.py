@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Acknowledge writes immediately and persist them in batches.
+
+    Documents queue in memory and a single flusher task writes them with one
+    `write(batch)` call once `max_batch` are waiting or `flush_interval`
+    seconds passed since the first one arrived. The queue holds at most
+    `max_pending` documents: when the database lags, submit() waits for room,
+    which slows clients down instead of growing memory. Failed batches are
+    retried `max_retries` times, then dropped and counted.
+    """
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], Awaitable[Any]], max_batch: int = 500,
+                 flush_interval: float = 0.05, max_pending: int = 10000, max_retries: int = 3,
+                 retry_delay: float = 0.5):
+        self.write = write
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.waits = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, doc: Dict[str, Any]) -> None:
+        self.start()
+        if self._queue.full():
+            self.waits += 1
+        await self._queue.put(doc)
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            # Take whatever is already queued without waiting
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self.write(batch)
+                self.written += len(batch)
+                self.batches += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.dropped += len(batch)
+                    logger.error(f"Dropping {len(batch)} buffered writes after {attempt + 1} attempts: {e}")
+                    return
+                logger.warning(f"Buffered write of {len(batch)} documents failed, retrying: {e}")
+                await asyncio.sleep(self.retry_delay * (attempt + 1))
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            # Not cancelled mid-write, close() waits for the batch instead
+            await asyncio.shield(self._flush(batch))
+            for _ in batch:
+                self._queue.task_done()
+
+    async def close(self) -> None:
+        """Write out everything still queued, then stop the flusher"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "backpressure_waits": self.waits,
+        }
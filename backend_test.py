@@ -1,11 +1,23 @@
-import requests
+import argparse
+import asyncio
+import contextvars
+import httpx
+import os
 import sys
 import json
 from datetime import datetime
+from pathlib import Path
+
+DEFAULT_BASE_URL = "https://d10517c8-a2cc-43ed-8798-fb61a8d9c86e.preview.emergentagent.com"
+
+# Output of the check running in the current task, printed in one piece when it ends
+_output = contextvars.ContextVar("output", default=None)
 
 class CalisthenicsProductTester:
-    def __init__(self, base_url="https://d10517c8-a2cc-43ed-8798-fb61a8d9c86e.preview.emergentagent.com"):
+    def __init__(self, client, base_url="", parallelism=8):
+        self.client = client  # One pooled httpx.AsyncClient shared by every check
         self.base_url = base_url
+        self.limit = asyncio.Semaphore(parallelism)
         self.tests_run = 0
         self.tests_passed = 0
         self.product_id = None  # Will store a product ID for individual product tests
@@ -30,66 +42,81 @@ class CalisthenicsProductTester:
             'Premium Training Hoodie'
         ]
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
+    def log(self, message):
+        output = _output.get()
+        if output is None:
+            print(message)
+        else:
+            output.append(message)
+
+    async def isolated(self, check):
+        """Run one check, printing its output together once it is done"""
+        async def run():
+            _output.set([])
+            try:
+                return await check
+            finally:
+                print("\n".join(_output.get()))
+        return await asyncio.create_task(run())
+
+    async def run_concurrently(self, *checks):
+        """Run independent checks at the same time, at most `parallelism` requests in flight"""
+        return await asyncio.gather(*(self.isolated(check) for check in checks))
+
+    async def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
         """Run a single API test"""
         url = f"{self.base_url}/api/{endpoint}"
         if headers is None:
             headers = {'Content-Type': 'application/json'}
 
         self.tests_run += 1
-        print(f"\n🔍 Testing {name}...")
+        self.log(f"\n🔍 Testing {name}...")
         
         try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers)
-            elif method == 'POST':
-                response = requests.post(url, json=data, headers=headers)
-            elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
+            async with self.limit:
+                response = await self.client.request(method, url, json=data, headers=headers)
 
             success = response.status_code == expected_status
             if success:
                 self.tests_passed += 1
-                print(f"✅ Passed - Status: {response.status_code}")
+                self.log(f"✅ Passed - Status: {response.status_code}")
                 try:
                     return success, response.json() if response.text else {}
                 except json.JSONDecodeError:
                     return success, {}
             else:
-                print(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
-                print(f"Response: {response.text}")
+                self.log(f"❌ Failed - Expected {expected_status}, got {response.status_code}")
+                self.log(f"Response: {response.text}")
                 return False, {}
 
         except Exception as e:
-            print(f"❌ Failed - Error: {str(e)}")
+            self.log(f"❌ Failed - Error: {str(e)}")
             return False, {}
 
-    def test_root_endpoint(self):
+    async def test_root_endpoint(self):
         """Test the root API endpoint"""
-        success, data = self.run_test(
+        success, data = await self.run_test(
             "Root API Endpoint",
             "GET",
             "",
             200
         )
         if success:
-            print(f"Response: {data}")
+            self.log(f"Response: {data}")
             if data.get("message") == "Hello World":
-                print("✅ Root endpoint returns 'Hello World'")
+                self.log("✅ Root endpoint returns 'Hello World'")
             else:
-                print("❌ Root endpoint does not return 'Hello World'")
+                self.log("❌ Root endpoint does not return 'Hello World'")
                 success = False
                 self.tests_passed -= 1
         return success, data
 
-    def test_create_status_check(self):
+    async def test_create_status_check(self):
         """Test creating a status check"""
         data = {
             "client_name": f"test_client_{datetime.now().strftime('%H%M%S')}"
         }
-        return self.run_test(
+        return await self.run_test(
             "Create Status Check",
             "POST",
             "status",
@@ -97,18 +124,18 @@ class CalisthenicsProductTester:
             data=data
         )
 
-    def test_get_status_checks(self):
+    async def test_get_status_checks(self):
         """Test getting status checks"""
-        return self.run_test(
+        return await self.run_test(
             "Get Status Checks",
             "GET",
             "status",
             200
         )
         
-    def test_seed_products(self):
+    async def test_seed_products(self):
         """Test seeding products into the database"""
-        success, data = self.run_test(
+        success, data = await self.run_test(
             "Seed Products",
             "POST",
             "products/seed",
@@ -118,7 +145,7 @@ class CalisthenicsProductTester:
         # If seeding fails with a 500 error, it's likely due to validation errors
         # Let's try to manually seed a valid product
         if not success:
-            print("⚠️ Product seeding failed. Attempting to manually seed a valid product...")
+            self.log("⚠️ Product seeding failed. Attempting to manually seed a valid product...")
             
             # Create a valid product with all required fields
             valid_product = {
@@ -143,7 +170,7 @@ class CalisthenicsProductTester:
                 "status": "active"
             }
             
-            success, data = self.run_test(
+            success, data = await self.run_test(
                 "Create Single Product",
                 "POST",
                 "products",
@@ -152,23 +179,23 @@ class CalisthenicsProductTester:
             )
             
             if success:
-                print("✅ Successfully created a single product manually")
-                print(f"Product: {data['name']}")
+                self.log("✅ Successfully created a single product manually")
+                self.log(f"Product: {data['name']}")
             else:
-                print("❌ Failed to create a product manually")
+                self.log("❌ Failed to create a product manually")
         else:
-            print(f"Response: {data}")
+            self.log(f"Response: {data}")
             if "message" in data and "products" in data:
-                print(f"✅ Successfully seeded {len(data['products'])} products")
-                print(f"Products: {', '.join(data['products'])}")
+                self.log(f"✅ Successfully seeded {len(data['products'])} products")
+                self.log(f"Products: {', '.join(data['products'])}")
             else:
-                print("❌ Unexpected response format from product seeding")
+                self.log("❌ Unexpected response format from product seeding")
         
         return success, data
         
-    def test_get_all_products(self):
+    async def test_get_all_products(self):
         """Test getting all products and validate the comprehensive catalog"""
-        success, data = self.run_test(
+        success, data = await self.run_test(
             "Get All Products",
             "GET",
             "products",
@@ -176,20 +203,20 @@ class CalisthenicsProductTester:
         )
         if success:
             if isinstance(data, list):
-                print(f"✅ Retrieved {len(data)} products")
+                self.log(f"✅ Retrieved {len(data)} products")
                 
                 # Check if we have at least 15 products as required
                 if len(data) >= 15:
-                    print(f"✅ Product catalog has {len(data)} products (requirement: at least 15)")
+                    self.log(f"✅ Product catalog has {len(data)} products (requirement: at least 15)")
                 else:
-                    print(f"❌ Product catalog has only {len(data)} products (requirement: at least 15)")
+                    self.log(f"❌ Product catalog has only {len(data)} products (requirement: at least 15)")
                     success = False
                     self.tests_passed -= 1
                 
                 if len(data) > 0:
                     # Store a product ID for later tests
                     self.product_id = data[0]["id"]
-                    print(f"Sample product: {data[0]['name']} (ID: {self.product_id})")
+                    self.log(f"Sample product: {data[0]['name']} (ID: {self.product_id})")
                     
                     # Validate product structure
                     self._validate_product_structure(data[0])
@@ -209,16 +236,16 @@ class CalisthenicsProductTester:
                     # Check for image URLs
                     self._check_image_urls(data)
                 else:
-                    print("⚠️ No products found. Make sure to run seed_products first.")
+                    self.log("⚠️ No products found. Make sure to run seed_products first.")
             else:
-                print("❌ Expected a list of products")
+                self.log("❌ Expected a list of products")
                 success = False
                 self.tests_passed -= 1
         return success, data
         
-    def test_get_featured_products(self):
+    async def test_get_featured_products(self):
         """Test getting featured products (rating >= 4.0)"""
-        success, data = self.run_test(
+        success, data = await self.run_test(
             "Get Featured Products",
             "GET",
             "products/featured",
@@ -226,27 +253,27 @@ class CalisthenicsProductTester:
         )
         if success:
             if isinstance(data, list):
-                print(f"✅ Retrieved {len(data)} featured products")
+                self.log(f"✅ Retrieved {len(data)} featured products")
                 if len(data) > 0:
                     # Verify all products have rating >= 4.0
                     all_featured = all(product["rating"] >= 4.0 for product in data)
                     if all_featured:
-                        print("✅ All featured products have rating >= 4.0")
+                        self.log("✅ All featured products have rating >= 4.0")
                     else:
-                        print("❌ Some featured products have rating < 4.0")
+                        self.log("❌ Some featured products have rating < 4.0")
                         success = False
                         self.tests_passed -= 1
                 else:
-                    print("⚠️ No featured products found")
+                    self.log("⚠️ No featured products found")
             else:
-                print("❌ Expected a list of products")
+                self.log("❌ Expected a list of products")
                 success = False
                 self.tests_passed -= 1
         return success, data
         
-    def test_get_products_by_category(self, category):
+    async def test_get_products_by_category(self, category):
         """Test getting products by main category"""
-        success, data = self.run_test(
+        success, data = await self.run_test(
             f"Get Products by Category: {category}",
             "GET",
             f"products/category/{category}",
@@ -254,38 +281,38 @@ class CalisthenicsProductTester:
         )
         if success:
             if isinstance(data, list):
-                print(f"✅ Retrieved {len(data)} products in category '{category}'")
+                self.log(f"✅ Retrieved {len(data)} products in category '{category}'")
                 if len(data) > 0:
                     # Verify all products have the correct category
                     all_correct_category = all(product["category"] == category for product in data)
                     if all_correct_category:
-                        print(f"✅ All products have category '{category}'")
+                        self.log(f"✅ All products have category '{category}'")
                     else:
-                        print(f"❌ Some products do not have category '{category}'")
+                        self.log(f"❌ Some products do not have category '{category}'")
                         success = False
                         self.tests_passed -= 1
                 else:
-                    print(f"⚠️ No products found in category '{category}'")
+                    self.log(f"⚠️ No products found in category '{category}'")
             else:
-                print("❌ Expected a list of products")
+                self.log("❌ Expected a list of products")
                 success = False
                 self.tests_passed -= 1
         return success, data
         
-    def test_get_product_by_id(self):
+    async def test_get_product_by_id(self):
         """Test getting a specific product by ID and validate detailed attributes"""
         if not self.product_id:
-            print("⚠️ No product ID available. Run test_get_all_products first.")
+            self.log("⚠️ No product ID available. Run test_get_all_products first.")
             return False, {}
             
-        success, data = self.run_test(
+        success, data = await self.run_test(
             f"Get Product by ID: {self.product_id}",
             "GET",
             f"products/{self.product_id}",
             200
         )
         if success:
-            print(f"✅ Retrieved product: {data['name']}")
+            self.log(f"✅ Retrieved product: {data['name']}")
             
             # Validate basic product structure
             self._validate_product_structure(data)
@@ -294,10 +321,10 @@ class CalisthenicsProductTester:
             self._validate_product_details(data)
         return success, data
         
-    def test_get_nonexistent_product(self):
+    async def test_get_nonexistent_product(self):
         """Test getting a non-existent product (should return 404)"""
         fake_id = "00000000-0000-0000-0000-000000000000"
-        success, data = self.run_test(
+        success, data = await self.run_test(
             f"Get Non-existent Product (ID: {fake_id})",
             "GET",
             f"products/{fake_id}",
@@ -305,10 +332,10 @@ class CalisthenicsProductTester:
         )
         return success, data
         
-    def test_invalid_category(self):
+    async def test_invalid_category(self):
         """Test with an invalid category (should return 422 Unprocessable Entity)"""
         invalid_category = "invalid_category"
-        success, data = self.run_test(
+        success, data = await self.run_test(
             f"Get Products with Invalid Category: {invalid_category}",
             "GET",
             f"products/category/{invalid_category}",
@@ -327,17 +354,17 @@ class CalisthenicsProductTester:
         missing_fields = [field for field in required_fields if field not in product]
         
         if not missing_fields:
-            print("✅ Product has all required fields")
+            self.log("✅ Product has all required fields")
         else:
-            print(f"❌ Product is missing fields: {', '.join(missing_fields)}")
+            self.log(f"❌ Product is missing fields: {', '.join(missing_fields)}")
             
         # Check specifications
         if "specifications" in product:
             specs = product["specifications"]
             if isinstance(specs, dict) and len(specs) > 0:
-                print("✅ Product has specifications")
+                self.log("✅ Product has specifications")
             else:
-                print("❌ Product has incomplete specifications")
+                self.log("❌ Product has incomplete specifications")
     
     def _check_key_products(self, products):
         """Check if all key products exist in the catalog"""
@@ -356,26 +383,26 @@ class CalisthenicsProductTester:
                 missing_products.append(key_product)
         
         if not missing_products:
-            print(f"✅ All key products found: {', '.join(found_products)}")
+            self.log(f"✅ All key products found: {', '.join(found_products)}")
         else:
-            print(f"❌ Missing key products: {', '.join(missing_products)}")
-            print(f"✅ Found key products: {', '.join(found_products)}")
+            self.log(f"❌ Missing key products: {', '.join(missing_products)}")
+            self.log(f"✅ Found key products: {', '.join(found_products)}")
     
     def _check_subcategories(self, products):
         """Check if products include all expected subcategories"""
         found_subcategories = set()
         
         for product in products:
-            if "subcategory" in product:
+            if product.get("subcategory"):
                 found_subcategories.add(product["subcategory"])
         
         missing_subcategories = [sc for sc in self.expected_subcategories if sc not in found_subcategories]
         
         if not missing_subcategories:
-            print(f"✅ All expected subcategories found: {', '.join(found_subcategories)}")
+            self.log(f"✅ All expected subcategories found: {', '.join(found_subcategories)}")
         else:
-            print(f"❌ Missing subcategories: {', '.join(missing_subcategories)}")
-            print(f"✅ Found subcategories: {', '.join(found_subcategories)}")
+            self.log(f"❌ Missing subcategories: {', '.join(missing_subcategories)}")
+            self.log(f"✅ Found subcategories: {', '.join(found_subcategories)}")
     
     def _validate_product_data(self, products):
         """Validate that products have proper pricing, ratings, and specifications"""
@@ -384,26 +411,26 @@ class CalisthenicsProductTester:
         valid_specs = all("specifications" in p and isinstance(p["specifications"], dict) for p in products)
         
         if valid_pricing:
-            print("✅ All products have valid pricing")
+            self.log("✅ All products have valid pricing")
         else:
-            print("❌ Some products have invalid pricing")
+            self.log("❌ Some products have invalid pricing")
             
         if valid_ratings:
-            print("✅ All products have valid ratings (0-5)")
+            self.log("✅ All products have valid ratings (0-5)")
         else:
-            print("❌ Some products have invalid ratings")
+            self.log("❌ Some products have invalid ratings")
             
         if valid_specs:
-            print("✅ All products have specifications")
+            self.log("✅ All products have specifications")
         else:
-            print("❌ Some products are missing specifications")
+            self.log("❌ Some products are missing specifications")
     
     def _check_bundle_suggestions(self, products):
         """Check if products have bundle suggestions"""
         products_with_bundles = [p for p in products if "bundle_suggestions" in p and p["bundle_suggestions"]]
         
         if products_with_bundles:
-            print(f"✅ {len(products_with_bundles)} products have bundle suggestions")
+            self.log(f"✅ {len(products_with_bundles)} products have bundle suggestions")
             
             # Verify that bundle suggestions reference valid product IDs
             all_product_ids = [p["id"] for p in products]
@@ -413,21 +440,21 @@ class CalisthenicsProductTester:
                 for bundle_id in product["bundle_suggestions"]:
                     if bundle_id not in all_product_ids:
                         valid_bundles = False
-                        print(f"❌ Product '{product['name']}' has invalid bundle suggestion: {bundle_id}")
+                        self.log(f"❌ Product '{product['name']}' has invalid bundle suggestion: {bundle_id}")
             
             if valid_bundles:
-                print("✅ All bundle suggestions reference valid product IDs")
+                self.log("✅ All bundle suggestions reference valid product IDs")
         else:
-            print("❌ No products have bundle suggestions")
+            self.log("❌ No products have bundle suggestions")
     
     def _check_image_urls(self, products):
         """Check if all products have image URLs"""
         products_with_images = [p for p in products if "images" in p and p["images"]]
         
         if len(products_with_images) == len(products):
-            print("✅ All products have image URLs")
+            self.log("✅ All products have image URLs")
         else:
-            print(f"❌ {len(products) - len(products_with_images)} products are missing image URLs")
+            self.log(f"❌ {len(products) - len(products_with_images)} products are missing image URLs")
     
     def _validate_product_details(self, product):
         """Validate that a product has skill levels, prerequisites, and benefits"""
@@ -436,26 +463,26 @@ class CalisthenicsProductTester:
         has_benefits = "benefits" in product and isinstance(product["benefits"], list)
         
         if has_skill_levels:
-            print(f"✅ Product has skill levels: {', '.join(product['skill_levels'])}")
+            self.log(f"✅ Product has skill levels: {', '.join(product['skill_levels'])}")
         else:
-            print("❌ Product is missing skill levels")
+            self.log("❌ Product is missing skill levels")
             
         if has_prerequisites:
             if product["prerequisites"]:
-                print(f"✅ Product has prerequisites: {', '.join(product['prerequisites'])}")
+                self.log(f"✅ Product has prerequisites: {', '.join(product['prerequisites'])}")
             else:
-                print("✅ Product has no prerequisites (empty list)")
+                self.log("✅ Product has no prerequisites (empty list)")
         else:
-            print("❌ Product is missing prerequisites field")
+            self.log("❌ Product is missing prerequisites field")
             
         if has_benefits:
-            print(f"✅ Product has benefits: {', '.join(product['benefits'])}")
+            self.log(f"✅ Product has benefits: {', '.join(product['benefits'])}")
         else:
-            print("❌ Product is missing benefits")
+            self.log("❌ Product is missing benefits")
             
-    def seed_multiple_products(self):
+    async def seed_multiple_products(self):
         """Seed multiple products to ensure a comprehensive catalog"""
-        print("\n🔍 Seeding multiple products to build catalog...")
+        self.log("\n🔍 Seeding multiple products to build catalog...")
         
         # Create a list of valid products with all required fields
         products = [
@@ -716,9 +743,8 @@ class CalisthenicsProductTester:
             }
         ]
         
-        success_count = 0
-        for product in products:
-            success, data = self.run_test(
+        async def create(product):
+            success, data = await self.run_test(
                 f"Create Product: {product['name']}",
                 "POST",
                 "products",
@@ -726,58 +752,89 @@ class CalisthenicsProductTester:
                 data=product
             )
             if success:
-                success_count += 1
-                print(f"✅ Successfully created product: {data['name']}")
+                self.log(f"✅ Successfully created product: {data['name']}")
             else:
-                print(f"❌ Failed to create product: {product['name']}")
-        
-        print(f"\n✅ Successfully created {success_count}/{len(products)} products")
+                self.log(f"❌ Failed to create product: {product['name']}")
+            return success
+
+        results = await self.run_concurrently(*(create(product) for product in products))
+        success_count = sum(results)
+        self.log(f"\n✅ Successfully created {success_count}/{len(products)} products")
         return success_count == len(products)
 
-def main():
-    # Setup
-    tester = CalisthenicsProductTester()
-    
+async def run_checks(tester):
     # Run tests
     print("\n===== Testing Calisthenics Product Catalog API =====\n")
     
     # 1. Test basic status endpoints
     print("\n=== Testing Basic Status Endpoints ===")
-    tester.test_root_endpoint()
-    tester.test_get_status_checks()
+    await tester.run_concurrently(tester.test_root_endpoint(), tester.test_get_status_checks())
     
     # 2. Test product seeding
     print("\n=== Testing Product Seeding ===")
-    seed_success, _ = tester.test_seed_products()
+    seed_success, _ = await tester.isolated(tester.test_seed_products())
     
     # If seeding failed or we don't have enough products, seed multiple products manually
     if not seed_success or tester.tests_passed < tester.tests_run:
-        tester.seed_multiple_products()
-    
-    # 3. Test product retrieval endpoints
-    print("\n=== Testing Product Retrieval Endpoints ===")
-    tester.test_get_all_products()
-    tester.test_get_featured_products()
+        await tester.seed_multiple_products()
     
-    # 4. Test category filtering
-    print("\n=== Testing Category Filtering ===")
-    tester.test_get_products_by_category("equipment")
-    tester.test_get_products_by_category("accessories")
-    tester.test_get_products_by_category("apparel")
+    # 3-4, 6. Product retrieval, category filtering and edge cases are independent reads
+    print("\n=== Testing Product Retrieval, Category Filtering and Edge Cases ===")
+    await tester.run_concurrently(
+        tester.test_get_all_products(),
+        tester.test_get_featured_products(),
+        tester.test_get_products_by_category("equipment"),
+        tester.test_get_products_by_category("accessories"),
+        tester.test_get_products_by_category("apparel"),
+        tester.test_get_nonexistent_product(),
+        tester.test_invalid_category(),
+    )
     
-    # 5. Test product details
+    # 5. Test product details, using an id from the product list
     print("\n=== Testing Product Details ===")
     if tester.product_id:
-        tester.test_get_product_by_id()
-    
-    # 6. Test edge cases
-    print("\n=== Testing Edge Cases ===")
-    tester.test_get_nonexistent_product()
-    tester.test_invalid_category()
+        await tester.isolated(tester.test_get_product_by_id())
     
     # Print results
     print(f"\n📊 Tests passed: {tester.tests_passed}/{tester.tests_run}")
     return 0 if tester.tests_passed == tester.tests_run else 1
 
+def load_server(mongomock):
+    """Import backend/server.py for in-process runs, optionally on an in-memory database"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "backend"))
+    if mongomock:
+        os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+        os.environ.setdefault("DB_NAME", "backend_test")
+    import server
+    if mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+    return server
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.parallelism, max_keepalive_connections=args.parallelism)
+    if not args.asgi:
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+            return await run_checks(CalisthenicsProductTester(client, args.base_url.rstrip("/"), args.parallelism))
+
+    server = load_server(args.mongomock)
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=args.timeout) as client:
+            return await run_checks(CalisthenicsProductTester(client, "", args.parallelism))
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the Calisthenics Product Catalog API")
+    parser.add_argument("--base-url", default=os.environ.get("BACKEND_URL", DEFAULT_BASE_URL))
+    parser.add_argument("--parallelism", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds per request")
+    parser.add_argument("--asgi", action="store_true",
+                        help="call backend/server.py in-process instead of --base-url, using its MONGO_URL")
+    parser.add_argument("--mongomock", action="store_true", help="with --asgi, use an in-memory database")
+    args = parser.parse_args()
+    if args.mongomock:
+        args.asgi = True
+    return asyncio.run(run(args))
+
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Rows/sec for POST /api/products/bulk with JSON array and NDJSON bodies.
+
+    python benchmarks/bench_bulk.py --rows 10000 100000 --chunk-size 1000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import orjson
+
+from common import backend_name, load_server, running_app, synthetic_product
+
+
+def build_rows(count, rng):
+    rows = []
+    for i in range(count):
+        row = synthetic_product(i, rng)
+        del row["created_at"], row["updated_at"]
+        rows.append(row)
+    return rows
+
+
+async def import_rows(client, body, content_type, mode, chunk_size):
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/products/bulk",
+        params={"mode": mode, "chunk_size": chunk_size},
+        content=body,
+        headers={"content-type": content_type},
+        timeout=None,
+    )
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed, response.json()
+
+
+async def run(args):
+    server = load_server()
+    rng = random.Random(7)
+
+    print(f"\n===== Bulk import (chunk_size={args.chunk_size}, {backend_name()}) =====")
+    print(f"{'rows':>8} {'format':>7} {'mode':>7} {'seconds':>8} {'rows/s':>10} {'failed':>7}")
+    async with running_app(server) as client:
+        for count in args.rows:
+            rows = build_rows(count, rng)
+            bodies = {
+                "json": (orjson.dumps(rows), "application/json"),
+                "ndjson": (b"\n".join(orjson.dumps(row) for row in rows), "application/x-ndjson"),
+            }
+            for fmt, (body, content_type) in bodies.items():
+                # insert into an empty collection, then upsert the same ids over it
+                await server.db.products.delete_many({})
+                for mode in ("insert", "upsert"):
+                    elapsed, report = await import_rows(client, body, content_type, mode, args.chunk_size)
+                    print(f"{count:>8} {fmt:>7} {mode:>7} {elapsed:>8.2f} {count / elapsed:>10.0f} "
+                          f"{report['failed']:>7}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
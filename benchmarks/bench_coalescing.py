@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Database queries/sec vs concurrent clients with request coalescing on and off.
+
+Clients hammer /api/products/featured and /api/products/category/equipment
+with the response cache disabled, so every request is a miss. Without
+coalescing each one issues its own query; with it, concurrent identical
+requests share one. --db-latency adds a delay to every query to stand in for
+a real network round-trip when running against mongomock.
+
+    python benchmarks/bench_coalescing.py --clients 1 10 50 200 --db-latency 5
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import backend_name, load_server, running_app, seed_catalog, summarize
+
+URLS = ["/api/products/featured", "/api/products/category/equipment"]
+
+
+class CountingCursor:
+    def __init__(self, cursor, collection):
+        self._cursor = cursor
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if name in ("sort", "skip", "limit"):
+            return lambda *args, **kwargs: CountingCursor(attr(*args, **kwargs), self._collection)
+        return attr
+
+    async def to_list(self, length):
+        await self._collection.round_trip()
+        return await self._cursor.to_list(length)
+
+
+class CountingCollection:
+    """Counts find/find_one calls and delays each one by `latency` seconds"""
+
+    def __init__(self, collection, latency):
+        self._collection = collection
+        self.latency = latency
+        self.queries = 0
+
+    async def round_trip(self):
+        self.queries += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def find(self, *args, **kwargs):
+        return CountingCursor(self._collection.find(*args, **kwargs), self)
+
+    async def find_one(self, *args, **kwargs):
+        await self.round_trip()
+        return await self._collection.find_one(*args, **kwargs)
+
+
+class CountingDatabase:
+    def __init__(self, db, latency):
+        self._db = db
+        self.products = CountingCollection(db.products, latency)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self.products if name == "products" else self._db[name]
+
+
+async def load(client, clients, requests_per_client):
+    timings = []
+
+    async def worker(offset):
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            response = await client.get(URLS[(offset + i) % len(URLS)])
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return time.perf_counter() - start, timings
+
+
+async def run(args):
+    server = load_server()
+    await seed_catalog(server.db, args.products)
+    server.db = counting = CountingDatabase(server.db, args.db_latency / 1000)
+
+    print(f"\n===== Request coalescing ({backend_name()}, {args.products} products, "
+          f"{args.db_latency} ms added per query) =====")
+    print(f"{'clients':>8} {'coalesce':>9} {'req/s':>9} {'queries/s':>10} {'queries/req':>12} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    async with running_app(server) as client:
+        for clients in args.clients:
+            for enabled in (False, True):
+                server.catalog_flights.enabled = enabled
+                counting.products.queries = 0
+                elapsed, timings = await load(client, clients, args.requests)
+                stats = summarize(timings)
+                queries = counting.products.queries
+                print(f"{clients:>8} {'on' if enabled else 'off':>9} {len(timings) / elapsed:>9.0f} "
+                      f"{queries / elapsed:>10.0f} {queries / len(timings):>12.3f} "
+                      f"{stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--db-latency", type=float, default=5.0, help="milliseconds added to every query")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
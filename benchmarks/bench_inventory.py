@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Contention on one hot SKU: thousands of concurrent reservers, no overselling.
+
+Every client tries to reserve one unit of the same product, which starts
+with --stock units. Exactly --stock reservations must succeed, the rest get
+409, and the product must end at zero stock and out_of_stock. --legacy also
+runs the old read-then-PUT approach for comparison, which can oversell.
+
+    python benchmarks/bench_inventory.py --clients 5000 --stock 1000
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import backend_name, load_server, running_app, summarize, synthetic_product
+
+
+async def reserve_once(client, product_id, timings):
+    start = time.perf_counter()
+    response = await client.post(f"/api/products/{product_id}/reserve", json={"quantity": 1})
+    timings.append(time.perf_counter() - start)
+    if response.status_code not in (200, 409):
+        response.raise_for_status()
+    return response.status_code == 200
+
+
+async def legacy_reserve_once(client, product_id, timings):
+    start = time.perf_counter()
+    stock = (await client.get(f"/api/products/{product_id}")).json()["stock_quantity"]
+    sold = False
+    if stock >= 1:
+        response = await client.put(f"/api/products/{product_id}", json={"stock_quantity": stock - 1})
+        response.raise_for_status()
+        sold = True
+    timings.append(time.perf_counter() - start)
+    return sold
+
+
+async def contend(server, client, reserve, clients, stock, concurrency):
+    product = synthetic_product(0)
+    product.update(stock_quantity=stock, status="active")
+    await server.db.products.delete_many({})
+    await server.db.products.insert_one(product)
+    server.update_product_indexes(product["id"], product)
+
+    timings = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def reserver():
+        async with gate:
+            return await reserve(client, product["id"], timings)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(reserver() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    final = await server.db.products.find_one({"id": product["id"]})
+    return {
+        "sold": sum(results),
+        "final_stock": final["stock_quantity"],
+        "final_status": final["status"],
+        "elapsed": elapsed,
+        "latency": summarize(timings),
+    }
+
+
+async def run(args):
+    server = load_server()
+    modes = [("reserve", reserve_once)]
+    if args.legacy:
+        modes.append(("legacy GET+PUT", legacy_reserve_once))
+
+    print(f"\n===== Hot SKU contention ({backend_name()}, {args.clients} clients, "
+          f"{args.stock} in stock, {args.concurrency} in flight) =====")
+    print(f"{'mode':>16} {'sold':>6} {'oversold':>9} {'final stock':>12} {'status':>13} "
+          f"{'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    failed = False
+    async with running_app(server) as client:
+        for name, reserve in modes:
+            result = await contend(server, client, reserve, args.clients, args.stock, args.concurrency)
+            oversold = max(0, result["sold"] - args.stock)
+            print(f"{name:>16} {result['sold']:>6} {oversold:>9} {result['final_stock']:>12} "
+                  f"{result['final_status']:>13} {args.clients / result['elapsed']:>8.0f} "
+                  f"{result['latency']['p50_ms']:>8.2f} {result['latency']['p99_ms']:>8.2f}")
+            if reserve is reserve_once:
+                expected_sold = min(args.clients, args.stock)
+                if result["sold"] != expected_sold or result["final_stock"] != args.stock - expected_sold:
+                    print("ERROR: reservations did not match the available stock")
+                    failed = True
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=500, help="requests in flight at once")
+    parser.add_argument("--legacy", action="store_true", help="also run the read-then-PUT approach")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Request overhead of the Prometheus middleware and MongoDB command listener.
+
+Runs the same mix of catalog reads with metrics enabled and disabled, in
+alternating rounds so drift hits both modes alike, and compares the median
+round. The response cache is on by default: cheap cache hits are where a
+fixed per-request cost shows most, --no-cache measures database-bound
+requests instead. The command listener only sees traffic against a real mongod
+(BENCH_MONGO_URL); with mongomock only the HTTP middleware is measured.
+Exits non-zero when the overhead exceeds --max-overhead percent.
+
+    python benchmarks/bench_metrics.py --products 2000 --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from common import backend_name, load_server, running_app, seed_catalog, summarize
+
+
+def request_mix(product_ids, count, rng):
+    urls = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            urls.append("/api/products?limit=20")
+        elif kind == 1:
+            urls.append("/api/products/featured")
+        else:
+            urls.append(f"/api/products/{rng.choice(product_ids)}")
+    return urls
+
+
+async def run_round(client, urls, concurrency):
+    timings = []
+    queue = iter(urls)
+
+    async def worker():
+        for url in queue:
+            start = time.perf_counter()
+            response = await client.get(url)
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start, timings
+
+
+async def run(args):
+    server = load_server(CATALOG_CACHE_MAX_ENTRIES=0 if args.no_cache else 100000)
+    await seed_catalog(server.db, args.products)
+    rng = random.Random(7)
+    product_ids = [doc["id"] for doc in await server.db.products.find({}, {"id": 1}).to_list(None)]
+    urls = request_mix(product_ids, args.requests, rng)
+
+    results = {False: [], True: []}
+    latencies = {False: [], True: []}
+    async with running_app(server) as client:
+        await run_round(client, urls, args.concurrency)  # Warm up, and fill the cache
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                server.http_metrics.enabled = enabled
+                server.mongo_command_metrics.enabled = enabled
+                elapsed, timings = await run_round(client, urls, args.concurrency)
+                results[enabled].append(args.requests / elapsed)
+                latencies[enabled].extend(timings)
+
+    print(f"\n===== Metrics overhead ({backend_name()}, {args.products} products, "
+          f"cache {'off' if args.no_cache else 'on'}, {args.requests} requests x {args.rounds} rounds, "
+          f"{args.concurrency} in flight) =====")
+    print(f"{'metrics':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for enabled in (False, True):
+        stats = summarize(latencies[enabled])
+        print(f"{'on' if enabled else 'off':>8} {statistics.median(results[enabled]):>9.0f} "
+              f"{stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+    overhead = (1 - statistics.median(results[True]) / statistics.median(results[False])) * 100
+    print(f"throughput overhead: {overhead:.2f}%")
+    if overhead > args.max_overhead:
+        print(f"ERROR: overhead above {args.max_overhead}%")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--max-overhead", type=float, default=5.0, help="percent of throughput")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Compare deep-page latency of skip/limit and cursor pagination on GET /api/products.
+
+    python benchmarks/bench_pagination.py --products 50000 --limit 50
+"""
+import argparse
+import asyncio
+import sys
+
+from common import backend_name, load_server, running_app, seed_catalog, summarize, time_request
+
+
+async def cursor_at_depth(client, page, limit, sort):
+    """Walk the cursor chain to the start of `page` (not timed)"""
+    cursor = ""
+    for _ in range(page):
+        response = await client.get("/api/products", params={"cursor": cursor, "limit": limit, "sort": sort})
+        cursor = response.json()["next_cursor"]
+        if cursor is None:
+            raise SystemExit(f"Catalog is shallower than page {page}")
+    return cursor
+
+
+async def run(args):
+    server = load_server()
+    await seed_catalog(server.db, args.products)
+    pages = [p for p in (0, 10, 100, 500, 1000, 5000) if p * args.limit < args.products]
+
+    print(f"\n===== Deep-page latency ({args.products} products, limit={args.limit}, {backend_name()}) =====")
+    print(f"{'page':>6} {'skip p50':>10} {'skip p95':>10} {'cursor p50':>11} {'cursor p95':>11}")
+    async with running_app(server) as client:
+        for page in pages:
+            skip_params = {"skip": page * args.limit, "limit": args.limit, "sort": args.sort}
+            cursor_params = {"cursor": await cursor_at_depth(client, page, args.limit, args.sort),
+                             "limit": args.limit, "sort": args.sort}
+            skip_samples, cursor_samples = [], []
+            for _ in range(args.repeat):
+                elapsed, _ = await time_request(client, "GET", "/api/products", params=skip_params)
+                skip_samples.append(elapsed)
+                elapsed, _ = await time_request(client, "GET", "/api/products", params=cursor_params)
+                cursor_samples.append(elapsed)
+            skip, cursor = summarize(skip_samples), summarize(cursor_samples)
+            print(f"{page:>6} {skip['p50_ms']:>10.2f} {skip['p95_ms']:>10.2f} "
+                  f"{cursor['p50_ms']:>11.2f} {cursor['p95_ms']:>11.2f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--sort", default="created_at", choices=["created_at", "price", "rating"])
+    parser.add_argument("--repeat", type=int, default=20)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Compare payload size and latency of full documents against `fields=card` on GET /api/products.
+
+    python benchmarks/bench_projection.py --products 5000 --limit 100
+"""
+import argparse
+import asyncio
+import sys
+
+from common import backend_name, load_server, running_app, seed_catalog, summarize, time_request
+
+
+async def run(args):
+    server = load_server()
+    await seed_catalog(server.db, args.products)
+
+    print(f"\n===== Projection ({args.products} products, limit={args.limit}, {backend_name()}) =====")
+    print(f"{'fields':>8} {'bytes':>10} {'bytes/item':>11} {'p50 ms':>8} {'p95 ms':>8}")
+    async with running_app(server) as client:
+        for fields in (None, "detail", "card"):
+            params = {"limit": args.limit}
+            if fields:
+                params["fields"] = fields
+            samples, size, items = [], 0, 0
+            for _ in range(args.repeat):
+                elapsed, response = await time_request(client, "GET", "/api/products", params=params)
+                samples.append(elapsed)
+                size, items = len(response.content), len(response.json())
+            stats = summarize(samples)
+            print(f"{fields or 'full':>8} {size:>10} {size // max(items, 1):>11} "
+                  f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
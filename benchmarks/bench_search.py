@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Query latency of the in-process search index and GET /api/products/search.
+
+    python benchmarks/bench_search.py --products 50000
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from common import NAME_WORDS, TAGS, load_server, running_app, seed_catalog, summarize, synthetic_product
+
+QUERIES = ["parallettes", "chalk", "steel rings", "premium wooden bar", "par", "ch", "adjustable ve",
+           "grip", "resistance training", "elite hoodie"]
+
+
+def bench_index(index, queries, repeat):
+    samples = {}
+    for query in queries:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append(time.perf_counter() - start)
+        samples[query] = summarize(timings)
+    return samples
+
+
+async def run(args):
+    server = load_server()
+    rng = random.Random(11)
+    docs = [synthetic_product(i, rng) for i in range(args.products)]
+
+    start = time.perf_counter()
+    server.search_index.build(docs)
+    build_seconds = time.perf_counter() - start
+    queries = QUERIES + [" ".join(rng.sample(NAME_WORDS + TAGS, 2)) for _ in range(10)]
+
+    print(f"\n===== Search index ({args.products} products) =====")
+    print(f"build: {build_seconds:.2f}s, {server.search_index.stats()}")
+    print(f"{'query':>24} {'p50 ms':>8} {'p99 ms':>8}")
+    for query, stats in bench_index(server.search_index, queries, args.repeat).items():
+        print(f"{query:>24} {stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f}")
+
+    if args.http:
+        await seed_catalog(server.db, args.products)
+        async with running_app(server) as client:
+            timings = []
+            for _ in range(args.repeat):
+                for query in queries:
+                    start = time.perf_counter()
+                    response = await client.get("/api/products/search", params={"q": query})
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+            stats = summarize(timings)
+            print(f"\nGET /api/products/search: p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--http", action="store_true", help="also time the HTTP endpoint end to end")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
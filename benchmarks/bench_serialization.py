@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Requests/sec for GET /api/products?limit=100 on the legacy and fast read paths.
+
+"legacy" mounts the original handler shape: build Product models, then let
+FastAPI validate and encode them again through response_model. "validated"
+and "trusted" are the current handler with TRUST_CATALOG_DOCUMENTS off/on.
+
+    python benchmarks/bench_serialization.py --requests 500
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import List
+
+from common import backend_name, load_server, running_app, seed_catalog
+
+
+def mount_legacy_route(server):
+    @server.app.get("/legacy/products", response_model=List[server.Product])
+    async def legacy_get_products(limit: int = 100):
+        products = await server.db.products.find({}).limit(limit).to_list(limit)
+        return [server.Product(**product) for product in products]
+
+
+def encode_only(server, docs, rounds):
+    """Per-call CPU cost of turning documents into a response body, without the DB"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[server.Product])
+    docs = [{k: v for k, v in doc.items() if k != "_id"} for doc in docs]
+    paths = {
+        "legacy": lambda: JSONResponse(jsonable_encoder(
+            adapter.validate_python([server.Product(**doc) for doc in docs]))).body,
+        "validated": lambda: server.render_json([server.Product(**doc) for doc in docs]),
+        "trusted": lambda: server.render_json(docs),
+    }
+    results = {}
+    for name, encode in paths.items():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            encode()
+        results[name] = (time.perf_counter() - start) / rounds * 1000
+    return results
+
+
+async def requests_per_second(client, url, total, concurrency):
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            response = await client.get(url)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return total / (time.perf_counter() - start)
+
+
+async def run(args):
+    server = load_server()
+    await seed_catalog(server.db, args.products)
+    mount_legacy_route(server)
+    url = f"/api/products?limit={args.limit}"
+
+    print(f"\n===== Read path ({args.products} products, limit={args.limit}, {backend_name()}) =====")
+    async with running_app(server) as client:
+        legacy = await requests_per_second(client, f"/legacy/products?limit={args.limit}",
+                                           args.requests, args.concurrency)
+        server.TRUST_CATALOG_DOCUMENTS = False
+        validated = await requests_per_second(client, url, args.requests, args.concurrency)
+        server.TRUST_CATALOG_DOCUMENTS = True
+        trusted = await requests_per_second(client, url, args.requests, args.concurrency)
+
+    print(f"{'path':>10} {'req/s':>9} {'encode ms':>10}")
+    docs = await server.db.products.find({}).limit(args.limit).to_list(args.limit)
+    encode = encode_only(server, docs, args.rounds)
+    for name, rps in (("legacy", legacy), ("validated", validated), ("trusted", trusted)):
+        print(f"{name:>10} {rps:>9.1f} {encode[name]:>10.3f}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=200, help="iterations of the encode-only measurement")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
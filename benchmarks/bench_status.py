@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Heartbeats/sec for POST /api/status, per-request writes vs write-behind batching.
+
+Concurrent clients post heartbeats as fast as they can. --db-latency adds a
+delay to every bucket write to stand in for a real network round-trip when running
+against mongomock. After each run the app is shut down, which flushes the
+buffer, and the stored check count is checked against the requests sent.
+
+    python benchmarks/bench_status.py --clients 50 --requests 100 --db-latency 2
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from common import backend_name, load_server, running_app, summarize
+
+
+class SlowCollection:
+    """Delays bulk_write by `latency` seconds"""
+
+    def __init__(self, collection, latency):
+        self._collection = collection
+        self.latency = latency
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def bulk_write(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await self._collection.bulk_write(*args, **kwargs)
+
+
+class SlowDatabase:
+    def __init__(self, db, latency):
+        self._db = db
+        self.status_buckets = SlowCollection(db.status_buckets, latency)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self.status_buckets if name == "status_buckets" else self._db[name]
+
+
+async def stored_checks(db):
+    total = 0
+    async for bucket in db.status_buckets.find({}, {"checks.id": 1}):
+        total += len(bucket.get("checks", []))
+    return total
+
+
+async def post_heartbeats(client, clients, requests_per_client):
+    timings = []
+
+    async def worker(n):
+        for i in range(requests_per_client):
+            start = time.perf_counter()
+            response = await client.post("/api/status", json={"client_name": f"monitor-{n}"})
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return time.perf_counter() - start, timings
+
+
+async def run(args):
+    server = load_server()
+    raw_db = server.db
+    server.db = SlowDatabase(raw_db, args.db_latency / 1000)
+    total = args.clients * args.requests
+
+    print(f"\n===== POST /api/status ({backend_name()}, {args.clients} clients x {args.requests}, "
+          f"{args.db_latency} ms added per write) =====")
+    print(f"{'mode':>14} {'heartbeats/s':>13} {'p50 ms':>8} {'p99 ms':>8} {'stored':>8} {'batches':>8}")
+    failed = False
+    for name, write_behind in (("per request", False), ("write-behind", True)):
+        server.STATUS_WRITE_BEHIND = write_behind
+        await raw_db.status_buckets.delete_many({})
+        await raw_db.status_clients.delete_many({})
+        batches_before = server.status_writer.batches
+        # Leaving running_app runs the shutdown hooks, which flush the buffer
+        async with running_app(server) as client:
+            elapsed, timings = await post_heartbeats(client, args.clients, args.requests)
+        stored = await stored_checks(raw_db)
+        stats = summarize(timings)
+        print(f"{name:>14} {total / elapsed:>13.0f} {stats['p50_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+              f"{stored:>8} {server.status_writer.batches - batches_before:>8}")
+        if stored != total:
+            print(f"ERROR: {total - stored} heartbeats were not stored")
+            failed = True
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=100, help="heartbeats per client")
+    parser.add_argument("--db-latency", type=float, default=2.0, help="milliseconds added to every bucket write")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
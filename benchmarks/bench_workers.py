@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Startup time, load distribution and SIGHUP reloads of the multi-worker launcher.
+
+Starts gunicorn with backend/gunicorn.conf.py on a free local port and
+measures how long until /api/health/ready first answers and until every
+worker has. It then sends --requests requests over fresh connections and
+reports how many each worker served. With --reload it keeps the load going,
+sends SIGHUP, and checks that every worker is replaced without a single
+failed request (connections dropped before any response are retried once).
+Workers connect to MONGO_URL (or BENCH_MONGO_URL), which must be reachable.
+More than one worker also needs REDIS_URL (or BENCH_REDIS_URL), since
+gunicorn.conf.py refuses to run several workers without it.
+
+    python benchmarks/bench_workers.py --workers 4 --requests 2000 --reload
+"""
+import argparse
+import asyncio
+import collections
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args, port):
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), BIND=f"127.0.0.1:{port}")
+    if os.environ.get("BENCH_MONGO_URL"):
+        env["MONGO_URL"] = os.environ["BENCH_MONGO_URL"]
+    if os.environ.get("BENCH_REDIS_URL"):
+        env["REDIS_URL"] = os.environ["BENCH_REDIS_URL"]
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(BACKEND_DIR / "gunicorn.conf.py"), args.app],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+
+
+async def ready_workers(client, url, want, deadline, process):
+    """Poll readiness until `want` distinct workers answered.
+
+    Returns seconds to the first and to the last ready worker, and their pids.
+    """
+    start = time.perf_counter()
+    first = None
+    seen = set()
+    while len(seen) < want:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}")
+        if time.perf_counter() - start > deadline:
+            raise RuntimeError(f"only {len(seen)} of {want} workers ready after {deadline}s")
+        try:
+            response = await client.get(url)
+            if response.status_code == 200:
+                first = first or time.perf_counter() - start
+                seen.add(response.json()["worker"])
+                continue
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+    return first, time.perf_counter() - start, seen
+
+
+async def send_load(client, url, total, concurrency, retry=False):
+    """GET `url` `total` times; with `retry`, a connection dropped before any response is retried once.
+
+    Returns requests served per worker pid, failed requests and retried requests.
+    """
+    served = collections.Counter()
+    failures = 0
+    retried = 0
+    queue = iter(range(total))
+
+    async def worker():
+        nonlocal failures, retried
+        for _ in queue:
+            for attempt in range(2 if retry else 1):
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    served[response.json()["worker"]] += 1
+                    break
+                except httpx.TransportError:
+                    if attempt == 0 and retry:
+                        retried += 1
+                        continue
+                    failures += 1
+                except httpx.HTTPError:
+                    failures += 1
+                    break
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return served, failures, retried
+
+
+async def reload_under_load(client, process, base_url, old, workers, concurrency, deadline):
+    """Send SIGHUP while requests keep flowing, until `workers` workers not in `old` answered.
+
+    A stopping uvicorn worker closes connections it accepted but has not read
+    a request from yet, the same race as an idle keep-alive connection being
+    closed. Those requests never reached the app, so they are retried once,
+    as nginx and HTTP clients do for idempotent requests, and reported.
+    """
+    failures = 0
+    retries = 0
+    start = time.perf_counter()
+    process.send_signal(signal.SIGHUP)
+    new = set()
+    while len(new) < workers:
+        if time.perf_counter() - start > deadline:
+            raise RuntimeError(f"only {len(new)} of {workers} workers replaced after {deadline}s")
+        served, failed, retried = await send_load(client, f"{base_url}/api/health/live", concurrency * 5,
+                                                  concurrency, retry=True)
+        failures += failed
+        retries += retried
+        new |= set(served) - old
+    return time.perf_counter() - start, failures, retries
+
+
+async def run(args):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    # No keep-alive, so every request is a new connection the kernel hands to some worker
+    limits = httpx.Limits(max_keepalive_connections=0)
+    process = start_gunicorn(args, port)
+    failed = False
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=10) as client:
+            first, all_ready, pids = await ready_workers(
+                client, f"{base_url}/api/health/ready", args.workers, args.startup_timeout, process
+            )
+            print(f"\n===== Multi-worker launcher ({args.workers} workers, {args.app}) =====")
+            print(f"first worker ready  {first:>8.2f} s")
+            print(f"all workers ready   {all_ready:>8.2f} s")
+
+            start = time.perf_counter()
+            served, failures, _ = await send_load(
+                client, f"{base_url}/api/health/live", args.requests, args.concurrency
+            )
+            elapsed = time.perf_counter() - start
+            print(f"\n{args.requests} requests, {args.concurrency} in flight: {args.requests / elapsed:.0f} req/s, "
+                  f"{failures} failed")
+            print(f"{'worker':>10} {'requests':>9} {'share':>7}")
+            for worker, count in sorted(served.items()):
+                print(f"{worker:>10} {count:>9} {count / args.requests:>7.1%}")
+            if failures or len(served) < args.workers:
+                print(f"ERROR: {args.workers - len(served)} workers served nothing, {failures} requests failed")
+                failed = True
+
+            if args.reload:
+                seconds, failures, retries = await reload_under_load(
+                    client, process, base_url, pids | set(served), args.workers, args.concurrency,
+                    args.startup_timeout,
+                )
+                print(f"\nSIGHUP reload: all workers replaced in {seconds:.2f} s, {failures} requests failed, "
+                      f"{retries} retried after the connection was dropped unanswered")
+                if failures:
+                    print("ERROR: requests failed during the reload")
+                    failed = True
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32, help="requests in flight at once")
+    parser.add_argument("--reload", action="store_true", help="also check a SIGHUP reload under load")
+    parser.add_argument("--startup-timeout", type=float, default=60.0, help="seconds")
+    parser.add_argument("--app", default="server:app", help="ASGI app for gunicorn to serve")
+    parser.add_argument("--verbose", action="store_true", help="show gunicorn's log")
+    args = parser.parse_args()
+    if args.workers > 1 and not (os.environ.get("BENCH_REDIS_URL") or os.environ.get("REDIS_URL")):
+        parser.error("more than one worker needs BENCH_REDIS_URL or REDIS_URL")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Shared helpers for the catalog API benchmarks.
+
+Benchmarks run `server:app` in-process through httpx's ASGI transport. Set
+BENCH_MONGO_URL to run against a real mongod (recommended for latency
+numbers); otherwise an in-memory mongomock-motor database is used.
+"""
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = ROOT_DIR / "backend"
+
+BENCH_DB_NAME = "catalog_bench"
+
+CATEGORIES = ["equipment", "supplements", "accessories", "apparel"]
+NAME_WORDS = ["premium", "pro", "elite", "compact", "wooden", "steel", "adjustable", "training",
+              "parallettes", "rings", "bands", "vest", "belt", "chalk", "tape", "hoodie", "tank",
+              "shorts", "wraps", "blocks", "bar", "mat", "rope", "straps", "gloves"]
+TAGS = ["resistance", "training", "portable", "grip", "strength", "mobility",
+        "parallettes", "rings", "weighted", "chalk", "apparel", "recovery"]
+
+
+def load_server(**env):
+    """Import backend/server.py with benchmark settings and a fresh database"""
+    for name, value in env.items():
+        os.environ[name] = str(value)
+    # Benchmarks measure the database path unless a caller opts into caching
+    os.environ.setdefault("CATALOG_CACHE_MAX_ENTRIES", "0")
+    os.environ.pop("REDIS_URL", None)
+    sys.path.insert(0, str(BACKEND_DIR))
+    import server
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    mongo_url = os.environ.get("BENCH_MONGO_URL")
+    if mongo_url:
+        # Same pool settings and metrics as the app's own client
+        server.client = server.create_mongo_client(mongo_url)
+        server.db = server.client[BENCH_DB_NAME]
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[BENCH_DB_NAME]
+    return server
+
+
+def asgi_client(app):
+    import httpx
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+@asynccontextmanager
+async def running_app(server):
+    """Run the app's startup/shutdown hooks around an in-process client"""
+    async with server.app.router.lifespan_context(server.app):
+        async with asgi_client(server.app) as client:
+            yield client
+
+
+def synthetic_product(i, rng=random):
+    """A catalog document shaped like Product.dict()"""
+    created_at = datetime(2024, 1, 1) + timedelta(minutes=i)
+    price = round(rng.uniform(5, 300), 2)
+    return {
+        "id": f"sku-{i:07d}-{uuid.uuid4().hex[:6]}",
+        "name": " ".join(rng.sample(NAME_WORDS, 3)).title() + f" {i}",
+        "description": "Benchmark product used to exercise the catalog API.",
+        "long_description": "Long form copy for the benchmark product. " * 20,
+        "category": rng.choice(CATEGORIES),
+        "price": price,
+        "discount_price": round(price * 0.85, 2) if rng.random() < 0.3 else None,
+        "currency": "USD",
+        "images": [f"https://example.com/images/{i}-{n}.jpg" for n in range(4)],
+        "assets_3d": {
+            "model_url": f"https://example.com/models/{i}.glb",
+            "texture_urls": [f"https://example.com/textures/{i}-{n}.jpg" for n in range(3)],
+            "preview_image": f"https://example.com/previews/{i}.jpg",
+        },
+        "specifications": {
+            "dimensions": "30 x 20 x 10 cm",
+            "weight": "1.2kg",
+            "material": "Steel",
+            "color_options": ["black", "white"],
+            "additional_specs": {f"spec_{n}": f"value {n}" for n in range(8)},
+        },
+        "features": [f"{word.title()} design" for word in rng.sample(NAME_WORDS, 3)],
+        "tags": rng.sample(TAGS, 3),
+        "stock_quantity": rng.randint(0, 500),
+        "status": rng.choice(["active"] * 8 + ["inactive", "out_of_stock"]),
+        "rating": round(rng.uniform(3.0, 5.0), 1),
+        "review_count": rng.randint(0, 1000),
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+async def seed_catalog(db, count, batch_size=1000, seed=42):
+    """Replace the products collection with `count` synthetic products"""
+    rng = random.Random(seed)
+    await db.products.delete_many({})
+    for start in range(0, count, batch_size):
+        docs = [synthetic_product(i, rng) for i in range(start, min(start + batch_size, count))]
+        await db.products.insert_many(docs)
+
+
+async def time_request(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed, response
+
+
+def summarize(samples):
+    """Latency summary in milliseconds"""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(pct(50), 3),
+        "p95_ms": round(pct(95), 3),
+        "p99_ms": round(pct(99), 3),
+    }
+
+
+def backend_name():
+    return "mongod" if os.environ.get("BENCH_MONGO_URL") else "mongomock"
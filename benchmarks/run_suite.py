@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Load test every catalog API endpoint over 1k/10k/100k product catalogs.
+
+Boots server:app in-process (see common.py: mongomock unless BENCH_MONGO_URL
+points at a local mongod), seeds each catalog size, then drives every
+scenario with --concurrency requests in flight. Reports throughput,
+p50/p95/p99 latency, errors and process memory, and can save everything as
+JSON. --compare checks the run against a saved one and exits non-zero when
+a scenario regressed by more than --threshold percent. Runs are only
+comparable on the same machine and backend. Under mongomock the catalog
+itself lives in this process and is part of the memory figures.
+
+    python benchmarks/run_suite.py --sizes 1000 10000 --output baseline.json
+    python benchmarks/run_suite.py --sizes 1000 10000 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from common import (
+    CATEGORIES, NAME_WORDS, ROOT_DIR, TAGS, backend_name, load_server, running_app, seed_catalog, summarize,
+    synthetic_product,
+)
+
+HOT_STOCK = 10 ** 9
+
+Request = Tuple[str, str, Optional[Dict[str, Any]]]  # method, url, json body
+
+
+class Scenario(NamedTuple):
+    name: str
+    make: Callable[[Dict[str, Any], random.Random], Request]
+    share: float = 1.0  # Fraction of --requests to send, for the heavy endpoints
+
+
+def product_create(ctx, rng):
+    product = synthetic_product(rng.randrange(10 ** 7), rng)
+    for key in ("id", "created_at", "updated_at", "status", "rating", "review_count"):
+        product.pop(key)
+    return "POST", "/api/products", product
+
+
+SCENARIOS = [
+    # Reads
+    Scenario("root", lambda ctx, rng: ("GET", "/api/", None)),
+    Scenario("list", lambda ctx, rng: ("GET", f"/api/products?limit=20&skip={rng.randrange(5) * 20}", None)),
+    Scenario("list_sorted", lambda ctx, rng: ("GET", "/api/products?limit=50&sort=price&order=desc", None)),
+    Scenario("list_filtered", lambda ctx, rng: (
+        "GET", f"/api/products?category={rng.choice(CATEGORIES)}&price_max=100&min_rating=4&limit=20", None)),
+    Scenario("list_cursor", lambda ctx, rng: ("GET", "/api/products?limit=20&cursor=&sort=rating", None)),
+    Scenario("list_cards", lambda ctx, rng: ("GET", "/api/products?fields=card&limit=100", None)),
+    Scenario("product", lambda ctx, rng: ("GET", f"/api/products/{rng.choice(ctx['product_ids'])}", None)),
+    Scenario("product_hot", lambda ctx, rng: ("GET", f"/api/products/{ctx['product_ids'][0]}", None)),
+    Scenario("batch", lambda ctx, rng: (
+        "GET", "/api/products/batch?ids=" + ",".join(rng.sample(ctx["product_ids"], 20)), None)),
+    Scenario("featured", lambda ctx, rng: ("GET", "/api/products/featured", None)),
+    Scenario("category", lambda ctx, rng: ("GET", f"/api/products/category/{rng.choice(CATEGORIES)}?fields=card",
+                                           None)),
+    Scenario("search", lambda ctx, rng: (
+        "GET", f"/api/products/search?q={' '.join(rng.sample(NAME_WORDS + TAGS, 2))}", None)),
+    Scenario("facets", lambda ctx, rng: ("GET", f"/api/products/facets?category={rng.choice(CATEGORIES)}", None)),
+    Scenario("recommendations", lambda ctx, rng: (
+        "GET", f"/api/products/{rng.choice(ctx['product_ids'])}/recommendations?limit=6", None)),
+    Scenario("export", lambda ctx, rng: (
+        "GET", f"/api/products/export?category={rng.choice(CATEGORIES)}&fields=card", None), share=0.02),
+    Scenario("status_list", lambda ctx, rng: ("GET", "/api/status?limit=100", None)),
+    Scenario("cache_stats", lambda ctx, rng: ("GET", "/api/cache/stats", None)),
+    # Writes, after the reads since they invalidate cached responses
+    Scenario("status_post", lambda ctx, rng: ("POST", "/api/status", {"client_name": f"bench-{rng.randrange(20)}"})),
+    Scenario("create", product_create, share=0.5),
+    Scenario("update", lambda ctx, rng: (
+        "PUT", f"/api/products/{rng.choice(ctx['product_ids'])}", {"price": round(rng.uniform(5, 300), 2)}),
+        share=0.5),
+    Scenario("reserve", lambda ctx, rng: ("POST", f"/api/products/{ctx['hot_id']}/reserve", {"quantity": 1})),
+    Scenario("release", lambda ctx, rng: ("POST", f"/api/products/{ctx['hot_id']}/release", {"quantity": 1})),
+]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / 2 ** 20, 1)
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def drive(client, scenario, ctx, total, concurrency, rng):
+    requests = [scenario.make(ctx, rng) for _ in range(total)]
+    timings = []
+    errors = 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, url, body in queue:
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            timings.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return time.perf_counter() - start, timings, errors
+
+
+async def run_size(server, size, scenarios, args):
+    rng = random.Random(size)
+    start = time.perf_counter()
+    await seed_catalog(server.db, size)
+    hot = synthetic_product(size, rng)
+    hot.update(stock_quantity=HOT_STOCK, status="active")
+    await server.db.products.insert_one(hot)
+    for name in ("status_buckets", "status_clients"):
+        await server.db[name].delete_many({})
+    server.catalog_cache.clear()
+    seed_seconds = time.perf_counter() - start
+
+    product_ids = [doc["id"] for doc in await server.db.products.find({}, {"_id": 0, "id": 1}).to_list(None)]
+    ctx = {"product_ids": product_ids, "hot_id": hot["id"]}
+    results = []
+    async with running_app(server) as client:
+        memory = {"seeded_rss_mb": rss_mb()}
+        for scenario in scenarios:
+            total = max(1, int(args.requests * scenario.share))
+            await drive(client, scenario, ctx, max(1, total // 10), args.concurrency, rng)  # Warm up
+            elapsed, timings, errors = await drive(client, scenario, ctx, total, args.concurrency, rng)
+            result = {
+                "size": size,
+                "scenario": scenario.name,
+                "requests": total,
+                "errors": errors,
+                "throughput": round(total / elapsed, 1),
+                **summarize(timings),
+            }
+            results.append(result)
+            print(f"{size:>7} {scenario.name:>16} {result['throughput']:>9.0f} {result['p50_ms']:>8.2f} "
+                  f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} {errors:>6}")
+    loaded = rss_mb()
+    memory.update(loaded_rss_mb=loaded, peak_rss_mb=max(loaded, peak_rss_mb()), seed_seconds=round(seed_seconds, 2))
+    print(f"{size:>7} {'memory':>16} seeded {memory['seeded_rss_mb']} MB, after load {memory['loaded_rss_mb']} MB, "
+          f"peak {memory['peak_rss_mb']} MB")
+    return results, memory
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """Print scenarios that got slower than `baseline` and return how many regressed"""
+    previous = {(r["size"], r["scenario"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\n===== Compared with {baseline['meta'].get('revision') or 'baseline'} "
+          f"({baseline['meta'].get('timestamp')}), threshold {threshold}% =====")
+    print(f"{'size':>7} {'scenario':>16} {'req/s':>16} {'p95 ms':>18} {'errors':>9}  verdict")
+    for result in current:
+        before = previous.get((result["size"], result["scenario"]))
+        if before is None:
+            continue
+        throughput_change = (result["throughput"] / before["throughput"] - 1) * 100 if before["throughput"] else 0.0
+        p95_change = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        reasons = []
+        if throughput_change < -threshold:
+            reasons.append("throughput")
+        if p95_change > threshold and result["p95_ms"] - before["p95_ms"] > min_delta_ms:
+            reasons.append("p95")
+        if result["errors"] > before["errors"]:
+            reasons.append("errors")
+        regressions += bool(reasons)
+        print(f"{result['size']:>7} {result['scenario']:>16} {throughput_change:>+15.1f}% {p95_change:>+17.1f}% "
+              f"{before['errors']:>4}->{result['errors']:<4} {'REGRESSED: ' + ', '.join(reasons) if reasons else 'ok'}")
+    return regressions
+
+
+async def run(args):
+    server = load_server(CATALOG_CACHE_MAX_ENTRIES=0 if args.no_cache else 1024)
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+    unknown = set(args.scenarios or []) - {s.name for s in SCENARIOS}
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        return 2
+
+    print(f"\n===== Catalog API suite ({backend_name()}, cache {'off' if args.no_cache else 'on'}, "
+          f"{args.requests} requests per scenario, {args.concurrency} in flight) =====")
+    print(f"{'size':>7} {'scenario':>16} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    results = []
+    memory = {}
+    for size in args.sizes:
+        size_results, memory[str(size)] = await run_size(server, size, scenarios, args)
+        results.extend(size_results)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "revision": git_revision(),
+            "backend": backend_name(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cache": not args.no_cache,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+        "memory": memory,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    failed = any(result["errors"] for result in results)
+    if failed:
+        print("ERROR: some requests failed")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"ERROR: {regressions} scenarios regressed")
+            failed = True
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight at once")
+    parser.add_argument("--scenarios", nargs="+", help="only run these scenarios")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="percent drop in throughput or rise in p95 counted as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="p95 changes smaller than this are ignored as noise")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
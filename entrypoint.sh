@@ -4,38 +4,73 @@ set -e
 # Start the FastAPI backend
 cd /backend || { echo "Backend directory not found"; exit 1; }
 
-echo "Starting FastAPI backend"
-# Start Uvicorn with proper host binding
-uvicorn server:app --host 0.0.0.0 --port 8001 &
-BACKEND_PID=$!
-
-echo "Waiting for backend to start..."
-sleep 30
+# Workers default to one per CPU, see gunicorn.conf.py
+export WEB_CONCURRENCY="${WEB_CONCURRENCY:-$(nproc)}"
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus-multiproc}"
+READY_URL="http://127.0.0.1:8001/api/health/ready"
+READY_TIMEOUT="${READY_TIMEOUT:-60}"
 
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Backend failed to start at initialization, exiting"
-    exit 1
+# Workers keep per-process catalog caches and indexes that only stay in step
+# through Redis; without an external REDIS_URL, several workers use the bundled one
+REDIS_PID=""
+if [ -z "$REDIS_URL" ] && [ "$WEB_CONCURRENCY" -gt 1 ]; then
+    echo "Starting bundled Redis for ${WEB_CONCURRENCY} workers"
+    redis-server /etc/redis/redis.conf &
+    REDIS_PID=$!
+    export REDIS_URL="redis://127.0.0.1:6379/0"
+    until redis-cli ping >/dev/null 2>&1; do
+        if ! kill -0 $REDIS_PID 2>/dev/null; then
+            echo "Redis failed to start, exiting"
+            exit 1
+        fi
+        sleep 0.2
+    done
 fi
 
+echo "Starting FastAPI backend with ${WEB_CONCURRENCY} workers"
+gunicorn -c gunicorn.conf.py server:app &
+BACKEND_PID=$!
+
+echo "Waiting for backend to become ready..."
+waited=0
+until wget -q -O /dev/null "$READY_URL" 2>/dev/null; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "Backend failed to start at initialization, exiting"
+        [ -n "$REDIS_PID" ] && kill $REDIS_PID
+        exit 1
+    fi
+    if [ "$waited" -ge "$READY_TIMEOUT" ]; then
+        echo "Backend not ready after ${READY_TIMEOUT}s, exiting"
+        kill $BACKEND_PID $REDIS_PID
+        exit 1
+    fi
+    sleep 1
+    waited=$((waited + 1))
+done
+echo "Backend ready after ${waited}s"
+
 # Start Nginx
 nginx -g 'daemon off;' &
 NGINX_PID=$!
 
-# Handle termination signals
-trap 'kill $BACKEND_PID $NGINX_PID; exit 0' SIGTERM SIGINT
+# Handle termination signals; SIGHUP rolls the backend workers over to new code/config
+trap 'kill $BACKEND_PID $NGINX_PID $REDIS_PID; exit 0' SIGTERM SIGINT
+trap 'echo "Reloading backend workers"; kill -HUP $BACKEND_PID; nginx -s reload' SIGHUP
 
 # Check if processes are still running
-while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null; do
+while kill -0 $BACKEND_PID 2>/dev/null && kill -0 $NGINX_PID 2>/dev/null \
+        && { [ -z "$REDIS_PID" ] || kill -0 $REDIS_PID 2>/dev/null; }; do
     sleep 1
 done
 
 # If we get here, one of the processes died
-if kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "Nginx died, shutting down backend..."
-    kill $BACKEND_PID
+if ! kill -0 $BACKEND_PID 2>/dev/null; then
+    echo "Backend died, shutting down..."
+elif ! kill -0 $NGINX_PID 2>/dev/null; then
+    echo "Nginx died, shutting down..."
 else
-    echo "Backend died, shutting down nginx..."
-    kill $NGINX_PID
+    echo "Redis died, shutting down..."
 fi
+kill $BACKEND_PID $NGINX_PID $REDIS_PID 2>/dev/null || true
 
 exit 1
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules, as they do under uvicorn
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+def _product_payload(**overrides):
+    payload = {
+        "name": "Resistance Bands", "description": "Set of five bands", "long_description": "Latex bands",
+        "category": "equipment", "price": 29.99, "images": ["bands.jpg"],
+        "assets_3d": {"model_url": "bands.glb", "texture_urls": [], "preview_image": "bands.png"},
+        "specifications": {"material": "latex"}, "tags": ["resistance"], "stock_quantity": 5,
+    }
+    payload.update(overrides)
+    return payload
+
+
+@pytest.fixture
+def product_payload():
+    """Factory for POST /api/products bodies"""
+    return _product_payload
+
+
+@pytest.fixture
+def server():
+    """backend/server.py on a fresh in-memory database, with empty caches and indexes"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "catalog_test")
+    os.environ.pop("REDIS_URL", None)
+    import server
+
+    server.db = mongomock_motor.AsyncMongoMockClient()["catalog_test"]
+    server.shared_cache = None
+    server.catalog_cache.clear()
+    asyncio.run(server.rebuild_product_indexes())
+    return server
+
+
+@pytest.fixture
+def api(server):
+    """Factory for an in-process HTTP client, to be used inside the test's event loop"""
+    httpx = pytest.importorskip("httpx")
+    return lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
@@ -0,0 +1,126 @@
+import asyncio
+
+
+class GatedCollection:
+    """Collection whose find_one/find hold their results until `gate` opens"""
+
+    def __init__(self, collection, gate, started):
+        self._collection = collection
+        self._gate = gate
+        self._started = started
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def find_one(self, *args, **kwargs):
+        doc = await self._collection.find_one(*args, **kwargs)
+        self._started.set()
+        await self._gate.wait()
+        return doc
+
+    def find(self, *args, **kwargs):
+        return GatedCursor(self._collection.find(*args, **kwargs), self._gate, self._started)
+
+
+class GatedCursor:
+    def __init__(self, cursor, gate, started):
+        self._cursor = cursor
+        self._gate = gate
+        self._started = started
+
+    async def to_list(self, length):
+        docs = await self._cursor.to_list(length)
+        self._started.set()
+        await self._gate.wait()
+        return docs
+
+
+class GatedDatabase:
+    def __init__(self, db, gate, started):
+        self._db = db
+        self.products = GatedCollection(db.products, gate, started)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self._db[name]
+
+
+def test_product_read_overlapping_a_write_is_not_cached(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            product = (await client.post("/api/products", json=product_payload(price=193.63))).json()
+            url = f"/api/products/{product['id']}"
+
+            # The read fetches the old document, then the update lands before it finishes
+            gate, started = asyncio.Event(), asyncio.Event()
+            db = server.db
+            server.db = GatedDatabase(db, gate, started)
+            read = asyncio.create_task(client.get(url))
+            await started.wait()
+            server.db = db
+            response = await client.put(url, json={"price": 1.23})
+            assert response.status_code == 200
+            gate.set()
+            assert (await read).json()["price"] == 193.63
+
+            assert (await client.get(url)).json()["price"] == 1.23
+
+    asyncio.run(run())
+
+
+def test_batch_read_overlapping_a_write_is_not_cached(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            product = (await client.post("/api/products", json=product_payload(price=193.63))).json()
+            batch_url = f"/api/products/batch?ids={product['id']}"
+
+            gate, started = asyncio.Event(), asyncio.Event()
+            db = server.db
+            server.db = GatedDatabase(db, gate, started)
+            read = asyncio.create_task(client.get(batch_url))
+            await started.wait()
+            server.db = db
+            await client.put(f"/api/products/{product['id']}", json={"price": 1.23})
+            gate.set()
+            assert (await read).json()["items"][0]["price"] == 193.63
+
+            assert (await client.get(batch_url)).json()["items"][0]["price"] == 1.23
+            assert (await client.get(f"/api/products/{product['id']}")).json()["price"] == 1.23
+
+    asyncio.run(run())
+
+
+def test_update_invalidates_cached_product_and_listing(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            product = (await client.post("/api/products", json=product_payload(price=10.0))).json()
+            url = f"/api/products/{product['id']}"
+            assert (await client.get(url)).json()["price"] == 10.0
+            assert (await client.get("/api/products?category=equipment")).json()[0]["price"] == 10.0
+
+            await client.put(url, json={"price": 12.5})
+            assert (await client.get(url)).json()["price"] == 12.5
+            assert (await client.get("/api/products?category=equipment")).json()[0]["price"] == 12.5
+
+            await client.delete(url)
+            assert (await client.get(url)).status_code == 404
+            assert (await client.get("/api/products?category=equipment")).json() == []
+
+    asyncio.run(run())
+
+
+def test_remote_clear_keeps_only_the_newest_rebuild(server, product_payload):
+    async def run():
+        product = server.Product(**product_payload(name="Parallettes")).dict()
+        await server.db.products.insert_one(product)
+        server.on_remote_clear()
+        first = server.app.state.index_rebuild
+        server.on_remote_clear()
+        second = server.app.state.index_rebuild
+        await second
+        assert first.cancelled()
+        assert [hit["id"] for hit in server.search_index.search("parallettes")] == [product["id"]]
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+import runpy
+from pathlib import Path
+
+import pytest
+
+CONFIG = str(Path(__file__).resolve().parent.parent / "backend" / "gunicorn.conf.py")
+
+
+def load_config(monkeypatch, **env):
+    for name in ("WEB_CONCURRENCY", "REDIS_URL"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG)
+
+
+def test_single_worker_without_redis(monkeypatch):
+    assert load_config(monkeypatch)["workers"] == 1
+
+
+def test_more_workers_without_redis_are_refused(monkeypatch):
+    with pytest.raises(RuntimeError, match="REDIS_URL"):
+        load_config(monkeypatch, WEB_CONCURRENCY="4")
+
+
+def test_worker_count_with_redis(monkeypatch):
+    config = load_config(monkeypatch, REDIS_URL="redis://localhost:6379/0", WEB_CONCURRENCY="4")
+    assert config["workers"] == 4
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert load_config(monkeypatch, REDIS_URL="redis://localhost:6379/0")["workers"] >= 1
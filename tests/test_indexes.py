@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from facet_index import ProductFilters
+from indexes import INDEXES, QUERY_SHAPES, ensure_indexes
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def branches(query):
+    """Field sets the planner must find an index for, one per $or branch"""
+    if "$or" in query:
+        return [set(branch) for branch in query["$or"]]
+    return [set(query)]
+
+
+def leading_fields(collection):
+    return {spec.keys[0][0] for spec in INDEXES if spec.collection == collection}
+
+
+def test_every_filtered_query_shape_leads_an_index():
+    for shape in QUERY_SHAPES:
+        for fields in branches(shape.filter):
+            if fields:
+                assert fields & leading_fields(shape.collection), shape.endpoint
+
+
+def test_product_filters_match_a_registered_shape():
+    registered = [shape.filter for shape in QUERY_SHAPES if shape.collection == "products"]
+    for filters in (ProductFilters(min_rating=4.0), ProductFilters(in_stock=True),
+                    ProductFilters(in_stock=False), ProductFilters(price_min=20.0, price_max=100.0)):
+        query = filters.mongo_filter()
+        assert any(branches(query) == branches(shape) for shape in registered), query
+
+
+def test_ensure_indexes_is_idempotent():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["catalog"]
+        first = await ensure_indexes(db)
+        assert await ensure_indexes(db) == first
+        assert len(first) == len(INDEXES)
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+import asyncio
+
+
+def reserve_url(product):
+    return f"/api/products/{product['id']}/reserve"
+
+
+def release_url(product):
+    return f"/api/products/{product['id']}/release"
+
+
+def test_release_reactivates_a_product_reserve_sold_out(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            product = (await client.post("/api/products", json=product_payload(stock_quantity=2))).json()
+            response = await client.post(reserve_url(product), json={"quantity": 2})
+            assert response.json()["status"] == "out_of_stock"
+            response = await client.post(release_url(product), json={"quantity": 1})
+            assert response.json()["stock_quantity"] == 1
+            assert response.json()["status"] == "active"
+            assert "sold_out_by_reserve" not in await server.db.products.find_one({"id": product["id"]})
+
+    asyncio.run(run())
+
+
+def test_release_keeps_an_admin_out_of_stock(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            product = (await client.post("/api/products", json=product_payload(stock_quantity=2))).json()
+            await client.put(f"/api/products/{product['id']}", json={"status": "out_of_stock"})
+            response = await client.post(release_url(product), json={"quantity": 1})
+            assert response.json()["stock_quantity"] == 3
+            assert response.json()["status"] == "out_of_stock"
+
+            # The admin's status also wins over an earlier sell-out by reserve
+            other = (await client.post("/api/products", json=product_payload(stock_quantity=1))).json()
+            await client.post(reserve_url(other))
+            await client.put(f"/api/products/{other['id']}", json={"status": "out_of_stock"})
+            assert (await client.post(release_url(other))).json()["status"] == "out_of_stock"
+
+    asyncio.run(run())
+
+
+def test_reserve_never_goes_below_zero(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            product = (await client.post("/api/products", json=product_payload(stock_quantity=1))).json()
+            results = await asyncio.gather(*(client.post(reserve_url(product)) for _ in range(3)))
+            assert sorted(response.status_code for response in results) == [200, 409, 409]
+            assert (await server.db.products.find_one({"id": product["id"]}))["stock_quantity"] == 0
+
+    asyncio.run(run())
+
+
+def test_cart_reservation_is_all_or_nothing(server, api, product_payload):
+    async def run():
+        async with api() as client:
+            bands = (await client.post("/api/products", json=product_payload(stock_quantity=1))).json()
+            mat = (await client.post("/api/products", json=product_payload(stock_quantity=2))).json()
+            # Cached before the reservation, must not be served stale afterwards
+            assert (await client.get(f"/api/products/{bands['id']}")).json()["stock_quantity"] == 1
+
+            response = await client.post("/api/products/reserve", json={"items": [
+                {"product_id": bands["id"], "quantity": 1}, {"product_id": mat["id"], "quantity": 5},
+            ]})
+            assert response.status_code == 409
+            assert response.json()["detail"]["product_id"] == mat["id"]
+
+            restored = (await client.get(f"/api/products/{bands['id']}")).json()
+            assert restored["stock_quantity"] == 1
+            assert restored["status"] == "active"
+
+    asyncio.run(run())
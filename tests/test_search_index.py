@@ -0,0 +1,24 @@
+from search_index import SearchIndex
+
+
+def product(product_id, name, category="equipment", status="active"):
+    return {"id": product_id, "name": name, "category": category, "status": status}
+
+
+def test_removed_terms_leave_the_vocabulary():
+    index = SearchIndex()
+    index.build([product("p1", "Chalk bag"), product("p2", "Chalk ball")])
+    index.remove("p1")
+    assert "bag" not in index.vocabulary
+    assert index.vocabulary == sorted(index.postings)
+    index.add(product("p2", "Lifting straps"))
+    assert index.vocabulary == ["lifting", "straps"]
+    assert [hit["id"] for hit in index.search("str")] == ["p2"]
+
+
+def test_search_filters_by_category_and_status():
+    index = SearchIndex()
+    index.build([product("p1", "Chalk"), product("p2", "Chalk", category="apparel"),
+                 product("p3", "Chalk", status="draft")])
+    assert [hit["id"] for hit in index.search("chalk", category="equipment")] == ["p1"]
+    assert {hit["id"] for hit in index.search("chalk", status=None)} == {"p1", "p2", "p3"}
@@ -0,0 +1,232 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from conditional import CatalogVersion  # noqa: E402
+from shared_cache import RedisError, SharedCatalogCache  # noqa: E402
+
+PRODUCT = ("product", "p1")
+CHALK = ("products", "equipment", None, 0, 20, None, None, None, None, None)
+APPAREL = ("products", "apparel", None, 0, 20, None, None, None, None, None)
+DOC = {"category": "equipment", "status": "active", "rating": 4.5}
+
+
+def shared_caches(count=1):
+    server = fakeredis.FakeServer()
+    return [SharedCatalogCache(fakeredis.aioredis.FakeRedis(server=server)) for _ in range(count)]
+
+
+async def fill(cache, *keys):
+    _, generation = await cache.get_many(list(keys))
+    await cache.set_many([(key, repr(key).encode()) for key in keys], generation)
+
+
+def test_miss_then_set_round_trip():
+    async def run():
+        [cache] = shared_caches()
+        body, generation = await cache.get(PRODUCT)
+        assert body is None
+        await cache.set(PRODUCT, b'{"id":"p1"}', generation)
+        assert (await cache.get(PRODUCT))[0] == b'{"id":"p1"}'
+
+    asyncio.run(run())
+
+
+def test_invalidate_product_deletes_only_tagged_entries():
+    async def run():
+        [cache] = shared_caches()
+        await fill(cache, PRODUCT, CHALK, APPAREL)
+        await cache.invalidate_product("p1", DOC)
+        bodies, _ = await cache.get_many([PRODUCT, CHALK, APPAREL])
+        assert bodies[:2] == [None, None]
+        assert bodies[2] is not None
+
+    asyncio.run(run())
+
+
+def test_write_after_invalidation_is_dropped():
+    async def run():
+        [cache] = shared_caches()
+        # The read misses and goes to MongoDB, a write lands and invalidates meanwhile
+        _, generation = await cache.get_many([PRODUCT, CHALK])
+        await cache.invalidate_product("p1", DOC)
+        await cache.set_many([(PRODUCT, b"stale"), (CHALK, b"stale")], generation)
+        assert (await cache.get_many([PRODUCT, CHALK]))[0] == [None, None]
+        assert cache.stats()["stale_writes"] == 2
+
+    asyncio.run(run())
+
+
+def test_write_after_invalidate_all_is_dropped():
+    async def run():
+        [cache] = shared_caches()
+        _, generation = await cache.get(APPAREL)
+        await cache.invalidate_all()
+        await cache.set(APPAREL, b"stale", generation)
+        assert (await cache.get(APPAREL))[0] is None
+
+    asyncio.run(run())
+
+
+def test_unrelated_invalidation_keeps_write():
+    async def run():
+        [cache] = shared_caches()
+        _, generation = await cache.get(APPAREL)
+        await cache.invalidate_product("p1", DOC)
+        await cache.set(APPAREL, b"fresh", generation)
+        assert (await cache.get(APPAREL))[0] == b"fresh"
+
+    asyncio.run(run())
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def wait_for_subscribers(cache, count=1, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while (await cache.redis.pubsub_numsub(cache.channel))[0][1] < count:
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_invalidations_fan_out_to_other_workers():
+    async def run():
+        writer, reader = shared_caches(2)
+        invalidated, clears = [], []
+        listener = asyncio.create_task(
+            reader.listen(lambda product_id, *docs: invalidated.append((product_id, docs)),
+                          lambda: clears.append(True))
+        )
+        try:
+            await wait_for_subscribers(writer)
+            await writer.invalidate_product("p1", DOC)
+            await writer.invalidate_all()
+            await wait_for(lambda: clears)
+            assert invalidated == [("p1", (DOC,))]
+            # A worker ignores its own messages
+            await reader.invalidate_product("p2", DOC)
+            await writer.invalidate_product("p3")
+            await wait_for(lambda: len(invalidated) == 2)
+            assert invalidated[1] == ("p3", ())
+            assert len(clears) == 1
+        finally:
+            listener.cancel()
+
+    asyncio.run(run())
+
+
+def test_listener_clears_on_resubscribe_only():
+    async def run():
+        writer, reader = shared_caches(2)
+        clears = []
+        listener = asyncio.create_task(
+            reader.listen(lambda *args: None, lambda: clears.append(True), retry_seconds=0)
+        )
+        try:
+            # The caller's state is fresh when it starts listening
+            await wait_for_subscribers(writer)
+            assert clears == []
+            # A malformed message makes the listener drop its subscription and subscribe again
+            await writer.redis.publish(writer.channel, b"not json")
+            await wait_for(lambda: clears)
+            assert reader.stats()["errors"] == 1
+        finally:
+            listener.cancel()
+
+    asyncio.run(run())
+
+
+def test_workers_issue_the_same_listing_etag():
+    async def run():
+        writer, reader = shared_caches(2)
+        writer_version, reader_version = CatalogVersion(), CatalogVersion()
+        listener = asyncio.create_task(reader.listen(lambda *args: None, lambda: None, reader_version.share))
+        try:
+            await wait_for_subscribers(writer)
+            await wait_for(lambda: reader_version.shared is not None)
+            writer_version.share(await writer.catalog_version())
+            assert writer_version.etag(CHALK) == reader_version.etag(CHALK)
+            writer_version.share(await writer.invalidate_product("p1", DOC))
+            await wait_for(lambda: reader_version.etag(CHALK) == writer_version.etag(CHALK))
+            # A message from a slower concurrent writer does not move the version back
+            stale = reader_version.shared
+            writer_version.share(await writer.invalidate_all())
+            reader_version.share(f"{stale[0]}.{stale[1]}")
+            await wait_for(lambda: reader_version.etag(CHALK) == writer_version.etag(CHALK))
+            reader_version.share(f"{stale[0]}.{stale[1]}")
+            assert reader_version.etag(CHALK) == writer_version.etag(CHALK)
+        finally:
+            listener.cancel()
+
+    asyncio.run(run())
+
+
+def test_profiling_changes_reach_every_worker(server, api, monkeypatch):
+    monkeypatch.setattr(server, "PROFILING_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(server.request_profiler, "sample_rate", 0.0)
+
+    async def run():
+        writer, reader = shared_caches(2)
+        server.shared_cache = writer
+        received = []
+        listener = asyncio.create_task(reader.listen(lambda *args: None, lambda: None, on_profiling=received.append))
+        try:
+            await wait_for_subscribers(writer)
+            async with api() as client:
+                response = await client.put("/api/debug/profiling", json={"sample_rate": 0.5},
+                                            headers={"X-Admin-Token": "secret"})
+                assert response.json()["sample_rate"] == 0.5
+                await wait_for(lambda: received)
+                assert received == [{"sample_rate": 0.5}]
+
+                async def unreachable(*args):
+                    raise RedisError("down")
+                monkeypatch.setattr(writer.redis, "publish", unreachable)
+                response = await client.put("/api/debug/profiling", json={"sample_rate": 1.0},
+                                            headers={"X-Admin-Token": "secret"})
+                assert response.status_code == 503
+                assert server.request_profiler.sample_rate == 0.5
+        finally:
+            listener.cancel()
+            server.shared_cache = None
+
+    asyncio.run(run())
+
+
+def test_product_writes_invalidate_shared_entries_and_other_workers(server, api, product_payload):
+    async def run():
+        writer, reader = shared_caches(2)
+        server.shared_cache = writer
+        invalidated = []
+        listener = asyncio.create_task(
+            reader.listen(lambda product_id, *docs: invalidated.append(product_id), lambda: None)
+        )
+        try:
+            await wait_for_subscribers(writer)
+            async with api() as client:
+                product = (await client.post("/api/products", json=product_payload(price=10.0))).json()
+                url = f"/api/products/{product['id']}"
+                await client.get(url)
+                await client.get("/api/products?category=equipment")
+                key = ("product", product["id"])
+                assert (await reader.get(key))[0] is not None
+                assert await reader.redis.keys("catalog:products*") != []
+
+                await client.put(url, json={"price": 12.5})
+                await wait_for(lambda: product["id"] in invalidated)
+                assert (await reader.get(key))[0] is None
+                assert await reader.redis.keys("catalog:products*") == []
+                server.catalog_cache.clear()
+                assert (await client.get(url)).json()["price"] == 12.5
+                assert (await reader.get(key))[0] is not None
+        finally:
+            listener.cancel()
+            server.shared_cache = None
+
+    asyncio.run(run())
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import status_store
+from indexes import ensure_indexes
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+@pytest.fixture
+def db():
+    """Fresh in-memory database with the status indexes, and no remembered open buckets"""
+    db = mongomock_motor.AsyncMongoMockClient()["status_test"]
+    asyncio.run(ensure_indexes(db))
+    status_store._open_seq.clear()
+    return db
+
+
+def checks(client_name, count, timestamp=None):
+    timestamp = timestamp or datetime.utcnow().replace(second=30, microsecond=0)
+    return [{"id": f"{client_name}-{i}", "client_name": client_name, "timestamp": timestamp}
+            for i in range(count)]
+
+
+def test_open_seq_remembers_only_the_most_recent_clients(db, monkeypatch):
+    monkeypatch.setattr(status_store, "MAX_OPEN_SEQ_CLIENTS", 2)
+
+    async def run():
+        for client_name in ("a", "b", "a", "c"):
+            await status_store.write_status_checks(db, checks(client_name, 1))
+        assert list(status_store._open_seq) == ["a", "c"]
+
+    asyncio.run(run())
+
+
+def test_full_buckets_continue_in_the_next_seq(db):
+    async def run():
+        batch = checks("monitor", 5)
+        await status_store.write_status_checks(db, batch, max_checks=2)
+        buckets = await db[status_store.BUCKETS].find({}, {"_id": 0}).sort("seq", 1).to_list(None)
+        assert [len(bucket["checks"]) for bucket in buckets] == [2, 2, 1]
+        assert [bucket["seq"] for bucket in buckets] == [0, 1, 2]
+
+        # A retried batch is never returned twice, even if parts of it landed in another document
+        await status_store.write_status_checks(db, batch, max_checks=2)
+        results = await status_store.query_status_checks(db, client_name="monitor")
+        assert sorted(result["id"] for result in results) == sorted(check["id"] for check in batch)
+        rollup = await status_store.status_rollup(db, "monitor")
+        assert rollup[0]["count"] == 10
+
+    asyncio.run(run())
+
+
+def test_query_pages_through_overflow_documents_in_order(db):
+    async def run():
+        await status_store.write_status_checks(db, checks("a", 3) + checks("b", 3), max_checks=2)
+        first = await status_store.query_status_checks(db, limit=4)
+        after = (first[-1]["timestamp"], first[-1]["id"])
+        rest = await status_store.query_status_checks(db, limit=4, after=after)
+        ids = [result["id"] for result in first + rest]
+        assert ids == sorted(ids, reverse=True)
+        assert len(ids) == 6
+
+    asyncio.run(run())
+
+
+def test_legacy_rows_are_migrated_once(db):
+    async def run():
+        now = datetime.utcnow()
+        await db[status_store.LEGACY_CHECKS].insert_many(
+            [{"id": f"legacy-{i}", "client_name": "old", "timestamp": now} for i in range(5)]
+        )
+        assert await status_store.migrate_legacy_status_checks(db, batch_size=2) == 5
+        assert await status_store.migrate_legacy_status_checks(db, batch_size=2) == 0
+        results = await status_store.query_status_checks(db, client_name="old")
+        assert len(results) == 5
+
+    asyncio.run(run())
+
+
+def test_interrupted_migration_resumes_after_the_last_copied_row(db):
+    async def run():
+        now = datetime.utcnow()
+        await db[status_store.LEGACY_CHECKS].insert_many(
+            [{"id": f"legacy-{i}", "client_name": "old", "timestamp": now} for i in range(5)]
+        )
+        rows = await db[status_store.LEGACY_CHECKS].find().sort("_id", 1).to_list(None)
+        # Claimed by a worker that died after copying two rows
+        await db[status_store.MIGRATIONS].insert_one({
+            "_id": status_store.LEGACY_CHECKS, "resume_after": rows[1]["_id"],
+            "heartbeat": now - 2 * status_store.MIGRATION_CLAIM_TIMEOUT,
+        })
+        assert await status_store.migrate_legacy_status_checks(db) == 3
+
+    asyncio.run(run())